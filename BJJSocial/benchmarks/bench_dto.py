@@ -0,0 +1,83 @@
+"""Memory and time for listing tournaments: ORM entities vs Core select() into slotted DTOs.
+
+Run with: python -m BJJSocial.benchmarks.bench_dto [rows]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from ..database import Base
+from ..models import User, Tournament
+from ..dto import tournaments_select, fetch_tournaments
+from ..serializers import serialize_tournament
+
+def seed(engine, count):
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": "organizer", "email": "org@example.com", "password": "x"}])
+        start = datetime(2020, 1, 1)
+        conn.execute(insert(Tournament), [
+            {
+                "id": f"tournament-{i:07d}",
+                "name": f"Open #{i}",
+                "date": start + timedelta(hours=i),
+                "location": "Austin, TX",
+                "is_gi": i % 2 == 0,
+                "ruleset": "IBJJF",
+                "tier": "LOCAL",
+                "organizer_id": "organizer",
+                "created_at": start,
+            }
+            for i in range(count)
+        ])
+
+def orm_path(db):
+    rows = db.query(Tournament).order_by(Tournament.date.desc()).all()
+    return rows, [serialize_tournament(t, None) for t in rows]
+
+def dto_path(db):
+    rows = fetch_tournaments(db, tournaments_select().order_by(Tournament.date.desc()))
+    return rows, [serialize_tournament(t, None) for t in rows]
+
+def measure(Session, fn):
+    # Time and memory are taken on separate runs: tracemalloc slows
+    # allocation-heavy code enough to distort the timing.
+    db = Session()
+    try:
+        gc.collect()
+        started = time.perf_counter()
+        _, payload = fn(db)
+        elapsed = time.perf_counter() - started
+    finally:
+        db.close()
+
+    del payload
+    db = Session()
+    try:
+        gc.collect()
+        tracemalloc.start()
+        _, payload = fn(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return elapsed, peak, len(payload)
+    finally:
+        db.close()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[User.__table__, Tournament.__table__])
+    seed(engine, count)
+    Session = sessionmaker(bind=engine)
+
+    for name, fn in (("orm", orm_path), ("dto", dto_path)):
+        elapsed, peak, rows = measure(Session, fn)
+        print(f"{name:>4}: {elapsed * 1000:8.1f} ms  peak {peak / 2**20:7.1f} MiB  "
+              f"({elapsed / rows * 1e6:.2f} us/row, {peak / rows:.0f} B/row)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""End-to-end latency, SQL statements and allocations for every API route on seeded data.
+
+Run with: python -m BJJSocial.benchmarks.bench_endpoints [--users N] [--requests N] [--out FILE] [--compare OLD.json]
+
+Requests go through the full ASGI stack (middlewares, sessions, routing,
+serialization) with httpx's ASGI transport, so no server or network is
+involved. The database is a scratch SQLite file filled by BJJSocial.seed
+on first use and reused by later runs with the same --users/--seed; set
+DATABASE_URL to benchmark another database. Writes come in pairs that
+undo each other (follow/unfollow, like/unlike) so repeated runs measure
+the same data; the organizer flow creates a tournament, a match and its
+result every iteration.
+
+Timings come from one pass and allocations (tracemalloc peak per request)
+from a second, because tracing slows everything down. --out writes the
+results with run metadata as JSON; --compare prints the change against a
+previous --out file. The run exits non-zero if any route answered with a
+5xx, after reporting.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000, help="Seeded users (scale of the dataset)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=50, help="Timed requests per endpoint")
+    parser.add_argument("--alloc-requests", type=int, default=10, help="Traced requests per endpoint")
+    parser.add_argument("--only", help="Substring filter on endpoint names")
+    parser.add_argument("--out", help="Write results and metadata to this JSON file")
+    parser.add_argument("--compare", help="Previous --out file to compare against")
+    parser.add_argument("--json", action="store_true", help="Print a single JSON object")
+    return parser.parse_args()
+
+# ============= Endpoints =============
+
+def endpoints(ids):
+    """(name, build) pairs; build(rng) returns the requests of one iteration as (method, url, body)"""
+    def pick(key):
+        return lambda rng: rng.choice(ids[key])
+
+    user, post, tournament = pick("users"), pick("posts"), pick("tournaments")
+    school, season = pick("schools"), pick("seasons")
+    others = [user_id for user_id in ids["users"] if user_id != ids["me"] and user_id not in ids["followed"]]
+
+    def follow_unfollow(rng):
+        target = rng.choice(others)
+        return [("POST", f"/api/users/{target}/follow", None), ("DELETE", f"/api/users/{target}/follow", None)]
+
+    def like_unlike(rng):
+        target = post(rng)
+        return [("POST", f"/api/posts/{target}/like", None), ("DELETE", f"/api/posts/{target}/like", None)]
+
+    def comment(rng):
+        target = post(rng)
+        return [("POST", f"/api/posts/{target}/comments", {"postId": target, "content": "Osss"})]
+
+    def organizer_flow(rng):
+        a, b = rng.sample(ids["users"], 2)
+        return [
+            ("POST", "/api/tournaments", {"name": "Bench Open", "date": "2025-05-01T10:00:00", "ruleset": "IBJJF"}),
+            ("POST", "/api/tournaments/{tournament}/matches", {
+                "tournamentId": "{tournament}", "round": "Final", "belt": "Blue", "weightClass": "Light",
+                "gender": "Male", "competitorAId": a, "competitorBId": b,
+            }),
+            ("POST", "/api/matches/{match}/result", {"winnerId": a, "method": "Submission", "submissionType": "Armbar"}),
+        ]
+
+    return [
+        ("GET /health", lambda rng: [("GET", "/health", None)]),
+        ("GET /api/auth/user", lambda rng: [("GET", "/api/auth/user", None)]),
+        ("GET /api/users/{id}", lambda rng: [("GET", f"/api/users/{user(rng)}", None)]),
+        ("GET /api/users/{id}/profile-bundle", lambda rng: [("GET", f"/api/users/{user(rng)}/profile-bundle", None)]),
+        ("GET /api/users/{id}/followers", lambda rng: [("GET", f"/api/users/{user(rng)}/followers", None)]),
+        ("GET /api/users/{id}/following", lambda rng: [("GET", f"/api/users/{user(rng)}/following", None)]),
+        ("GET /api/users/{id}/stats", lambda rng: [("GET", f"/api/users/{user(rng)}/stats", None)]),
+        ("GET /api/users/me/suggestions", lambda rng: [("GET", "/api/users/me/suggestions", None)]),
+        ("PUT /api/user/profile", lambda rng: [("PUT", "/api/user/profile", {"bio": f"Bench bio {rng.random()}"})]),
+        ("POST+DELETE /api/users/{id}/follow", follow_unfollow),
+        ("GET /api/posts", lambda rng: [("GET", "/api/posts?limit=50", None)]),
+        ("GET /api/posts?sort=trending", lambda rng: [("GET", "/api/posts?sort=trending&limit=50", None)]),
+        ("GET /api/posts?userId", lambda rng: [("GET", f"/api/posts?userId={user(rng)}", None)]),
+        ("POST /api/posts", lambda rng: [("POST", "/api/posts", {"content": "Bench post #bjj", "type": "training"})]),
+        ("POST+DELETE /api/posts/{id}/like", like_unlike),
+        ("POST /api/posts/{id}/comments", comment),
+        ("GET /api/posts/{id}/comments", lambda rng: [("GET", f"/api/posts/{post(rng)}/comments", None)]),
+        ("GET /api/tags/{tag}/posts", lambda rng: [("GET", f"/api/tags/{rng.choice(('bjj', 'nogi', 'leglocks'))}/posts", None)]),
+        ("GET /api/tags/trending", lambda rng: [("GET", "/api/tags/trending", None)]),
+        ("GET /api/notifications", lambda rng: [("GET", "/api/notifications", None)]),
+        ("GET /api/notifications/unread-count", lambda rng: [("GET", "/api/notifications/unread-count", None)]),
+        ("GET /api/users/{id}/mentions", lambda rng: [("GET", f"/api/users/{user(rng)}/mentions", None)]),
+        ("GET /api/tournaments", lambda rng: [("GET", "/api/tournaments", None)]),
+        ("GET /api/tournaments?q&season", lambda rng: [("GET", f"/api/tournaments?q=Open&season={season(rng)}", None)]),
+        ("GET /api/tournaments/nearby", lambda rng: [("GET", "/api/tournaments/nearby?near=Austin,TX&radiusKm=500", None)]),
+        ("GET /api/tournaments/{id}", lambda rng: [("GET", f"/api/tournaments/{tournament(rng)}", None)]),
+        ("GET /api/tournaments/{id}/matches", lambda rng: [("GET", f"/api/tournaments/{tournament(rng)}/matches", None)]),
+        ("organizer flow", organizer_flow),
+        ("GET /api/leaderboard", lambda rng: [("GET", "/api/leaderboard", None)]),
+        ("GET /api/leaderboard?filters", lambda rng: [
+            ("GET", f"/api/leaderboard?season={season(rng)}&ruleset=IBJJF&belt=Blue&isGi=true", None),
+        ]),
+        ("GET /api/leaderboard/rank/{id}", lambda rng: [("GET", f"/api/leaderboard/rank/{user(rng)}", None)]),
+        ("GET /api/users/{id}/leaderboard", lambda rng: [("GET", f"/api/users/{user(rng)}/leaderboard", None)]),
+        ("GET /api/users/{id}/leaderboard/history", lambda rng: [
+            ("GET", f"/api/users/{user(rng)}/leaderboard/history", None),
+        ]),
+        ("GET /api/users/{id}/ratings", lambda rng: [("GET", f"/api/users/{user(rng)}/ratings", None)]),
+        ("GET /api/users/{id}/ratings/history", lambda rng: [("GET", f"/api/users/{user(rng)}/ratings/history", None)]),
+        ("GET /api/users/{id}/matches", lambda rng: [("GET", f"/api/users/{user(rng)}/matches", None)]),
+        ("GET /api/schools/{school}/leaderboard", lambda rng: [("GET", f"/api/schools/{school(rng)}/leaderboard", None)]),
+        ("GET /api/schools/nearby", lambda rng: [("GET", "/api/schools/nearby?lat=40.71&lon=-74.0", None)]),
+        ("GET /api/schools/rankings", lambda rng: [("GET", "/api/schools/rankings", None)]),
+        ("GET /api/search", lambda rng: [("GET", f"/api/search?q={rng.choice(('Silva', 'Atos', 'Open'))}", None)]),
+    ]
+
+# ============= Driver =============
+
+class StatementCounter:
+    """Counts SQL statements on the app's engines (one request in flight at a time)"""
+
+    def __init__(self, engines):
+        from sqlalchemy import event
+        self.count = 0
+        for target in engines:
+            event.listen(target, "before_cursor_execute", self._before_cursor_execute)
+
+    def _before_cursor_execute(self, *args):
+        self.count += 1
+
+def _fill(value, context):
+    """Substitute ids created by earlier requests of the same iteration ("{tournament}", "{match}")"""
+    if isinstance(value, str):
+        for key, known in context.items():
+            value = value.replace("{" + key + "}", known)
+        return value
+    if isinstance(value, dict):
+        return {key: _fill(item, context) for key, item in value.items()}
+    return value
+
+async def run_iteration(client, build, rng, on_request):
+    context = {}
+    for method, url, body in build(rng):
+        url, body = _fill(url, context), _fill(body, context)
+        response = await on_request(lambda: client.request(method, url, json=body))
+        if method == "POST" and response.status_code == 201:
+            if url == "/api/tournaments":
+                context["tournament"] = response.json()["id"]
+            elif url.endswith("/matches"):
+                context["match"] = response.json()["id"]
+
+async def measure_timings(client, name, build, rng, iterations, counter):
+    samples, statuses, queries = [], Counter(), []
+
+    async def on_request(send):
+        before = counter.count
+        started = time.perf_counter()
+        response = await send()
+        samples.append(time.perf_counter() - started)
+        queries.append(counter.count - before)
+        statuses[response.status_code] += 1
+        return response
+
+    for _ in range(iterations):
+        await run_iteration(client, build, rng, on_request)
+    samples.sort()
+
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))] * 1000
+
+    return {
+        "requests": len(samples),
+        "p50_ms": round(percentile(50), 3),
+        "p95_ms": round(percentile(95), 3),
+        "p99_ms": round(percentile(99), 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "queries_median": statistics.median(queries),
+        "queries_max": max(queries),
+    }
+
+async def measure_allocations(client, build, rng, iterations):
+    peaks = []
+
+    async def on_request(send):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        response = await send()
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        return response
+
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            await run_iteration(client, build, rng, on_request)
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_kb_median": round(statistics.median(peaks) / 1024, 1)}
+
+def sample_ids():
+    from sqlalchemy import select, distinct
+    from ..database import get_db_context
+    from ..models import User, Post, Tournament, Like, Follow
+
+    with get_db_context() as db:
+        # Log in as the most-followed seeded athlete: the heaviest profile
+        me = db.execute(
+            select(User.id, User.email).where(User.email.like("athlete%")).order_by(User.followers_count.desc()).limit(1)
+        ).one()
+        users = db.scalars(select(User.id).where(User.email.like("athlete%")).order_by(User.email).limit(500)).all()
+        # Follow and like targets exclude what the bench user already follows
+        # or liked, so each write pair succeeds and leaves the data as it was
+        followed = set(db.scalars(select(Follow.following_id).where(Follow.follower_id == me.id)))
+        liked = select(Like.post_id).where(Like.user_id == me.id)
+        posts = db.scalars(
+            select(Post.id).where(Post.id.not_in(liked)).order_by(Post.created_at.desc()).limit(500)
+        ).all()
+        tournaments = db.scalars(select(Tournament.id).order_by(Tournament.date.desc()).limit(200)).all()
+        schools = db.scalars(select(distinct(User.school)).where(User.school.isnot(None))).all()
+        seasons = sorted({str(date.year) for date in db.scalars(select(Tournament.date))})
+    return {
+        "users": users, "posts": posts, "tournaments": tournaments, "schools": schools,
+        "seasons": seasons or [str(datetime.utcnow().year)], "me": me.id, "me_email": me.email, "followed": followed,
+    }
+
+async def run(args):
+    import httpx
+    from ..main import app
+    from ..database import engine, replicas
+    from ..seed import SEED_PASSWORD
+
+    await app.router.startup()
+    ids = sample_ids()
+    counter = StatementCounter([engine, *replicas.engines])
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login = await client.post("/api/login", json={"email": ids["me_email"], "password": SEED_PASSWORD})
+        login.raise_for_status()
+        for name, build in endpoints(ids):
+            if args.only and args.only not in name:
+                continue
+            # Warm caches, the leaderboard index and SQLite's page cache first
+            await measure_timings(client, name, build, random.Random(0), 3, counter)
+            results[name] = await measure_timings(client, name, build, random.Random(args.seed), args.requests, counter)
+            results[name].update(await measure_allocations(client, build, random.Random(args.seed), args.alloc_requests))
+    await app.router.shutdown()
+    return results
+
+# ============= Reporting =============
+
+def git_sha():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_table(results):
+    print(f"{'endpoint':<42} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'alloc KB':>9}  statuses")
+    for name, r in results.items():
+        statuses = " ".join(f"{code}x{count}" for code, count in r["statuses"].items())
+        print(f"{name:<42} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} "
+              f"{r['queries_median']:8g} {r['alloc_peak_kb_median']:9.1f}  {statuses}")
+
+def print_comparison(old, new):
+    print(f"\nChange against {old['metadata'].get('git_sha')} ({old['metadata'].get('timestamp')}):")
+    print(f"{'endpoint':<42} {'p50':>9} {'p95':>9} {'queries':>9} {'alloc':>9}")
+
+    def change(key, before, after):
+        if key not in before or not before[key]:
+            return "n/a"
+        return f"{(after[key] - before[key]) / before[key] * 100:+.0f}%"
+
+    for name, after in new["endpoints"].items():
+        before = old["endpoints"].get(name)
+        if before is None:
+            print(f"{name:<42} {'new':>9}")
+            continue
+        print(f"{name:<42} {change('p50_ms', before, after):>9} {change('p95_ms', before, after):>9} "
+              f"{change('queries_median', before, after):>9} {change('alloc_peak_kb_median', before, after):>9}")
+
+def main():
+    args = parse_args()
+    # Before the app is imported: a scratch database per scale, no
+    # periodic jobs competing with the measured requests, and no rate
+    # limits turning repeated requests into 429s (bench_ratelimit measures
+    # the limiter itself)
+    os.environ.setdefault(
+        "DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/bjj_bench_endpoints_{args.users}_{args.seed}.db"
+    )
+    os.environ["BACKGROUND_JOBS_DELAY_SEC"] = str(10 ** 9)
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+    from ..database import engine
+    from ..models import User
+    from .. import migrations, seed
+    from sqlalchemy import select, func
+
+    migrations.upgrade(engine, log=lambda message: None)
+    with engine.connect() as conn:
+        seeded = conn.execute(select(func.count()).select_from(User)).scalar()
+    if not seeded:
+        print(f"Seeding {args.users} users (seed {args.seed})...", file=sys.stderr)
+        seed.seed(args.users, args.seed, log=lambda message: print(message, file=sys.stderr))
+
+    started = time.perf_counter()
+    results = asyncio.run(run(args))
+    report = {
+        "metadata": {
+            "git_sha": git_sha(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "users": args.users,
+            "seed": args.seed,
+            "requests_per_endpoint": args.requests,
+            "duration_sec": round(time.perf_counter() - started, 1),
+        },
+        "endpoints": results,
+    }
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print_table(results)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+
+    # A server error means the numbers measured a failure path
+    failing = [name for name, r in results.items() if any(code.startswith("5") for code in r["statuses"])]
+    if failing:
+        print(f"Server errors from: {', '.join(failing)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Insert throughput and index size: random UUID4 text keys vs time-ordered UUIDv7 keys.
+
+Run with: python -m BJJSocial.benchmarks.bench_ids [rows] [--batch N] [--postgres URL]
+
+Fills a likes-shaped table (primary key plus two indexed foreign key
+columns) in committed batches, the way the app inserts. Each variant gets
+a fresh SQLite file; with --postgres the same runs go to scratch tables in
+that database, plus the native uuid column type the migrations use there.
+Random keys land on random index pages, so once the index outgrows the
+cache each batch touches many pages; time-ordered keys append to the
+right-hand edge.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import create_engine, MetaData, Table, Column, String, DateTime, Index, insert, text
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+
+from ..models import uuid7
+
+def make_table(metadata, name, id_type):
+    return Table(
+        name, metadata,
+        Column("id", id_type, primary_key=True),
+        Column("post_id", id_type, nullable=False),
+        Column("user_id", id_type, nullable=False),
+        Column("created_at", DateTime),
+        Index(f"IDX_{name}_post", "post_id"),
+        Index(f"IDX_{name}_user", "user_id"),
+    )
+
+def rows(count, new_id, parents):
+    """Likes arriving in time order, on existing posts by existing users"""
+    rng = random.Random(7)
+    started_ms = 1_700_000_000_000
+    for i in range(count):
+        yield {
+            "id": new_id(started_ms + i),
+            "post_id": rng.choice(parents),
+            "user_id": rng.choice(parents),
+            "created_at": None,
+        }
+
+def fill(engine, table, count, batch, new_id):
+    parents = [new_id(1_600_000_000_000 + i) for i in range(10_000)]
+    pending = list(rows(count, new_id, parents))
+    started = time.perf_counter()
+    for start in range(0, count, batch):
+        with engine.begin() as conn:
+            conn.execute(insert(table), pending[start:start + batch])
+    return time.perf_counter() - started
+
+def sqlite_sizes(engine, table):
+    """Bytes per b-tree (table and each index) from the dbstat virtual table, when compiled in"""
+    with engine.connect() as conn:
+        try:
+            return dict(conn.execute(text(
+                "SELECT name, SUM(pgsize) FROM dbstat WHERE name = :t OR tbl_name = :t GROUP BY name"
+            ).bindparams(t=table.name)).all())
+        except Exception:
+            page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+            return {"file": conn.exec_driver_sql("PRAGMA page_count").scalar() * page_size}
+
+def postgres_sizes(engine, table):
+    with engine.connect() as conn:
+        return dict(conn.execute(text(
+            "SELECT c.relname, pg_relation_size(c.oid) FROM pg_class c "
+            "WHERE c.relname = :t OR c.oid IN (SELECT indexrelid FROM pg_index WHERE indrelid = CAST(:t AS regclass))"
+        ).bindparams(t=table.name)).all())
+
+VARIANTS = (
+    ("uuid4 text", String, lambda ms: str(uuid.uuid4())),
+    ("uuid7 text", String, lambda ms: str(uuid7(ms))),
+)
+POSTGRES_VARIANTS = VARIANTS + (
+    ("uuid7 uuid", PGUUID(as_uuid=False), lambda ms: str(uuid7(ms))),
+)
+
+def report(name, count, elapsed, sizes):
+    total = sum(sizes.values())
+    detail = ", ".join(f"{key} {value / 1024 / 1024:.1f} MB" for key, value in sorted(sizes.items()))
+    print(f"{name:<12} {count / elapsed:10.0f} rows/s   {total / 1024 / 1024:7.1f} MB  ({detail})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", nargs="?", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=500, help="Rows per committed transaction")
+    parser.add_argument("--postgres", help="Postgres URL for scratch bench_ids_* tables")
+    args = parser.parse_args()
+
+    print(f"SQLite, {args.rows} rows in batches of {args.batch}:")
+    for name, id_type, new_id in VARIANTS:
+        path = os.path.join(tempfile.mkdtemp(), "bench_ids.db")
+        engine = create_engine(f"sqlite:///{path}")
+        metadata = MetaData()
+        table = make_table(metadata, "likes", id_type)
+        metadata.create_all(engine)
+        elapsed = fill(engine, table, args.rows, args.batch, new_id)
+        report(name, args.rows, elapsed, sqlite_sizes(engine, table))
+        engine.dispose()
+        os.remove(path)
+
+    if args.postgres:
+        print(f"\nPostgres, {args.rows} rows in batches of {args.batch}:")
+        engine = create_engine(args.postgres)
+        for index, (name, id_type, new_id) in enumerate(POSTGRES_VARIANTS):
+            metadata = MetaData()
+            table = make_table(metadata, f"bench_ids_{index}", id_type)
+            metadata.drop_all(engine)
+            metadata.create_all(engine)
+            try:
+                elapsed = fill(engine, table, args.rows, args.batch, new_id)
+                with engine.connect() as conn:
+                    conn.execute(text(f"ANALYZE {table.name}"))
+                report(name, args.rows, elapsed, postgres_sizes(engine, table))
+            finally:
+                metadata.drop_all(engine)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Per-request overhead of RateLimitMiddleware with the in-memory store.
+
+Run with: python -m BJJSocial.benchmarks.bench_ratelimit [requests] [--callers N]
+
+Calls the middleware directly around a do-nothing app, so the numbers are
+the limiter's own cost: an unlimited path, a limited path that is allowed,
+and one that is rejected with 429. Overhead is the time per request minus
+the same request to the bare app. The budget is 50 us.
+"""
+import argparse
+import asyncio
+import time
+
+from ..ratelimit import MemoryStore, RatePolicy, RateLimitMiddleware
+
+async def bare_app(scope, receive, send):
+    pass
+
+async def discard(message):
+    pass
+
+def make_scopes(path, callers, signed_in):
+    scopes = []
+    for i in range(callers):
+        scopes.append({
+            "type": "http", "method": "GET", "path": path,
+            "headers": [(b"host", b"bench"), (b"user-agent", b"bench"), (b"accept", b"*/*")],
+            "client": (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 40000),
+            "session": {"user_id": f"user-{i}"} if signed_in else {},
+        })
+    return scopes
+
+async def per_request_us(app, scopes, count):
+    started = time.perf_counter()
+    for i in range(count):
+        await app(scopes[i % len(scopes)], None, discard)
+    return (time.perf_counter() - started) / count * 1e6
+
+async def run(args):
+    roomy = [RatePolicy("roomy", ("/api/search",), f"{10 ** 9}/1")]
+    tight = [RatePolicy("tight", ("/api/search",), "1/3600")]
+    cases = (
+        ("unlimited path", roomy, "/api/posts", False),
+        ("allowed, signed in", roomy, "/api/search", True),
+        ("allowed, by address", roomy, "/api/search", False),
+        ("rejected (429)", tight, "/api/search", False),
+    )
+    bare = await per_request_us(bare_app, make_scopes("/api/search", args.callers, False), args.requests)
+    print(f"{'bare app':>22}: {bare:6.2f} us/request")
+    for name, policies, path, signed_in in cases:
+        app = RateLimitMiddleware(bare_app, policies=policies, store=MemoryStore(), enabled=True)
+        scopes = make_scopes(path, args.callers, signed_in)
+        await per_request_us(app, scopes, len(scopes))  # create every bucket first
+        elapsed = await per_request_us(app, scopes, args.requests)
+        print(f"{name:>22}: {elapsed:6.2f} us/request, overhead {elapsed - bare:6.2f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("requests", type=int, nargs="?", default=200000)
+    parser.add_argument("--callers", type=int, default=10000, help="Distinct users or addresses")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
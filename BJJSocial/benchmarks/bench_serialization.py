@@ -0,0 +1,101 @@
+"""Per-row serialization cost: hand-built dicts + jsonable_encoder vs compiled serializers + orjson.
+
+Run with: python -m BJJSocial.benchmarks.bench_serialization [rows]
+"""
+import json
+import sys
+import timeit
+from datetime import datetime
+from types import SimpleNamespace
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from ..serializers import serialize_match
+
+def make_user(i):
+    now = datetime(2025, 3, 1, 12, 30, 15, 123456)
+    return SimpleNamespace(
+        id=f"user-{i}", email=f"athlete{i}@example.com", password="$2b$12$" + "x" * 53,
+        first_name="Athlete", last_name=str(i), profile_image_url=None, belt="Blue",
+        stripes=2, weight="76", weight_class="Light", school="Gracie Barra",
+        instructor="Professor", years_training="4", competitions=12, wins=8, losses=4,
+        bio="Guard player", location="Austin, TX", age_division="Adult", gender="Male",
+        followers_count=10, following_count=20, posts_count=3, created_at=now, updated_at=now,
+    )
+
+def make_match(i, comp_a, comp_b):
+    return SimpleNamespace(
+        id=f"match-{i}", tournament_id="t-1", round="Final", belt="Blue", weight_class="Light",
+        age_division="Adult", gender="Male", competitor_a_id=comp_a.id, competitor_b_id=comp_b.id,
+        winner_id=comp_a.id, method="Submission", submission_type="Armbar", points_a=4, points_b=2,
+        advantages_a=1, advantages_b=0, penalties_a=0, penalties_b=1, duration_sec=312,
+        result_final=True, awarded_winner_pts=9, awarded_loser_pts=3,
+        created_at=datetime(2025, 3, 1, 14, 0, 0),
+    )
+
+def legacy_sanitize_user(user):
+    data = {key: value for key, value in vars(user).items() if key != "password"}
+    data["created_at"] = user.created_at.isoformat()
+    data["updated_at"] = user.updated_at.isoformat()
+    return data
+
+def legacy_match(match, comp_a, comp_b, winner):
+    # Mirrors the dicts previously built inline in get_tournament_matches
+    return {
+        "id": match.id,
+        "tournamentId": match.tournament_id,
+        "round": match.round,
+        "belt": match.belt,
+        "weightClass": match.weight_class,
+        "ageDivision": match.age_division,
+        "gender": match.gender,
+        "competitorAId": match.competitor_a_id,
+        "competitorBId": match.competitor_b_id,
+        "winnerId": match.winner_id,
+        "method": match.method,
+        "submissionType": match.submission_type,
+        "pointsA": match.points_a,
+        "pointsB": match.points_b,
+        "advantagesA": match.advantages_a,
+        "advantagesB": match.advantages_b,
+        "penaltiesA": match.penalties_a,
+        "penaltiesB": match.penalties_b,
+        "durationSec": match.duration_sec,
+        "resultFinal": match.result_final,
+        "awardedWinnerPts": match.awarded_winner_pts,
+        "awardedLoserPts": match.awarded_loser_pts,
+        "createdAt": match.created_at.isoformat(),
+        "competitorA": legacy_sanitize_user(comp_a) if comp_a else None,
+        "competitorB": legacy_sanitize_user(comp_b) if comp_b else None,
+        "winner": legacy_sanitize_user(winner) if winner else None
+    }
+
+def before(rows):
+    content = [legacy_match(m, a, b, a) for m, a, b in rows]
+    # Starlette's JSONResponse.render after FastAPI's jsonable_encoder pass
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+def after(rows):
+    content = [serialize_match(m, a, b, a) for m, a, b in rows]
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rows = []
+    for i in range(count):
+        comp_a, comp_b = make_user(2 * i), make_user(2 * i + 1)
+        rows.append((make_match(i, comp_a, comp_b), comp_a, comp_b))
+
+    repeat = 5
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        best = min(timeit.repeat(lambda: fn(rows), number=1, repeat=repeat))
+        results[name] = best / count * 1e6
+        print(f"{name:>7}: {results[name]:8.2f} us/row  ({len(fn(rows)):,} bytes for {count} rows)")
+    print(f"speedup: {results['before'] / results['after']:.1f}x")
+
+if __name__ == "__main__":
+    main()
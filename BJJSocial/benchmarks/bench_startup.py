@@ -0,0 +1,118 @@
+"""Cold start: import time by module and time-to-first-request, each in a fresh interpreter.
+
+Run with: python -m BJJSocial.benchmarks.bench_startup [--runs N] [--json]
+
+Every run starts a new process, imports BJJSocial.main, runs the startup
+handlers and serves GET /health through the ASGI interface (no server, no
+network). A separate ``python -X importtime`` run attributes import time
+to the slowest modules. --json prints one object for CI to record.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Runs in the child interpreter; prints phase timings as JSON
+_CHILD = r"""
+import asyncio, json, time
+started = time.perf_counter()
+from BJJSocial.main import app
+imported = time.perf_counter()
+
+async def first_request():
+    await app.router.startup()
+    ready = time.perf_counter()
+    status = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/health", "raw_path": b"/health", "root_path": "",
+        "query_string": b"", "headers": [], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    return ready, status[0]
+
+ready, status = asyncio.run(first_request())
+served = time.perf_counter()
+print(json.dumps({
+    "status": status,
+    "import_sec": imported - started,
+    "startup_sec": ready - imported,
+    "first_request_sec": served - ready,
+    "time_to_first_request_sec": served - started,
+}))
+"""
+
+def run_child(env):
+    started = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    timings = json.loads(out.strip().splitlines()[-1])
+    timings["process_sec"] = time.perf_counter() - started
+    return timings
+
+def import_profile(env, top):
+    """Slowest modules by cumulative import time, from -X importtime"""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import BJJSocial.main"],
+        env=env, capture_output=True, text=True, check=True
+    ).stderr
+    modules = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        if self_us.isdigit():
+            modules.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    total = next((m["cumulative_ms"] for m in modules if m["module"] == "BJJSocial.main"), None)
+    modules.sort(key=lambda m: m["cumulative_ms"], reverse=True)
+    return total, modules[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Modules to list from -X importtime")
+    parser.add_argument("--json", action="store_true", help="Print a single JSON object")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", f"sqlite:///{tempfile.gettempdir()}/bjj_bench_startup.db")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+
+    # Warm-up: applies migrations to the scratch database and fills the OS
+    # file cache so runs measure the app, not the disk
+    run_child(env)
+    runs = [run_child(env) for _ in range(args.runs)]
+    import_total_ms, modules = import_profile(env, args.top)
+
+    summary = {
+        key: statistics.median(run[key] for run in runs)
+        for key in ("import_sec", "startup_sec", "first_request_sec", "time_to_first_request_sec", "process_sec")
+    }
+    result = {
+        "runs": args.runs,
+        "median": summary,
+        "importtime_main_ms": import_total_ms,
+        "slowest_imports": modules,
+    }
+    if args.json:
+        print(json.dumps(result))
+        return
+
+    for key, value in summary.items():
+        print(f"{key:>26}: {value * 1000:8.1f} ms")
+    print(f"\nSlowest imports (cumulative, BJJSocial.main = {import_total_ms} ms):")
+    for module in modules:
+        print(f"  {module['cumulative_ms']:8.1f} ms  {module['module']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import os
+from sqlalchemy import select, update, func, bindparam
+
+from .database import get_db_context
+from .models import User, Post, Follow, Like, Notification
+
+# Denormalized counters (followers_count, posts.likes, ...) are kept up to
+# date by the write paths in the same transaction as the change. A bug or a
+# manual data fix can still leave one off, so a daily job recounts them and
+# corrects only the rows that differ. users.posts_count is not recounted:
+# it includes posts archived out of the live table (see partitions.py).
+
+COUNTER_RECONCILE_INTERVAL_SEC = float(os.getenv("COUNTER_RECONCILE_INTERVAL_SEC", "86400"))
+
+def _counted(db, key_column, *where):
+    return dict(db.execute(select(key_column, func.count()).where(*where).group_by(key_column)).all())
+
+def _reconcile(db, table, column, counted_fn):
+    """Correct ``table.column`` to ``counted_fn()`` (id -> count) where it differs; returns rows fixed
+
+    Values are read before the counts and the fix is a compare-and-set on
+    the value read, so a like or follow committed in between makes the
+    row's fix miss rather than overwrite the newer value.
+    """
+    seen = dict(db.execute(select(table.c.id, table.c[column])).all())
+    counted = counted_fn()
+    fixes = [
+        {"row_id": row_id, "seen": value or 0, "value": counted.get(row_id, 0)}
+        for row_id, value in seen.items()
+        if (value or 0) != counted.get(row_id, 0)
+    ]
+    if fixes:
+        db.execute(
+            update(table)
+            .where(table.c.id == bindparam("row_id"), func.coalesce(table.c[column], 0) == bindparam("seen"))
+            .values({column: bindparam("value")}),
+            fixes
+        )
+    db.commit()
+    return len(fixes)
+
+def reconcile(db):
+    """Recount every maintained counter; returns {counter: rows fixed}"""
+    users, posts = User.__table__, Post.__table__
+    return {
+        "users.followers_count": _reconcile(
+            db, users, "followers_count", lambda: _counted(db, Follow.following_id)
+        ),
+        "users.following_count": _reconcile(
+            db, users, "following_count", lambda: _counted(db, Follow.follower_id)
+        ),
+        "users.unread_notifications": _reconcile(
+            db, users, "unread_notifications",
+            lambda: _counted(db, Notification.user_id, Notification.read_at.is_(None))
+        ),
+        "posts.likes": _reconcile(db, posts, "likes", lambda: _counted(db, Like.post_id)),
+    }
+
+if __name__ == "__main__":
+    with get_db_context() as db:
+        for counter, fixed in reconcile(db).items():
+            print(f"{counter}: {fixed} fixed")
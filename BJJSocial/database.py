@@ -1,7 +1,13 @@
 import os
-from sqlalchemy import create_engine
+import time
+import threading
+import itertools
+from fastapi import Request
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool, NullPool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
 from contextlib import contextmanager
 
 # Database URL from environment.
@@ -15,26 +21,319 @@ if not DATABASE_URL:
 else:
     _use_sqlite = DATABASE_URL.startswith("sqlite")
 
+# Pool settings. Every Cloud Run instance holds up to
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connections, so keep these small when
+# running many instances against one Postgres.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# Pre-ping strategy:
+#   "always" - round trip on every checkout (SQLAlchemy's pool_pre_ping)
+#   "idle"   - only ping connections idle longer than DB_PRE_PING_IDLE_SEC
+#   "never"  - rely on DB_POOL_RECYCLE and retry on disconnect errors
+DB_PRE_PING = os.getenv("DB_PRE_PING", "idle")
+DB_PRE_PING_IDLE_SEC = float(os.getenv("DB_PRE_PING_IDLE_SEC", "30"))
+
+# Size of SQLAlchemy's compiled statement cache (per engine).
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# "session" keeps a client-side QueuePool. "transaction" is for running
+# behind PgBouncer in transaction pooling mode: PgBouncer owns the pooling,
+# so connections are not held between requests and server-side prepared
+# statements are disabled (they do not survive a server switch).
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "session")
+
+# Comma-separated read replica URLs. When empty, reads use the primary.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+# After a request writes, reads from the same browser session stay on the
+# primary for this long so users see their own writes despite replica lag.
+DB_READ_YOUR_WRITES_SEC = float(os.getenv("DB_READ_YOUR_WRITES_SEC", "5"))
+
+# How often a replica is re-checked with SELECT 1 (healthy or not).
+DB_REPLICA_CHECK_INTERVAL_SEC = float(os.getenv("DB_REPLICA_CHECK_INTERVAL_SEC", "10"))
+
+class PoolStats:
+    """Counters for checkouts on one engine's pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.pings = 0
+        self.ping_failures = 0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_ping(self, failed=False):
+        with self._lock:
+            self.pings += 1
+            if failed:
+                self.ping_failures += 1
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - started)
+
+def _install_idle_ping(engine):
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < DB_PRE_PING_IDLE_SEC:
+            return
+        stats = getattr(engine.pool, "stats", None)
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("SELECT 1")
+        except Exception:
+            if stats:
+                stats.record_ping(failed=True)
+            # Tells the pool to discard this connection and retry with a new one
+            raise exc.DisconnectionError()
+        finally:
+            cursor.close()
+        if stats:
+            stats.record_ping()
+
+def _count_connects(engine):
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        stats = getattr(engine.pool, "stats", None)
+        if stats:
+            stats.record_connect()
+
+def make_engine(url):
+    """Create an engine for ``url`` using the DB_* pool settings"""
+    if url.startswith("sqlite"):
+        pool_args = {}
+        if make_url(url).database not in (None, "", ":memory:"):
+            pool_args = dict(
+                poolclass=InstrumentedQueuePool,
+                pool_size=DB_POOL_SIZE,
+                max_overflow=DB_MAX_OVERFLOW,
+                pool_timeout=DB_POOL_TIMEOUT,
+            )
+        engine = create_engine(
+            url,
+            connect_args={"check_same_thread": False},
+            query_cache_size=DB_STATEMENT_CACHE_SIZE,
+            **pool_args,
+        )
+        _count_connects(engine)
+        return engine
+
+    connect_args = {}
+    if DB_POOL_MODE == "transaction":
+        if make_url(url).get_driver_name() == "psycopg":
+            # psycopg 3 prepares statements server-side after a few executions
+            connect_args["prepare_threshold"] = None
+        return create_engine(
+            url,
+            poolclass=NullPool,
+            connect_args=connect_args,
+            query_cache_size=DB_STATEMENT_CACHE_SIZE,
+        )
+
+    engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_PRE_PING == "always",
+        pool_use_lifo=True,
+        connect_args=connect_args,
+        query_cache_size=DB_STATEMENT_CACHE_SIZE,
+    )
+    if DB_PRE_PING == "idle":
+        _install_idle_ping(engine)
+    _count_connects(engine)
+    return engine
+
+def pool_status(engine):
+    """Snapshot of an engine's pool for the /metrics endpoint"""
+    pool = engine.pool
+    status = {"mode": DB_POOL_MODE}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            checked_in=pool.checkedin(),
+            # QueuePool.overflow() starts at -pool_size; clamp to connections opened past pool_size
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    stats = getattr(pool, "stats", None)
+    if stats:
+        status.update(
+            checkouts=stats.checkouts,
+            wait_seconds_total=stats.wait_seconds_total,
+            wait_seconds_max=stats.wait_seconds_max,
+            timeouts=stats.timeouts,
+            connects=stats.connects,
+            pings=stats.pings,
+            ping_failures=stats.ping_failures,
+        )
+    return status
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping ones that fail a health check"""
+
+    def __init__(self, engines):
+        self.engines = engines
+        self.healthy = [True] * len(engines)
+        self._checked_at = [0.0] * len(engines)
+        self._counter = itertools.count()
+
+    def _is_healthy(self, index):
+        now = time.monotonic()
+        if now - self._checked_at[index] < DB_REPLICA_CHECK_INTERVAL_SEC:
+            return self.healthy[index]
+        self._checked_at[index] = now
+        try:
+            with self.engines[index].connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+            self.healthy[index] = True
+        except exc.DBAPIError:
+            self.healthy[index] = False
+        return self.healthy[index]
+
+    def pick(self):
+        """Next healthy replica engine, or None if there is none"""
+        count = len(self.engines)
+        start = next(self._counter)
+        for offset in range(count):
+            index = (start + offset) % count
+            if self._is_healthy(index):
+                return self.engines[index]
+        return None
+
+    def mark_down(self, engine):
+        """Take a replica out of rotation until its next health check"""
+        for index, candidate in enumerate(self.engines):
+            if candidate is engine:
+                self.healthy[index] = False
+                self._checked_at[index] = time.monotonic()
+
+class RoutingSession(Session):
+    """Session that reads from a replica but always flushes to the primary
+
+    The replica is chosen when the session is opened (see get_read_db); once
+    the session has flushed anything, later statements also go to the
+    primary so the request reads its own writes.
+    """
+
+    replica = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is None or self._flushing or self.info.get("wrote"):
+            return engine
+        if clause is not None and getattr(clause, "is_dml", False):
+            return engine
+        return self.replica
+
 # Create SQLAlchemy engine.
-if _use_sqlite:
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, pool_pre_ping=True)
-else:
-    engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+engine = make_engine(DATABASE_URL)
+replicas = ReplicaSet([make_engine(url) for url in DATABASE_REPLICA_URLS])
 
-# Session factory
+# Session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
 
 # Base class for models
 Base = declarative_base()
 
+@event.listens_for(Session, "after_flush")
+def _record_write(session, flush_context):
+    session.info["wrote"] = True
+    request = session.info.get("request")
+    if request is not None and "session" in request.scope:
+        # Each change rewrites the sessions row, so a burst of writes
+        # restamps only once half the window has gone by
+        now = time.time()
+        wrote_at = request.session.get("db_write_at")
+        if wrote_at is None or now - wrote_at >= DB_READ_YOUR_WRITES_SEC / 2:
+            request.session["db_write_at"] = now
+
+def recently_wrote(request):
+    """True if this browser session wrote within DB_READ_YOUR_WRITES_SEC"""
+    if "session" not in request.scope:
+        return False
+    wrote_at = request.session.get("db_write_at")
+    return wrote_at is not None and time.time() - wrote_at < DB_READ_YOUR_WRITES_SEC
+
 # Dependency for FastAPI routes
-def get_db():
+def get_db(request: Request):
     db = SessionLocal()
+    db.info["request"] = request
     try:
         yield db
     finally:
         db.close()
 
+# Read-only session: a replica unless there are none, they are all
+# unhealthy, or this browser session wrote within DB_READ_YOUR_WRITES_SEC.
+@contextmanager
+def read_session(request=None):
+    db = ReadSessionLocal()
+    db.info["request"] = request
+    if replicas.engines and not (request is not None and recently_wrote(request)):
+        db.replica = replicas.pick()
+    try:
+        yield db
+    except exc.OperationalError:
+        if db.replica is not None:
+            replicas.mark_down(db.replica)
+        raise
+    finally:
+        db.close()
+
+# Dependency for read-only routes
+def get_read_db(request: Request):
+    with read_session(request) as db:
+        yield db
+
 @contextmanager
 def get_db_context():
     db = SessionLocal()
@@ -0,0 +1,75 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+
+from .models import User, Follow, Tournament, USER_CARD_COLUMNS
+
+# Read path for large list endpoints: Core select() statements mapped straight
+# into slotted dataclasses. No identity map, no instrumentation and no
+# per-instance __dict__, so a page of rows costs a tuple and a small object
+# each. The compiled serializers read these by attribute like ORM rows.
+
+@dataclass(slots=True)
+class UserCard:
+    id: str
+    first_name: Optional[str]
+    last_name: Optional[str]
+    belt: Optional[str]
+    stripes: Optional[int]
+    school: Optional[str]
+
+@dataclass(slots=True)
+class TournamentRow:
+    id: str
+    name: str
+    date: datetime
+    location: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    is_gi: bool
+    ruleset: str
+    tier: str
+    organizer_id: str
+    created_at: datetime
+
+TOURNAMENT_COLUMNS = (
+    Tournament.id,
+    Tournament.name,
+    Tournament.date,
+    Tournament.location,
+    Tournament.latitude,
+    Tournament.longitude,
+    Tournament.is_gi,
+    Tournament.ruleset,
+    Tournament.tier,
+    Tournament.organizer_id,
+    Tournament.created_at,
+)
+
+def tournaments_select():
+    return select(*TOURNAMENT_COLUMNS)
+
+def follower_cards_select(user_id):
+    """Cards of the users following ``user_id``, newest follow first"""
+    return (
+        select(*USER_CARD_COLUMNS)
+        .join(Follow, Follow.follower_id == User.id)
+        .where(Follow.following_id == user_id)
+        .order_by(Follow.created_at.desc(), Follow.id)
+    )
+
+def following_cards_select(user_id):
+    """Cards of the users ``user_id`` follows, newest follow first"""
+    return (
+        select(*USER_CARD_COLUMNS)
+        .join(Follow, Follow.following_id == User.id)
+        .where(Follow.follower_id == user_id)
+        .order_by(Follow.created_at.desc(), Follow.id)
+    )
+
+def fetch_tournaments(db, stmt):
+    return [TournamentRow(*row) for row in db.execute(stmt)]
+
+def fetch_user_cards(db, stmt):
+    return [UserCard(*row) for row in db.execute(stmt)]
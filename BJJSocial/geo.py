@@ -0,0 +1,306 @@
+import argparse
+import csv
+import math
+import os
+import threading
+from sqlalchemy import event, inspect, or_, and_, select, update
+from sqlalchemy.orm import Session
+
+from .lookups import normalize_key
+
+# Geographic search over free-text locations. A location string ("Austin,
+# TX", "Rio de Janeiro, Brazil") is resolved to coordinates against a
+# gazetteer bundled with the app (data/gazetteer.csv; no network calls),
+# and stored with a geohash. Geohashes that share a prefix lie in the same
+# cell, so the plain B-tree index on the geohash column answers "what is in
+# these cells" as a few index range scans on SQLite and Postgres alike:
+# a radius or k-nearest search reads the 3x3 block of cells around the
+# center at a size that covers the radius, then filters by exact distance.
+#
+# Models with latitude/longitude/geohash columns are geocoded whenever a
+# flush writes their location (see the hook at the bottom); rows written
+# before the columns existed are filled in by `python -m BJJSocial.geo backfill`.
+
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "gazetteer.csv"))
+
+# Stored geohash length: 9 characters is a ~5 m cell, far finer than a
+# city-level gazetteer needs, so searches never run out of precision
+GEOHASH_PRECISION = 9
+
+# k-nearest searches start with cells of this length (~5 km) and widen
+KNN_START_PRECISION = 5
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {char: index for index, char in enumerate(_BASE32)}
+
+US_STATES = {
+    "alabama": "AL", "alaska": "AK", "arizona": "AZ", "arkansas": "AR", "california": "CA",
+    "colorado": "CO", "connecticut": "CT", "delaware": "DE", "districtofcolumbia": "DC",
+    "florida": "FL", "georgia": "GA", "hawaii": "HI", "idaho": "ID", "illinois": "IL",
+    "indiana": "IN", "iowa": "IA", "kansas": "KS", "kentucky": "KY", "louisiana": "LA",
+    "maine": "ME", "maryland": "MD", "massachusetts": "MA", "michigan": "MI", "minnesota": "MN",
+    "mississippi": "MS", "missouri": "MO", "montana": "MT", "nebraska": "NE", "nevada": "NV",
+    "newhampshire": "NH", "newjersey": "NJ", "newmexico": "NM", "newyork": "NY",
+    "northcarolina": "NC", "northdakota": "ND", "ohio": "OH", "oklahoma": "OK", "oregon": "OR",
+    "pennsylvania": "PA", "rhodeisland": "RI", "southcarolina": "SC", "southdakota": "SD",
+    "tennessee": "TN", "texas": "TX", "utah": "UT", "vermont": "VT", "virginia": "VA",
+    "washington": "WA", "westvirginia": "WV", "wisconsin": "WI", "wyoming": "WY",
+}
+
+COUNTRIES = {
+    "usa": "US", "unitedstates": "US", "unitedstatesofamerica": "US", "america": "US",
+    "brazil": "BR", "brasil": "BR", "portugal": "PT", "spain": "ES", "unitedkingdom": "GB",
+    "uk": "GB", "england": "GB", "ireland": "IE", "france": "FR", "germany": "DE",
+    "netherlands": "NL", "italy": "IT", "sweden": "SE", "norway": "NO", "denmark": "DK",
+    "finland": "FI", "poland": "PL", "greece": "GR", "turkey": "TR", "russia": "RU",
+    "uae": "AE", "unitedarabemirates": "AE", "japan": "JP", "southkorea": "KR", "korea": "KR",
+    "singapore": "SG", "philippines": "PH", "thailand": "TH", "indonesia": "ID",
+    "australia": "AU", "newzealand": "NZ", "canada": "CA", "mexico": "MX", "colombia": "CO",
+    "peru": "PE", "chile": "CL", "argentina": "AR", "uruguay": "UY", "southafrica": "ZA",
+    "israel": "IL",
+}
+
+# ============= Gazetteer =============
+
+class Gazetteer:
+    """Place names -> coordinates, loaded from GAZETTEER_PATH on first use"""
+
+    def __init__(self, path=GAZETTEER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._by_name = None
+
+    def _load(self):
+        by_name = {}
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                by_name.setdefault(normalize_key(row["name"]), []).append((
+                    normalize_key(row["region"]), normalize_key(row["country"]),
+                    float(row["latitude"]), float(row["longitude"]), int(row["population"] or 0),
+                ))
+        # Most populous first, so an unqualified "Portland" is Oregon's
+        for places in by_name.values():
+            places.sort(key=lambda place: -place[4])
+        return by_name
+
+    def places(self, name):
+        if self._by_name is None:
+            with self._lock:
+                if self._by_name is None:
+                    self._by_name = self._load()
+        return self._by_name.get(name, ())
+
+    def geocode(self, location):
+        """(latitude, longitude) of "City[, region][, country]", or None if it is not in the gazetteer"""
+        if not location:
+            return None
+        name, *qualifiers = [normalize_key(part) for part in location.split(",")]
+        qualifiers = [
+            normalize_key(US_STATES.get(q) or COUNTRIES.get(q) or q) for q in qualifiers if q
+        ]
+        for region, country, latitude, longitude, _ in self.places(name):
+            if all(q in (region, country) for q in qualifiers):
+                return latitude, longitude
+        return None
+
+gazetteer = Gazetteer()
+
+def geocode(location):
+    return gazetteer.geocode(location)
+
+# ============= Geohash =============
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def cell_size(precision):
+    """(height, width) in degrees of a geohash cell of ``precision`` characters"""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi, d_lambda = phi2 - phi1, math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def covered_radius_km(latitude, precision):
+    """Distance from a point that the 3x3 block of cells around it is guaranteed to cover"""
+    height, width = cell_size(precision)
+    # Cells narrow towards the poles: use the block's most poleward edge
+    edge = min(abs(latitude) + 2 * height, 90.0)
+    return min(height * KM_PER_DEGREE, width * KM_PER_DEGREE * math.cos(math.radians(edge)))
+
+def neighbor_cells(latitude, longitude, precision):
+    """Geohash prefixes of the cell containing the point and its (up to) 8 neighbors"""
+    height, width = cell_size(precision)
+    cells = set()
+    for d_lat in (-height, 0.0, height):
+        lat = latitude + d_lat
+        if not -90.0 <= lat <= 90.0:
+            continue
+        for d_lon in (-width, 0.0, width):
+            lon = (longitude + d_lon + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(lat, lon, precision))
+    return sorted(cells)
+
+def _prefix_end(prefix):
+    """Smallest geohash sorting after every string starting with ``prefix`` (None: no bound)"""
+    chars = list(prefix)
+    while chars:
+        index = _BASE32_INDEX[chars[-1]]
+        if index + 1 < len(_BASE32):
+            chars[-1] = _BASE32[index + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+def cells_predicate(column, cells):
+    """``column`` starts with one of ``cells``, as index range scans
+
+    Bounds use the next geohash character rather than LIKE 'prefix%', which
+    Postgres can only index under the C collation.
+    """
+    ranges = []
+    for cell in cells:
+        end = _prefix_end(cell)
+        ranges.append(column >= cell if end is None else and_(column >= cell, column < end))
+    return or_(*ranges)
+
+# ============= Search =============
+
+def nearest(fetch, latitude, longitude, limit, radius_km=None, key=None):
+    """Rows nearest to a point, as [(distance km, row)] closest first
+
+    ``fetch(cells)`` returns candidate rows (with ``latitude`` and
+    ``longitude``) whose geohash starts with one of ``cells``; ``cells`` is
+    None for an unbounded read. With ``radius_km``, rows within it; without,
+    the ``limit`` nearest. ``key`` collapses rows for the same entity (the
+    nearest one is kept).
+    """
+    def rank(rows, within):
+        hits, seen = [], set()
+        scored = sorted(
+            ((haversine_km(latitude, longitude, row.latitude, row.longitude), row) for row in rows),
+            key=lambda hit: hit[0]
+        )
+        for distance, row in scored:
+            if within is not None and distance > within:
+                break
+            if key is not None:
+                if key(row) in seen:
+                    continue
+                seen.add(key(row))
+            hits.append((distance, row))
+        return hits
+
+    start = GEOHASH_PRECISION if radius_km is not None else KNN_START_PRECISION
+    for precision in range(start, 0, -1):
+        covered = covered_radius_km(latitude, precision)
+        if radius_km is not None:
+            # The finest cells whose block still covers the whole radius
+            if covered < radius_km:
+                continue
+            return rank(fetch(neighbor_cells(latitude, longitude, precision)), radius_km)[:limit]
+        hits = rank(fetch(neighbor_cells(latitude, longitude, precision)), covered)
+        if len(hits) >= limit:
+            return hits[:limit]
+    return rank(fetch(None), radius_km)[:limit]
+
+def center(latitude=None, longitude=None, near=None):
+    """Search center from explicit coordinates or a place name; ValueError says what is wrong"""
+    if latitude is not None and longitude is not None:
+        return latitude, longitude
+    if latitude is not None or longitude is not None:
+        raise ValueError("lat and lon must be given together")
+    if not near:
+        raise ValueError("Give lat and lon, or near")
+    point = geocode(near)
+    if point is None:
+        raise ValueError(f"Unknown place: {near}")
+    return point
+
+# ============= ORM Hook =============
+
+def _has_geo_columns(obj):
+    columns = obj.__mapper__.columns
+    return "location" in columns and "geohash" in columns
+
+def apply_location(obj):
+    """Set latitude/longitude/geohash from ``obj.location`` (cleared if it is not in the gazetteer)"""
+    point = geocode(obj.location)
+    if point is None:
+        obj.latitude = obj.longitude = obj.geohash = None
+    else:
+        obj.latitude, obj.longitude = point
+        obj.geohash = encode_geohash(*point)
+
+@event.listens_for(Session, "before_flush")
+def _geocode_locations(session, flush_context, instances):
+    for obj in session.new:
+        if _has_geo_columns(obj) and obj.location is not None:
+            apply_location(obj)
+    for obj in session.dirty:
+        if _has_geo_columns(obj) and inspect(obj).attrs.location.history.has_changes():
+            apply_location(obj)
+
+# ============= Backfill =============
+
+def backfill(conn, table):
+    """Geocode rows of a model ``table`` that have a location but no geohash; returns how many matched"""
+    # Locations repeat heavily (a city per row), so one UPDATE per distinct spelling
+    locations = conn.execute(
+        select(table.c.location).where(table.c.location.isnot(None), table.c.geohash.is_(None)).distinct()
+    ).scalars().all()
+    matched = 0
+    for location in locations:
+        point = geocode(location)
+        if point is None:
+            continue
+        matched += conn.execute(
+            update(table)
+            .where(table.c.location == location, table.c.geohash.is_(None))
+            .values(latitude=point[0], longitude=point[1], geohash=encode_geohash(*point))
+        ).rowcount
+    return matched
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocoding against the bundled gazetteer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill", help="Geocode users and tournaments written before geocoding existed")
+    lookup = commands.add_parser("geocode", help="Resolve one location string")
+    lookup.add_argument("location")
+    args = parser.parse_args()
+
+    if args.command == "geocode":
+        point = geocode(args.location)
+        print("not in gazetteer" if point is None else f"{point[0]:.4f}, {point[1]:.4f}  {encode_geohash(*point)}")
+        return
+    from .database import engine
+    from .models import User, Tournament
+    for model in (User, Tournament):
+        with engine.begin() as conn:
+            print(f"{model.__tablename__}: geocoded {backfill(conn, model.__table__)} rows")
+
+if __name__ == "__main__":
+    main()
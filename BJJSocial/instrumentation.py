@@ -0,0 +1,227 @@
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import event
+
+from .database import engine, replicas
+from . import metrics
+
+# Per-request timing: wall time, SQL statement count and time, and time
+# spent rendering the response body, exported as Prometheus histograms per
+# route template. The current request's counters live in a contextvar,
+# which run_in_threadpool copies into worker threads, so statements run
+# from sync code and threadpool sections are attributed to the request.
+
+# A request that runs one statement more than this many times is logged
+# and counted as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+# Profiling is opt-in: a random fraction of requests, and/or requests whose
+# X-Profile header equals PROFILE_TOKEN (unset disables the header).
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+PROFILE_TOP_FUNCTIONS = 30
+
+logger = logging.getLogger("bjjsocial.instrumentation")
+
+REQUEST_DURATION = metrics.register(metrics.Histogram(
+    "bjj_http_request_duration_seconds", "Request wall time", ("method", "route")
+))
+REQUEST_DB_SECONDS = metrics.register(metrics.Histogram(
+    "bjj_http_request_db_seconds", "Time spent in SQL statements per request", ("method", "route")
+))
+REQUEST_SQL_STATEMENTS = metrics.register(metrics.Histogram(
+    "bjj_http_request_sql_statements", "SQL statements per request", ("method", "route"),
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+))
+REQUEST_SERIALIZE_SECONDS = metrics.register(metrics.Histogram(
+    "bjj_http_request_serialize_seconds", "Time spent rendering JSON response bodies per request", ("method", "route"),
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+))
+REQUESTS = metrics.register(metrics.Counter(
+    "bjj_http_requests_total", "Requests served", ("method", "route", "status")
+))
+N_PLUS_ONE = metrics.register(metrics.Counter(
+    "bjj_http_n_plus_one_total", f"Requests that ran one statement more than {N_PLUS_ONE_THRESHOLD} times", ("route",)
+))
+
+# Most recent profiles, newest last, for the admin endpoints
+recent_profiles = deque(maxlen=20)
+
+class RequestStats:
+    """Counters for one request"""
+
+    __slots__ = ("sql_count", "sql_seconds", "serialize_seconds", "statements", "_lock")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.statements = {}
+        # Threadpool sections of one request can run statements concurrently
+        self._lock = threading.Lock()
+
+    def record_sql(self, statement, seconds):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_seconds += seconds
+            self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated_statements(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return [(statement, count) for statement, count in self.statements.items() if count > threshold]
+
+_current = contextvars.ContextVar("bjj_request_stats", default=None)
+
+def current_stats():
+    """Stats of the request being served, or None outside a request"""
+    return _current.get()
+
+def route_label(scope):
+    """Route template ("/api/users/{user_id}") rather than the raw path, to bound label cardinality"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+# ============= SQL Timing =============
+
+# Called as hook(conn, cursor, statement, parameters, executemany, seconds)
+# after every statement, so other per-statement consumers (the slow query
+# log) reuse this timing instead of adding listeners of their own
+statement_hooks = []
+
+def add_statement_hook(hook):
+    statement_hooks.append(hook)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.record_sql(statement, elapsed)
+    for hook in statement_hooks:
+        hook(conn, cursor, statement, parameters, executemany, elapsed)
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for a failed statement
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+def instrument_engine(target):
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+for _engine in (engine, *replicas.engines):
+    instrument_engine(_engine)
+
+# ============= Serialization Timing =============
+
+class InstrumentedORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that charges its render time to the current request"""
+
+    def render(self, content):
+        started = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            stats = _current.get()
+            if stats is not None:
+                stats.serialize_seconds += time.perf_counter() - started
+
+# ============= Middleware =============
+
+_profile_lock = threading.Lock()
+
+def _wants_profile(scope):
+    if PROFILE_TOKEN:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                return value.decode("latin-1") == PROFILE_TOKEN
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+class InstrumentationMiddleware:
+    """Records per-route timing metrics, flags N+1 patterns and runs opt-in profiles"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        # Only one profile at a time: cProfile hooks the whole event loop thread
+        profiler = None
+        if _wants_profile(scope) and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            profiler.enable()
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profiler is not None:
+                    message.setdefault("headers", []).append((b"server-timing", (
+                        f"db;dur={stats.sql_seconds * 1000:.2f}, "
+                        f"serialize;dur={stats.serialize_seconds * 1000:.2f}, "
+                        f"app;dur={(time.perf_counter() - started) * 1000:.2f}"
+                    ).encode("latin-1")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            route = route_label(scope)
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+                self._record_profile(profiler, scope, route, elapsed, stats)
+            self._observe(scope["method"], route, status, elapsed, stats)
+
+    def _observe(self, method, route, status, elapsed, stats):
+        REQUEST_DURATION.observe(elapsed, method, route)
+        REQUEST_DB_SECONDS.observe(stats.sql_seconds, method, route)
+        REQUEST_SQL_STATEMENTS.observe(stats.sql_count, method, route)
+        REQUEST_SERIALIZE_SECONDS.observe(stats.serialize_seconds, method, route)
+        REQUESTS.inc(method, route, str(status))
+        repeated = stats.repeated_statements()
+        if repeated:
+            N_PLUS_ONE.inc(route)
+            for statement, count in repeated:
+                logger.warning("Possible N+1 in %s %s: statement ran %d times: %s",
+                               method, route, count, " ".join(statement.split())[:300])
+
+    def _record_profile(self, profiler, scope, route, elapsed, stats):
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_FUNCTIONS)
+        profile = {
+            "takenAt": datetime.utcnow().isoformat(),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route,
+            "durationMs": round(elapsed * 1000, 2),
+            "sqlStatements": stats.sql_count,
+            "sqlMs": round(stats.sql_seconds * 1000, 2),
+            "serializeMs": round(stats.serialize_seconds * 1000, 2),
+            # Threadpool work shows up as time waiting on the worker, not its functions
+            "stats": out.getvalue(),
+        }
+        recent_profiles.append(profile)
+        logger.info("Profile of %s %s (%.1f ms):\n%s", scope["method"], scope["path"], elapsed * 1000, profile["stats"])
@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from .database import get_db_context
+from .models import Job, JobSchedule, generate_uuid
+from . import metrics
+
+# Background jobs. Work that does not have to happen inside a request is
+# a row in the jobs table: enqueue() adds it in the caller's transaction,
+# so a job exists exactly when the change that needs it was committed.
+# Workers (JOB_WORKERS coroutines in each app process, or
+# `python -m BJJSocial.jobs worker` beside it) claim due jobs with one
+# UPDATE ... RETURNING, SKIP LOCKED on Postgres, so any number of workers
+# share the table. A failed job is retried with exponential backoff until
+# max_attempts; a job whose worker died is requeued once its lease runs
+# out.
+#
+# Periodic jobs are schedules: each instance's scheduler advances a
+# schedule's next_run_at with a compare-and-set UPDATE, and only the
+# instance that wins enqueues the run, so each interval runs once across
+# the deployment.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_SEC = float(os.getenv("JOB_POLL_INTERVAL_SEC", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_BASE_SEC = float(os.getenv("JOB_BACKOFF_BASE_SEC", "10"))
+JOB_BACKOFF_MAX_SEC = float(os.getenv("JOB_BACKOFF_MAX_SEC", "3600"))
+# A running job not finished within this is presumed lost and requeued
+JOB_LEASE_SEC = float(os.getenv("JOB_LEASE_SEC", "1800"))
+# Finished jobs are kept this long for inspection
+JOB_RETENTION_SEC = float(os.getenv("JOB_RETENTION_SEC", str(7 * 24 * 3600)))
+# except successful scheduled runs, which add up fast (every 2s for
+# notification delivery) and are not worth keeping for long
+JOB_SCHEDULED_RETENTION_SEC = float(os.getenv("JOB_SCHEDULED_RETENTION_SEC", "3600"))
+JOB_PRUNE_INTERVAL_SEC = float(os.getenv("JOB_PRUNE_INTERVAL_SEC", "3600"))
+
+logger = logging.getLogger("bjjsocial.jobs")
+
+JOBS_FINISHED = metrics.register(metrics.Counter(
+    "bjj_jobs_finished_total", "Job runs by outcome (done, retry, failed)", ("job", "outcome")
+))
+JOB_DURATION = metrics.register(metrics.Histogram(
+    "bjj_job_duration_seconds", "Job run time", ("job",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0)
+))
+
+# ============= Registry =============
+
+TASKS = {}
+SCHEDULES = {}
+
+def task(name, max_attempts=JOB_MAX_ATTEMPTS):
+    """Register ``handler(db, **payload)`` as the job ``name``; the handler commits its own work"""
+    def register(handler):
+        TASKS[name] = (handler, max_attempts)
+        return handler
+    return register
+
+def schedule(name, interval_sec):
+    """Run the job ``name`` (no payload) every ``interval_sec`` across all instances"""
+    SCHEDULES[name] = interval_sec
+
+# ============= Queue =============
+
+def enqueue(db, name, payload=None, dedup_key=None, delay_sec=0, max_attempts=None):
+    """Add a job in ``db``'s transaction; returns its id, or None if ``dedup_key`` is already pending"""
+    now = datetime.utcnow()
+    if max_attempts is None:
+        max_attempts = TASKS[name][1] if name in TASKS else JOB_MAX_ATTEMPTS
+    job_id = generate_uuid()
+    stmt = insert(Job.__table__).values(
+        id=job_id, name=name, payload=payload or {}, dedup_key=dedup_key,
+        status=QUEUED, attempts=0, max_attempts=max_attempts,
+        run_at=now + timedelta(seconds=delay_sec), created_at=now,
+    )
+    if dedup_key is None:
+        db.execute(stmt)
+    else:
+        # The partial unique index on dedup_key rejects a second pending copy
+        try:
+            with db.begin_nested():
+                db.execute(stmt)
+        except IntegrityError:
+            return None
+    return job_id
+
+def backoff_sec(attempts):
+    """Delay before retry number ``attempts``: exponential, capped, with jitter so retries spread out"""
+    delay = min(JOB_BACKOFF_BASE_SEC * 2 ** (attempts - 1), JOB_BACKOFF_MAX_SEC)
+    return delay * random.uniform(0.5, 1.0)
+
+def claim(db, worker_id, now=None):
+    """Take the next due job for ``worker_id``; returns (id, name, payload, attempts, max_attempts) or None"""
+    now = now or datetime.utcnow()
+    due = (
+        select(Job.id)
+        .where(Job.status == QUEUED, Job.run_at <= now)
+        .order_by(Job.run_at)
+        .limit(1)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        due = due.with_for_update(skip_locked=True)
+    row = db.execute(
+        update(Job.__table__)
+        .where(Job.id == due.scalar_subquery(), Job.status == QUEUED)
+        .values(status=RUNNING, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+        .returning(Job.id, Job.name, Job.payload, Job.attempts, Job.max_attempts)
+    ).first()
+    db.commit()
+    return row
+
+def _finish(db, job_id, worker_id, **values):
+    # Only while this worker still holds the job: a reaped and reclaimed
+    # job belongs to its new worker
+    db.execute(
+        update(Job.__table__)
+        .where(Job.id == job_id, Job.status == RUNNING, Job.locked_by == worker_id)
+        .values(locked_by=None, locked_at=None, **values)
+    )
+    db.commit()
+
+def run_next(worker_id):
+    """Claim and run one due job; returns its name, or None if nothing was due"""
+    with get_db_context() as db:
+        job = claim(db, worker_id)
+    if job is None:
+        return None
+
+    started = time.perf_counter()
+    try:
+        handler, _ = TASKS[job.name]
+        with get_db_context() as db:
+            handler(db, **(job.payload or {}))
+    except Exception as e:
+        JOB_DURATION.observe(time.perf_counter() - started, job.name)
+        error = f"{type(e).__name__}: {e}"
+        now = datetime.utcnow()
+        with get_db_context() as db:
+            if job.attempts >= job.max_attempts:
+                logger.exception("Job %s %s failed after %d attempts", job.name, job.id, job.attempts)
+                _finish(db, job.id, worker_id, status=FAILED, last_error=error, finished_at=now)
+                JOBS_FINISHED.inc(job.name, "failed")
+            else:
+                delay = backoff_sec(job.attempts)
+                logger.warning("Job %s %s failed (attempt %d), retrying in %.0fs: %s",
+                               job.name, job.id, job.attempts, delay, error)
+                _finish(db, job.id, worker_id, status=QUEUED, last_error=error,
+                        run_at=now + timedelta(seconds=delay))
+                JOBS_FINISHED.inc(job.name, "retry")
+        return job.name
+
+    JOB_DURATION.observe(time.perf_counter() - started, job.name)
+    with get_db_context() as db:
+        _finish(db, job.id, worker_id, status=DONE, finished_at=datetime.utcnow())
+    JOBS_FINISHED.inc(job.name, "done")
+    return job.name
+
+def requeue_expired(db, now=None):
+    """Put running jobs whose lease ran out back in the queue (or fail them); returns how many"""
+    now = now or datetime.utcnow()
+    expired = Job.status == RUNNING, Job.locked_at < now - timedelta(seconds=JOB_LEASE_SEC)
+    failed = db.execute(
+        update(Job.__table__).where(*expired, Job.attempts >= Job.max_attempts)
+        .values(status=FAILED, locked_by=None, locked_at=None, finished_at=now, last_error="Lease expired")
+    ).rowcount
+    requeued = db.execute(
+        update(Job.__table__).where(*expired)
+        .values(status=QUEUED, locked_by=None, locked_at=None, run_at=now, last_error="Lease expired")
+    ).rowcount
+    db.commit()
+    if failed or requeued:
+        logger.warning("Requeued %d and failed %d jobs whose lease expired", requeued, failed)
+    return failed + requeued
+
+def prune(db, now=None):
+    """Delete jobs that finished more than JOB_RETENTION_SEC ago; returns how many
+
+    Successful scheduled runs go after JOB_SCHEDULED_RETENTION_SEC instead.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=JOB_RETENTION_SEC)
+    removed = db.execute(
+        delete(Job.__table__).where(Job.status.in_((DONE, FAILED)), Job.finished_at < cutoff)
+    ).rowcount
+    if SCHEDULES:
+        cutoff = now - timedelta(seconds=JOB_SCHEDULED_RETENTION_SEC)
+        removed += db.execute(
+            delete(Job.__table__).where(
+                Job.status == DONE, Job.name.in_(list(SCHEDULES)), Job.finished_at < cutoff
+            )
+        ).rowcount
+    db.commit()
+    return removed
+
+# ============= Scheduler =============
+
+def enqueue_due_schedules(db, now=None):
+    """Enqueue every schedule that is due and not already claimed by another instance; returns their names"""
+    now = now or datetime.utcnow()
+    rows = dict(db.execute(select(JobSchedule.name, JobSchedule.next_run_at)).all())
+    for name in SCHEDULES.keys() - rows.keys():
+        # First sighting runs now; a concurrent first insert just wins
+        try:
+            with db.begin_nested():
+                db.execute(insert(JobSchedule.__table__).values(name=name, next_run_at=now))
+            rows[name] = now
+        except IntegrityError:
+            rows[name] = db.execute(select(JobSchedule.next_run_at).where(JobSchedule.name == name)).scalar()
+
+    enqueued = []
+    for name, interval_sec in SCHEDULES.items():
+        due_at = rows[name]
+        if due_at > now:
+            continue
+        advanced = db.execute(
+            update(JobSchedule.__table__)
+            .where(JobSchedule.name == name, JobSchedule.next_run_at == due_at)
+            .values(next_run_at=now + timedelta(seconds=interval_sec), last_enqueued_at=now)
+        ).rowcount
+        if advanced:
+            # A run still pending from last time absorbs this one
+            enqueue(db, name, dedup_key=f"schedule:{name}")
+            enqueued.append(name)
+    db.commit()
+    return enqueued
+
+# ============= Queue stats =============
+
+class QueueGauges:
+    """Depth and lag of the queue, refreshed by the scheduler and rendered by /metrics
+
+    Reading the table on every scrape would put queries on the event loop,
+    so the scheduler tick takes the numbers and /metrics reports them.
+    """
+
+    def __init__(self):
+        self.depth = {}
+        self.running = {}
+        self.lag_sec = 0.0
+        self.failed = 0
+
+    def refresh(self, db, now=None):
+        now = now or datetime.utcnow()
+        counts = db.execute(
+            select(Job.status, Job.name, func.count())
+            .where(Job.status.in_((QUEUED, RUNNING)))
+            .group_by(Job.status, Job.name)
+        ).all()
+        self.depth = {name: count for status, name, count in counts if status == QUEUED}
+        self.running = {name: count for status, name, count in counts if status == RUNNING}
+        oldest_due = db.execute(
+            select(func.min(Job.run_at)).where(Job.status == QUEUED, Job.run_at <= now)
+        ).scalar()
+        self.lag_sec = (now - oldest_due).total_seconds() if oldest_due else 0.0
+        self.failed = db.execute(select(func.count()).where(Job.status == FAILED)).scalar()
+        db.commit()
+
+    def render(self):
+        lines = metrics.render_family(
+            "bjj_jobs_queued", "gauge", "Jobs waiting to run, due or not",
+            [({"job": name}, count) for name, count in sorted(self.depth.items())]
+        )
+        lines += metrics.render_family(
+            "bjj_jobs_running", "gauge", "Jobs claimed by a worker",
+            [({"job": name}, count) for name, count in sorted(self.running.items())]
+        )
+        lines += metrics.render_family(
+            "bjj_jobs_lag_seconds", "gauge", "How long the oldest due job has been waiting", [({}, self.lag_sec)]
+        )
+        lines += metrics.render_family(
+            "bjj_jobs_failed", "gauge", "Jobs that ran out of attempts (kept for JOB_RETENTION_SEC)", [({}, self.failed)]
+        )
+        return lines
+
+queue_gauges = metrics.register(QueueGauges())
+
+def _tick():
+    with get_db_context() as db:
+        enqueue_due_schedules(db)
+        requeue_expired(db)
+        queue_gauges.refresh(db)
+
+# ============= Runners =============
+
+async def scheduler_forever():
+    """Enqueue due schedules, requeue lost jobs and refresh queue gauges every JOB_POLL_INTERVAL_SEC"""
+    while True:
+        try:
+            await run_in_threadpool(_tick)
+        except Exception:
+            logger.exception("Job scheduler tick failed")
+        await asyncio.sleep(JOB_POLL_INTERVAL_SEC)
+
+async def worker_forever(worker_id):
+    """Run jobs as they come due; sleeps JOB_POLL_INTERVAL_SEC whenever the queue is empty"""
+    while True:
+        try:
+            ran = await run_in_threadpool(run_next, worker_id)
+        except Exception:
+            logger.exception("Job worker %s failed", worker_id)
+            ran = None
+        if ran is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL_SEC)
+
+def start(workers=JOB_WORKERS):
+    """Start the scheduler and ``workers`` worker coroutines on the running loop (startup task)"""
+    from . import tasks  # registers handlers and schedules
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    running = [asyncio.create_task(scheduler_forever())]
+    for index in range(workers):
+        running.append(asyncio.create_task(worker_forever(f"{prefix}:{index}")))
+    return running
+
+# ============= CLI =============
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="Run the scheduler and workers outside the web process")
+    worker.add_argument("--workers", type=int, default=max(JOB_WORKERS, 1))
+    add = commands.add_parser("enqueue", help="Queue a job now")
+    add.add_argument("name")
+    add.add_argument("payload", nargs="?", default="{}", help="JSON object of handler arguments")
+    commands.add_parser("stats", help="Queue depth, lag and failures")
+    args = parser.parse_args()
+
+    from . import tasks  # noqa: F401 (registers handlers and schedules)
+    if args.command == "worker":
+        async def run():
+            await asyncio.gather(*start(args.workers))
+        asyncio.run(run())
+    elif args.command == "enqueue":
+        if args.name not in TASKS:
+            parser.error(f"unknown job {args.name!r}; known: {', '.join(sorted(TASKS))}")
+        with get_db_context() as db:
+            job_id = enqueue(db, args.name, json.loads(args.payload))
+            db.commit()
+        print(f"Queued {args.name} as {job_id}")
+    else:
+        with get_db_context() as db:
+            queue_gauges.refresh(db)
+        for name, count in sorted(queue_gauges.depth.items()):
+            print(f"{name:>32}: {count} queued, {queue_gauges.running.get(name, 0)} running")
+        print(f"lag {queue_gauges.lag_sec:.1f}s, {queue_gauges.failed} failed")
+
+if __name__ == "__main__":
+    # Through the package module, so tasks register where main() looks
+    from . import jobs
+    jobs.main()
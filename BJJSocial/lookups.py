@@ -0,0 +1,265 @@
+import re
+import threading
+import time
+from sqlalchemy import SmallInteger, TypeDecorator, event, select, insert, func, table, column
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import engine
+
+# Lookup-table encoding for division dimensions. Belts, weight classes, age
+# divisions, genders, rulesets and tiers are stored as SMALLINT codes into
+# one small table per dimension (id, name). Python and the API only ever
+# see names: the Lookup column type translates in both directions through
+# an in-process copy of the tables, and spellings are normalized on the way
+# in ("blue", "BLUE ", "Light-Feather", "M1" all resolve to one code).
+#
+# The tables only grow through explicit registration: migrations, the
+# seed script and the admin lookups endpoint call ensure(). Request schemas
+# check names with validate(), and an ORM flush of a name with no row is
+# refused, so user input can never add rows. Filters on an unknown name
+# bind to UNKNOWN_CODE and match no rows.
+
+UNKNOWN_CODE = -1
+
+# A miss reloads the tables from the database at most this often, so a
+# name another instance added is picked up without hammering on typos
+LOOKUP_RELOAD_INTERVAL_SEC = 5.0
+
+# Model attribute -> lookup table
+FIELD_DIMENSIONS = {
+    "belt": "belts",
+    "weight_class": "weight_classes",
+    "age_division": "age_divisions",
+    "gender": "genders",
+    "ruleset": "rulesets",
+    "tier": "tiers",
+}
+
+# Rows every new database starts with (codes in this order, from 1)
+DEFAULT_NAMES = {
+    "belts": ("White", "Blue", "Purple", "Brown", "Black", "Grey", "Yellow", "Orange", "Green"),
+    "weight_classes": (
+        "Rooster", "Light Feather", "Feather", "Light", "Middle", "Medium Heavy", "Heavy",
+        "Super Heavy", "Ultra Heavy", "Open Class",
+    ),
+    "age_divisions": ("UNSPECIFIED", "Juvenile", "Adult", *(f"Master {n}" for n in range(1, 8))),
+    "genders": ("Male", "Female"),
+    "rulesets": ("IBJJF", "ADCC", "NAGA", "SJJIF", "UAEJJF"),
+    "tiers": ("LOCAL", "REGIONAL", "NATIONAL", "WORLD"),
+}
+
+# Alternative spellings, by normalized key
+ALIASES = {
+    "belts": {"gray": "Grey"},
+    "weight_classes": {"absolute": "Open Class", "open": "Open Class"},
+    "age_divisions": {
+        "adults": "Adult", "juv": "Juvenile", "none": "UNSPECIFIED",
+        **{f"m{n}": f"Master {n}" for n in range(1, 8)},
+        **{f"masters{n}": f"Master {n}" for n in range(1, 8)},
+    },
+    "genders": {
+        "m": "Male", "man": "Male", "men": "Male", "mens": "Male",
+        "f": "Female", "woman": "Female", "women": "Female", "womens": "Female",
+    },
+    "rulesets": {"ajp": "UAEJJF"},
+    "tiers": {},
+}
+
+# Exact spellings remembered per table before the fast-path map is reset
+MAX_REMEMBERED_SPELLINGS = 1000
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+def normalize_key(value):
+    """Comparison key for a spelling: case, spacing and punctuation ignored"""
+    return _NON_ALNUM.sub("", value.casefold())
+
+class LookupMapping:
+    """In-process copy of one lookup table"""
+
+    def __init__(self, dimension):
+        self.dimension = dimension
+        self.table = table(dimension, column("id", SmallInteger), column("name"))
+        self.aliases = ALIASES.get(dimension, {})
+        self._lock = threading.Lock()
+        self._names = {}
+        self._codes_by_key = {}
+        # Fast path for exact spellings already seen
+        self._codes_by_value = {}
+        self._loaded_at = None
+
+    def _key(self, value):
+        key = normalize_key(value)
+        alias = self.aliases.get(key)
+        return normalize_key(alias) if alias else key
+
+    def load(self, conn=None):
+        if conn is None:
+            with engine.connect() as own:
+                rows = own.execute(select(self.table.c.id, self.table.c.name)).all()
+        else:
+            rows = conn.execute(select(self.table.c.id, self.table.c.name)).all()
+        with self._lock:
+            self._names = dict(rows)
+            self._codes_by_key = {self._key(name): code for code, name in rows}
+            self._codes_by_value = {}
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def _reload_if_stale(self, force=False):
+        loaded_at = self._loaded_at
+        if loaded_at is None or force and time.monotonic() - loaded_at >= LOOKUP_RELOAD_INTERVAL_SEC:
+            self.load()
+            return True
+        return False
+
+    def _cached_code(self, value):
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_key.get(self._key(value))
+            if code is not None:
+                if len(self._codes_by_value) >= MAX_REMEMBERED_SPELLINGS:
+                    self._codes_by_value = {}
+                self._codes_by_value[value] = code
+        return code
+
+    def code(self, value):
+        """Code for a spelling, or None if no row has that name yet"""
+        code = self._codes_by_value.get(value)
+        if code is not None:
+            return code
+        self._reload_if_stale()
+        code = self._cached_code(value)
+        if code is None and self._reload_if_stale(force=True):
+            code = self._cached_code(value)
+        return code
+
+    def name(self, code):
+        name = self._names.get(code)
+        if name is None and code != UNKNOWN_CODE and self._reload_if_stale(force=True):
+            name = self._names.get(code)
+        return name
+
+    def names(self):
+        """Every stored name, in code order"""
+        self._reload_if_stale()
+        return [name for _, name in sorted(self._names.items())]
+
+    def canonical(self, value):
+        """Stored spelling of ``value``; ``value`` itself if it is not in the table"""
+        code = self.code(value)
+        return value if code is None else self._names[code]
+
+    def ensure(self, conn, values):
+        """Add rows for names not in the table yet, inside ``conn``'s transaction; returns how many"""
+        # Reads go through ``conn`` too: on SQLite another connection could
+        # be locked out by this transaction's writes
+        added = 0
+        if self._loaded_at is None:
+            self.load(conn)
+        for value in values:
+            if self._cached_code(value) is not None:
+                continue
+            # Another instance may have added it, or a concurrent insert may
+            # take the next code first: re-read and retry
+            for _ in range(3):
+                self.load(conn)
+                if self._cached_code(value) is not None:
+                    break
+                try:
+                    with conn.begin_nested():
+                        next_code = conn.execute(select(func.coalesce(func.max(self.table.c.id), 0) + 1)).scalar()
+                        conn.execute(insert(self.table).values(id=next_code, name=value.strip()))
+                    self.load(conn)
+                    added += 1
+                    break
+                except IntegrityError:
+                    continue
+        return added
+
+    def populate(self, target, connection, **kw):
+        """after_create hook: insert DEFAULT_NAMES into a freshly created table"""
+        names = DEFAULT_NAMES.get(self.dimension, ())
+        if names:
+            connection.execute(insert(self.table), [{"id": code, "name": name} for code, name in enumerate(names, 1)])
+        self.invalidate()
+
+mappings = {dimension: LookupMapping(dimension) for dimension in FIELD_DIMENSIONS.values()}
+
+def canonical(field, value):
+    """Stored spelling of a value of model attribute ``field`` (unchanged for other fields)"""
+    dimension = FIELD_DIMENSIONS.get(field)
+    if dimension is None or value is None or not isinstance(value, str):
+        return value
+    return mappings[dimension].canonical(value)
+
+def validate(field, value):
+    """Stored spelling of ``value`` for model attribute ``field``; ValueError if it has no row"""
+    mapping = mappings[FIELD_DIMENSIONS[field]]
+    if mapping.code(value) is None:
+        raise ValueError(f"Unknown {field}: {value!r}; expected one of: {', '.join(mapping.names())}")
+    return mapping.canonical(value)
+
+def ensure(conn, field, values):
+    """Register new names for model attribute ``field`` in ``conn``'s transaction (trusted callers only)"""
+    return mappings[FIELD_DIMENSIONS[field]].ensure(conn, {value for value in values if value})
+
+def register(field, names):
+    """Add names for model attribute ``field`` in their own transaction; returns how many were new"""
+    try:
+        with engine.begin() as conn:
+            return ensure(conn, field, names)
+    except Exception:
+        # The in-process copy may hold rows that were rolled back
+        invalidate()
+        raise
+
+def invalidate():
+    for mapping in mappings.values():
+        mapping.invalidate()
+
+class Lookup(TypeDecorator):
+    """Name in Python and the API; SMALLINT code into the ``dimension`` lookup table in the database"""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, dimension):
+        super().__init__()
+        self.dimension = dimension
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        code = mappings[self.dimension].code(value)
+        return UNKNOWN_CODE if code is None else code
+
+    def process_literal_param(self, value, dialect):
+        return str(self.process_bind_param(value, dialect))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return mappings[self.dimension].name(value)
+
+    @property
+    def python_type(self):
+        return str
+
+# ============= ORM Hooks =============
+
+@event.listens_for(Session, "before_flush")
+def _canonicalize_lookup_values(session, flush_context, instances):
+    """Store the canonical spelling of every name about to be written; refuse names with no row"""
+    for obj in session.new | session.dirty:
+        columns = obj.__mapper__.columns
+        for field in FIELD_DIMENSIONS:
+            value = obj.__dict__.get(field)
+            if field in columns and isinstance(columns[field].type, Lookup) and isinstance(value, str):
+                stored = validate(field, value)
+                if stored != value:
+                    setattr(obj, field, stored)
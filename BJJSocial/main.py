@@ -1,22 +1,34 @@
 import os
+import asyncio
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
-from .routers import auth, users, posts, tournaments, leaderboard, search
-from .database import engine, Base
+from .routers import auth, users, posts, tournaments, leaderboard, search, tags, notifications, admin
+from .database import engine
+from . import jobs, metrics, ranking, ratelimit, session_store, slowlog
+from .instrumentation import InstrumentationMiddleware, InstrumentedORJSONResponse
+from .pagination import NEXT_CURSOR_HEADER
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Schema changes are applied by `python -m BJJSocial.migrations upgrade`, not
+# at import. AUTO_MIGRATE=1 (the default for SQLite, whose /tmp database
+# starts empty on every instance) runs pending migrations at startup.
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1" if engine.dialect.name == "sqlite" else "0") == "1"
 
-app = FastAPI(title="BJJ Social Platform API")
+# Periodic jobs start this long after startup so a cold instance serves its
+# first requests without competing with them.
+BACKGROUND_JOBS_DELAY_SEC = float(os.getenv("BACKGROUND_JOBS_DELAY_SEC", "30"))
 
-# Add session middleware
-SECRET_KEY = os.getenv("SESSION_SECRET", "your-secret-key-change-in-production")
+app = FastAPI(title="BJJ Social Platform API", default_response_class=InstrumentedORJSONResponse)
+
+# Rate limits per user or client address (innermost, so the session is
+# loaded and signed-in callers are keyed by user id)
+app.add_middleware(ratelimit.RateLimitMiddleware)
+
+# Add session middleware (server-side sessions in the sessions table)
 app.add_middleware(
-    SessionMiddleware,
-    secret_key=SECRET_KEY,
+    session_store.ServerSessionMiddleware,
     session_cookie="bjj_session",
-    max_age=30 * 24 * 60 * 60,  # 30 days
     same_site="lax",
     https_only=False  # Set to True in production with HTTPS
 )
@@ -28,8 +40,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Request timing, SQL counts and opt-in profiling (outermost, so it sees
+# the whole request including the middlewares above)
+app.add_middleware(InstrumentationMiddleware)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -37,6 +54,48 @@ app.include_router(posts.router)
 app.include_router(tournaments.router)
 app.include_router(leaderboard.router)
 app.include_router(search.router)
+app.include_router(tags.router)
+app.include_router(notifications.router)
+app.include_router(admin.router)
+
+@app.on_event("startup")
+async def migrate():
+    if AUTO_MIGRATE:
+        from . import migrations
+        await run_in_threadpool(migrations.upgrade, engine)
+
+# The loop keeps only weak references to tasks; these long-running loops
+# are held here until shutdown cancels them
+background_tasks = set()
+
+def _keep(task):
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+@app.on_event("startup")
+async def start_background_jobs():
+    # The leaderboard index loads in the background; the rank endpoint
+    # loads it on demand if a request arrives first
+    _keep(asyncio.create_task(ranking.refresh_forever()))
+    _keep(asyncio.create_task(ratelimit.evict_forever()))
+    _keep(asyncio.create_task(_start_job_workers()))
+
+async def _start_job_workers():
+    # Scheduled and deferred work runs through the job queue (jobs.py);
+    # JOB_WORKERS=0 leaves it to `python -m BJJSocial.jobs worker`
+    await asyncio.sleep(BACKGROUND_JOBS_DELAY_SEC)
+    if jobs.JOB_WORKERS > 0:
+        for task in jobs.start():
+            _keep(task)
+
+@app.on_event("shutdown")
+async def stop_background_jobs():
+    loop = asyncio.get_running_loop()
+    tasks = [task for task in background_tasks if task.get_loop() is loop]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 @app.get("/")
 async def root():
@@ -45,3 +104,7 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,140 @@
+import threading
+from bisect import bisect_left
+
+from .database import engine, replicas, pool_status
+
+# Prometheus text exposition (format 0.0.4) for the /metrics endpoint.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (status key, metric name, type, help)
+POOL_METRICS = (
+    ("size", "bjj_db_pool_size", "gauge", "Configured number of persistent connections"),
+    ("checked_out", "bjj_db_pool_in_use", "gauge", "Connections currently checked out"),
+    ("checked_in", "bjj_db_pool_idle", "gauge", "Idle connections held by the pool"),
+    ("overflow", "bjj_db_pool_overflow", "gauge", "Connections open beyond pool_size"),
+    ("max_overflow", "bjj_db_pool_max_overflow", "gauge", "Configured overflow limit"),
+    ("checkouts", "bjj_db_pool_checkouts_total", "counter", "Connection checkouts"),
+    ("wait_seconds_total", "bjj_db_pool_checkout_wait_seconds_total", "counter", "Time spent waiting for a connection"),
+    ("wait_seconds_max", "bjj_db_pool_checkout_wait_seconds_max", "gauge", "Longest wait for a connection"),
+    ("timeouts", "bjj_db_pool_timeouts_total", "counter", "Checkouts that hit pool_timeout"),
+    ("connects", "bjj_db_pool_connects_total", "counter", "New DBAPI connections opened"),
+    ("pings", "bjj_db_pool_pings_total", "counter", "Pre-ping round trips on checkout"),
+    ("ping_failures", "bjj_db_pool_ping_failures_total", "counter", "Pre-pings that found a dead connection"),
+)
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(int(value))
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+def render_family(name, kind, help_text, samples):
+    """Render one metric family from (labels, value) samples"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {_format_value(value)}")
+    return lines
+
+class Counter:
+    """Counter family with fixed label names"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return render_family(self.name, self.kind, self.help_text, [
+            (dict(zip(self.label_names, label_values)), value) for label_values, value in values
+        ])
+
+class Histogram:
+    """Histogram family with fixed label names; buckets are upper bounds"""
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(label_values, list(counts), total) for label_values, (counts, total) in self._series.items()]
+        for label_values, counts, total in series:
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+# Counter and Histogram families rendered by /metrics, in registration order
+REGISTRY = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+def pool_engines():
+    """Engines whose pools are reported, keyed by the ``engine`` label"""
+    engines = {"primary": engine}
+    for index, replica in enumerate(replicas.engines):
+        engines[f"replica{index}"] = replica
+    return engines
+
+def render_pool_metrics():
+    statuses = {name: pool_status(e) for name, e in pool_engines().items()}
+    lines = []
+    for key, name, kind, help_text in POOL_METRICS:
+        samples = [({"engine": label}, status[key]) for label, status in statuses.items() if key in status]
+        if samples:
+            lines.extend(render_family(name, kind, help_text, samples))
+    return lines
+
+def render_replica_metrics():
+    samples = [({"engine": f"replica{index}"}, int(up)) for index, up in enumerate(replicas.healthy)]
+    if not samples:
+        return []
+    return render_family("bjj_db_replica_healthy", "gauge", "1 if the replica passed its last health check", samples)
+
+def render_registry():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return lines
+
+def render_metrics():
+    return "\n".join(render_pool_metrics() + render_replica_metrics() + render_registry()) + "\n"
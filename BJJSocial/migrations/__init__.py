@@ -0,0 +1,82 @@
+import importlib
+import pkgutil
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, String, DateTime, select, insert, inspect
+
+from . import versions
+
+# Versioned schema migrations. Each module in migrations/versions defines
+# ``revision`` (zero-padded, applied in sorted order), ``description`` and
+# ``upgrade(conn)``. Applied revisions are recorded in schema_migrations;
+# each migration and its record commit in one transaction.
+#
+#   python -m BJJSocial.migrations upgrade
+#
+# The app no longer creates tables at import: run this as a deploy step
+# (or set AUTO_MIGRATE=1, the default for SQLite).
+
+# Arbitrary key for pg_advisory_lock so concurrent deploys migrate one at a time
+ADVISORY_LOCK_ID = 7_514_220_337
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("revision", String, primary_key=True),
+    Column("description", String),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def discover():
+    """Migration modules sorted by revision"""
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    modules.sort(key=lambda module: module.revision)
+    revisions = [module.revision for module in modules]
+    if len(set(revisions)) != len(revisions):
+        raise RuntimeError(f"Duplicate migration revisions: {revisions}")
+    return modules
+
+def applied_revisions(conn):
+    if not inspect(conn).has_table(schema_migrations.name):
+        return set()
+    return set(conn.execute(select(schema_migrations.c.revision)).scalars())
+
+def upgrade(engine, target=None, log=print):
+    """Apply pending migrations up to ``target`` (default: latest); returns applied revisions"""
+    applied = []
+    with engine.connect() as lock_conn:
+        postgres = engine.dialect.name == "postgresql"
+        if postgres:
+            lock_conn.exec_driver_sql(f"SELECT pg_advisory_lock({ADVISORY_LOCK_ID})")
+            lock_conn.commit()
+        try:
+            with engine.begin() as conn:
+                _metadata.create_all(conn, checkfirst=True)
+                done = applied_revisions(conn)
+            for module in discover():
+                if target is not None and module.revision > target:
+                    break
+                if module.revision in done:
+                    continue
+                log(f"Applying {module.revision}: {module.description}")
+                with engine.begin() as conn:
+                    module.upgrade(conn)
+                    conn.execute(insert(schema_migrations).values(
+                        revision=module.revision,
+                        description=module.description,
+                        applied_at=datetime.utcnow()
+                    ))
+                applied.append(module.revision)
+        finally:
+            if postgres:
+                lock_conn.exec_driver_sql(f"SELECT pg_advisory_unlock({ADVISORY_LOCK_ID})")
+                lock_conn.commit()
+    return applied
+
+def status(engine):
+    """(revision, description, applied) for every known migration"""
+    with engine.connect() as conn:
+        done = applied_revisions(conn)
+    return [(module.revision, module.description, module.revision in done) for module in discover()]
@@ -0,0 +1,22 @@
+import argparse
+
+from ..database import engine
+from . import upgrade, status
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m BJJSocial.migrations", description="Manage the database schema")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade_parser = commands.add_parser("upgrade", help="Apply pending migrations")
+    upgrade_parser.add_argument("--to", dest="target", help="Stop after this revision")
+    commands.add_parser("status", help="List migrations and whether they are applied")
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = upgrade(engine, target=args.target)
+        print(f"Applied {len(applied)} migration(s)" if applied else "Schema is up to date")
+    else:
+        for revision, description, applied in status(engine):
+            print(f"{'x' if applied else ' '} {revision}  {description}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+from sqlalchemy import (
+    MetaData, Table, Column, Boolean, Integer, Float, String, Text, DateTime, ForeignKey,
+    Index, UniqueConstraint, JSON
+)
+
+revision = "0001"
+description = "Baseline schema (everything create_all used to build at import)"
+
+# Frozen copy of the tables as they were when migrations were introduced.
+# Later schema changes go in new versions, never here. checkfirst makes
+# this safe to run against databases that create_all already built.
+metadata = MetaData()
+
+Table(
+    "users", metadata,
+    Column("id", String, primary_key=True),
+    Column("email", String, nullable=False, unique=True),
+    Column("password", String, nullable=False),
+    Column("first_name", String),
+    Column("last_name", String),
+    Column("profile_image_url", String),
+    Column("belt", String),
+    Column("stripes", Integer),
+    Column("weight", String),
+    Column("weight_class", String),
+    Column("school", String),
+    Column("instructor", String),
+    Column("years_training", String),
+    Column("competitions", Integer),
+    Column("wins", Integer),
+    Column("losses", Integer),
+    Column("bio", Text),
+    Column("location", String),
+    Column("age_division", String),
+    Column("gender", String),
+    Column("followers_count", Integer),
+    Column("following_count", Integer),
+    Column("posts_count", Integer),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "sessions", metadata,
+    Column("sid", String, primary_key=True),
+    Column("sess", JSON, nullable=False),
+    Column("expire", DateTime, nullable=False, index=True),
+    Index("IDX_session_expire", "expire"),
+)
+
+Table(
+    "posts", metadata,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("type", String, nullable=False),
+    Column("location", String),
+    Column("image_urls", JSON),
+    Column("likes", Integer),
+    Column("shares", Integer),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+Table(
+    "comments", metadata,
+    Column("id", String, primary_key=True),
+    Column("post_id", String, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False),
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("content", Text, nullable=False),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "likes", metadata,
+    Column("id", String, primary_key=True),
+    Column("post_id", String, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False),
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "follows", metadata,
+    Column("id", String, primary_key=True),
+    Column("follower_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("following_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "tournaments", metadata,
+    Column("id", String, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("date", DateTime, nullable=False),
+    Column("location", String),
+    Column("is_gi", Boolean, nullable=False),
+    Column("ruleset", String, nullable=False),
+    Column("tier", String, nullable=False),
+    Column("organizer_id", String, ForeignKey("users.id"), nullable=False),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "matches", metadata,
+    Column("id", String, primary_key=True),
+    Column("tournament_id", String, ForeignKey("tournaments.id", ondelete="CASCADE"), nullable=False),
+    Column("round", String, nullable=False),
+    Column("belt", String, nullable=False),
+    Column("weight_class", String, nullable=False),
+    Column("age_division", String),
+    Column("gender", String, nullable=False),
+    Column("competitor_a_id", String, ForeignKey("users.id"), nullable=False),
+    Column("competitor_b_id", String, ForeignKey("users.id"), nullable=False),
+    Column("winner_id", String, ForeignKey("users.id")),
+    Column("method", String),
+    Column("submission_type", String),
+    Column("points_a", Integer),
+    Column("points_b", Integer),
+    Column("advantages_a", Integer),
+    Column("advantages_b", Integer),
+    Column("penalties_a", Integer),
+    Column("penalties_b", Integer),
+    Column("duration_sec", Integer),
+    Column("result_final", Boolean),
+    Column("awarded_winner_pts", Integer),
+    Column("awarded_loser_pts", Integer),
+    Column("created_at", DateTime),
+)
+
+Table(
+    "leaderboard", metadata,
+    Column("id", String, primary_key=True),
+    Column("season", String, nullable=False),
+    Column("ruleset", String, nullable=False),
+    Column("is_gi", Boolean, nullable=False),
+    Column("belt", String, nullable=False),
+    Column("weight_class", String, nullable=False),
+    Column("age_division", String, nullable=False),
+    Column("gender", String, nullable=False),
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("points", Integer),
+    Column("submissions", Integer),
+    Column("wins", Integer),
+    Column("losses", Integer),
+    Column("last_updated", DateTime),
+    UniqueConstraint("user_id", "season", "ruleset", "is_gi", "belt", "weight_class", "age_division", "gender", name="unique_leaderboard_entry"),
+)
+
+Table(
+    "leaderboard_snapshots", metadata,
+    Column("id", String, primary_key=True),
+    Column("taken_at", DateTime, nullable=False, index=True),
+    Column("changed_rows", Integer, nullable=False),
+)
+
+Table(
+    "leaderboard_history", metadata,
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("division", String, primary_key=True),
+    Column("taken_at", DateTime, primary_key=True),
+    Column("rank", Integer),
+    Column("points", Integer),
+)
+
+Table(
+    "leaderboard_history_state", metadata,
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("division", String, primary_key=True),
+    Column("rank", Integer, nullable=False),
+    Column("points", Integer, nullable=False),
+)
+
+Table(
+    "ratings", metadata,
+    Column("id", String, primary_key=True),
+    Column("season", String, nullable=False),
+    Column("ruleset", String, nullable=False),
+    Column("is_gi", Boolean, nullable=False),
+    Column("belt", String, nullable=False),
+    Column("weight_class", String, nullable=False),
+    Column("age_division", String, nullable=False),
+    Column("gender", String, nullable=False),
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("rating", Float, nullable=False),
+    Column("matches_played", Integer, nullable=False),
+    Column("last_updated", DateTime),
+    UniqueConstraint("user_id", "season", "ruleset", "is_gi", "belt", "weight_class", "age_division", "gender", name="unique_rating_entry"),
+)
+
+Table(
+    "rating_history", metadata,
+    Column("id", String, primary_key=True),
+    Column("rating_id", String, ForeignKey("ratings.id", ondelete="CASCADE"), nullable=False),
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("match_id", String, ForeignKey("matches.id", ondelete="CASCADE"), nullable=False),
+    Column("season", String, nullable=False),
+    Column("rating_before", Float, nullable=False),
+    Column("rating_after", Float, nullable=False),
+    Column("played_at", DateTime, nullable=False),
+    Index("IDX_rating_history_user", "user_id", "played_at"),
+    Index("IDX_rating_history_season", "season"),
+)
+
+Table(
+    "user_suggestions", metadata,
+    Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("position", Integer, primary_key=True),
+    Column("suggested_user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("score", Float, nullable=False),
+    Column("mutual_follows", Integer, nullable=False),
+    Column("shared_brackets", Integer, nullable=False),
+    Column("same_school", Boolean, nullable=False),
+    Column("same_instructor", Boolean, nullable=False),
+    Column("computed_at", DateTime, nullable=False),
+)
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
@@ -0,0 +1,51 @@
+from sqlalchemy import inspect
+
+revision = "0002"
+description = "Native uuid id columns on Postgres (new ids are time-ordered UUIDv7)"
+
+# Id and foreign key columns as of this revision. Values are already UUID
+# strings, so Postgres converts them in place (36-byte text -> 16-byte
+# uuid, for the column and every index on it). Existing ids are kept:
+# rewriting keys would break links clients already hold. SQLite keeps text
+# columns, where the gain is insert locality from time-ordered ids alone.
+ID_COLUMNS = {
+    "users": ("id",),
+    "posts": ("id", "user_id"),
+    "comments": ("id", "post_id", "user_id"),
+    "likes": ("id", "post_id", "user_id"),
+    "follows": ("id", "follower_id", "following_id"),
+    "tournaments": ("id", "organizer_id"),
+    "matches": ("id", "tournament_id", "competitor_a_id", "competitor_b_id", "winner_id"),
+    "leaderboard": ("id", "user_id"),
+    "leaderboard_snapshots": ("id",),
+    "leaderboard_history": ("user_id",),
+    "leaderboard_history_state": ("user_id",),
+    "ratings": ("id", "user_id"),
+    "rating_history": ("id", "rating_id", "user_id", "match_id"),
+    "user_suggestions": ("user_id", "suggested_user_id"),
+}
+
+def upgrade(conn):
+    if conn.dialect.name != "postgresql":
+        return
+    # Referencing and referenced columns must change type together, which
+    # Postgres cannot do across tables: drop the foreign keys, convert every
+    # table (one rewrite each), then restore the foreign keys
+    inspector = inspect(conn)
+    foreign_keys = [
+        (table, fk) for table in ID_COLUMNS for fk in inspector.get_foreign_keys(table)
+    ]
+    for table, fk in foreign_keys:
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" DROP CONSTRAINT "{fk["name"]}"')
+    for table, columns in ID_COLUMNS.items():
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" ' + ", ".join(
+            f'ALTER COLUMN "{column}" TYPE uuid USING "{column}"::uuid' for column in columns
+        ))
+    for table, fk in foreign_keys:
+        ondelete = fk.get("options", {}).get("ondelete")
+        conn.exec_driver_sql(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{fk["name"]}" '
+            f'FOREIGN KEY ({", ".join(fk["constrained_columns"])}) '
+            f'REFERENCES "{fk["referred_table"]}" ({", ".join(fk["referred_columns"])})'
+            + (f" ON DELETE {ondelete}" if ondelete else "")
+        )
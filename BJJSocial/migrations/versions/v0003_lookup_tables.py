@@ -0,0 +1,163 @@
+import re
+from sqlalchemy import MetaData, Table, Column, SmallInteger, String, select, insert, func
+
+revision = "0003"
+description = "Division dimensions as SMALLINT codes into lookup tables"
+
+# Frozen copy of the lookup tables, their starting rows and the spellings
+# folded together while converting existing rows (see lookups.py for the
+# live versions).
+metadata = MetaData()
+
+DEFAULT_NAMES = {
+    "belts": ("White", "Blue", "Purple", "Brown", "Black", "Grey", "Yellow", "Orange", "Green"),
+    "weight_classes": (
+        "Rooster", "Light Feather", "Feather", "Light", "Middle", "Medium Heavy", "Heavy",
+        "Super Heavy", "Ultra Heavy", "Open Class",
+    ),
+    "age_divisions": ("UNSPECIFIED", "Juvenile", "Adult", *(f"Master {n}" for n in range(1, 8))),
+    "genders": ("Male", "Female"),
+    "rulesets": ("IBJJF", "ADCC", "NAGA", "SJJIF", "UAEJJF"),
+    "tiers": ("LOCAL", "REGIONAL", "NATIONAL", "WORLD"),
+}
+
+ALIASES = {
+    "belts": {"gray": "Grey"},
+    "weight_classes": {"absolute": "Open Class", "open": "Open Class"},
+    "age_divisions": {
+        "adults": "Adult", "juv": "Juvenile", "none": "UNSPECIFIED",
+        **{f"m{n}": f"Master {n}" for n in range(1, 8)},
+        **{f"masters{n}": f"Master {n}" for n in range(1, 8)},
+    },
+    "genders": {
+        "m": "Male", "man": "Male", "men": "Male", "mens": "Male",
+        "f": "Female", "woman": "Female", "women": "Female", "womens": "Female",
+    },
+    "rulesets": {"ajp": "UAEJJF"},
+    "tiers": {},
+}
+
+LOOKUPS = {
+    dimension: Table(
+        dimension, metadata,
+        Column("id", SmallInteger, primary_key=True, autoincrement=False),
+        Column("name", String, nullable=False, unique=True),
+    )
+    for dimension in DEFAULT_NAMES
+}
+
+# Converted columns: table -> {column: lookup table}
+DIVISION = {"belt": "belts", "weight_class": "weight_classes", "age_division": "age_divisions", "gender": "genders"}
+COLUMNS = {
+    "users": DIVISION,
+    "tournaments": {"ruleset": "rulesets", "tier": "tiers"},
+    "matches": DIVISION,
+    "leaderboard": {"ruleset": "rulesets", **DIVISION},
+    "ratings": {"ruleset": "rulesets", **DIVISION},
+}
+
+def _key(dimension, value):
+    key = re.sub(r"[^0-9a-z]+", "", value.casefold())
+    alias = ALIASES[dimension].get(key)
+    return re.sub(r"[^0-9a-z]+", "", alias.casefold()) if alias else key
+
+def _quote(value):
+    return "'" + value.replace("'", "''") + "'"
+
+def _codes(conn, dimension, values):
+    """Code for each existing spelling, adding a lookup row for names not seen before"""
+    lookup = LOOKUPS[dimension]
+    by_key = {_key(dimension, name): code for code, name in conn.execute(select(lookup.c.id, lookup.c.name))}
+    codes = {}
+    for value in values:
+        key = _key(dimension, value)
+        if key not in by_key:
+            by_key[key] = conn.execute(select(func.coalesce(func.max(lookup.c.id), 0) + 1)).scalar()
+            conn.execute(insert(lookup).values(id=by_key[key], name=value.strip()))
+        codes[value] = by_key[key]
+    return codes
+
+def _case(column, codes):
+    if not codes:
+        return "NULL"
+    whens = " ".join(f"WHEN {_quote(value)} THEN {code}" for value, code in codes.items())
+    return f'CASE "{column}" {whens} END'
+
+def _merge_duplicates(conn, table, codes):
+    """Fold rows whose divisions become identical once spellings are normalized
+
+    Leaderboard totals are summed into one row. Of duplicate ratings the
+    most-played one is kept (a season replay recomputes them anyway).
+    """
+    columns = list(codes)
+    extra = {"leaderboard": ("points", "submissions", "wins", "losses"), "ratings": ("matches_played",)}[table]
+    rows = conn.exec_driver_sql(
+        f'SELECT id, user_id, season, is_gi, {", ".join(columns + list(extra))} FROM "{table}"'
+    ).all()
+    groups = {}
+    for row in rows:
+        key = (row[1], row[2], row[3], *(codes[c].get(v) for c, v in zip(columns, row[4:4 + len(columns)])))
+        groups.setdefault(key, []).append(row)
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        totals = [row[4 + len(columns):] for row in group]
+        if table == "leaderboard":
+            keeper, merged = group[0], group[1:]
+            sums = [sum(value or 0 for value in values) for values in zip(*totals)]
+            conn.exec_driver_sql(
+                f'UPDATE leaderboard SET {", ".join(f"{name} = {value}" for name, value in zip(extra, sums))} '
+                f'WHERE id = {_quote(keeper[0])}'
+            )
+        else:
+            group.sort(key=lambda row: row[-1] or 0, reverse=True)
+            keeper, merged = group[0], group[1:]
+            ids = ", ".join(_quote(row[0]) for row in merged)
+            conn.exec_driver_sql(f"UPDATE rating_history SET rating_id = {_quote(keeper[0])} WHERE rating_id IN ({ids})")
+        conn.exec_driver_sql(f'DELETE FROM "{table}" WHERE id IN ({", ".join(_quote(row[0]) for row in merged)})')
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+    for dimension, names in DEFAULT_NAMES.items():
+        if not conn.execute(select(func.count()).select_from(LOOKUPS[dimension])).scalar():
+            conn.execute(insert(LOOKUPS[dimension]), [{"id": code, "name": name} for code, name in enumerate(names, 1)])
+
+    for table, columns in COLUMNS.items():
+        codes = {}
+        for column, dimension in columns.items():
+            values = conn.exec_driver_sql(f'SELECT DISTINCT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL').scalars().all()
+            codes[column] = _codes(conn, dimension, values)
+        if table in ("leaderboard", "ratings"):
+            _merge_duplicates(conn, table, codes)
+        cases = {column: _case(column, column_codes) for column, column_codes in codes.items()}
+
+        if conn.dialect.name == "postgresql":
+            # In place; Postgres rebuilds the table's indexes once
+            conn.exec_driver_sql(f'ALTER TABLE "{table}" ' + ", ".join(
+                f'ALTER COLUMN "{column}" TYPE smallint USING {case}' for column, case in cases.items()
+            ))
+        else:
+            _rebuild_sqlite_table(conn, table, cases)
+
+def _rebuild_sqlite_table(conn, table, cases):
+    """SQLite cannot change a column's type: copy into a new table with SMALLINT columns and swap"""
+    create_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).scalar()
+    index_sqls = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ).scalars().all()
+    columns = [row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')]
+
+    new_table = f"{table}__lookup_new"
+    new_sql = re.sub(rf'^CREATE TABLE "?{table}"?', f'CREATE TABLE "{new_table}"', create_sql)
+    for column in cases:
+        new_sql = re.sub(rf'(\n\s*"?{column}"?\s+)VARCHAR\b', r"\1SMALLINT", new_sql)
+    conn.exec_driver_sql(new_sql)
+    quoted = ", ".join(f'"{column}"' for column in columns)
+    selected = ", ".join(cases.get(column, f'"{column}"') for column in columns)
+    conn.exec_driver_sql(f'INSERT INTO "{new_table}" ({quoted}) SELECT {selected} FROM "{table}"')
+    conn.exec_driver_sql(f'DROP TABLE "{table}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{new_table}" RENAME TO "{table}"')
+    for index_sql in index_sqls:
+        conn.exec_driver_sql(index_sql)
@@ -0,0 +1,111 @@
+from datetime import datetime
+from sqlalchemy import (
+    MetaData, Table, Column, Integer, String, DateTime, LargeBinary, Index, UniqueConstraint, inspect
+)
+
+revision = "0004"
+description = "Month-partitioned posts, comments, likes and matches; archived_partitions; created_at indexes"
+
+# Frozen copies: the archive table, the indexes this revision adds, and
+# how many months of partitions to create ahead (see partitions.py for
+# the live versions).
+metadata = MetaData()
+
+Table(
+    "archived_partitions", metadata,
+    Column("id", String, primary_key=True),
+    Column("table_name", String, nullable=False),
+    Column("period_start", DateTime, nullable=False),
+    Column("period_end", DateTime, nullable=False),
+    Column("row_count", Integer, nullable=False),
+    Column("format", String, nullable=False),
+    Column("payload", LargeBinary, nullable=False),
+    Column("archived_at", DateTime, nullable=False),
+    UniqueConstraint("table_name", "period_start", name="unique_archived_partition"),
+)
+
+INDEXES = {
+    "posts": (("IDX_posts_created", ("created_at",)), ("IDX_posts_user_created", ("user_id", "created_at"))),
+    "comments": (("IDX_comments_post_created", ("post_id", "created_at")),),
+    "likes": (("IDX_likes_post_user", ("post_id", "user_id")),),
+    "matches": (
+        ("IDX_matches_created", ("created_at",)),
+        ("IDX_matches_competitor_a", ("competitor_a_id", "created_at")),
+        ("IDX_matches_competitor_b", ("competitor_b_id", "created_at")),
+        ("IDX_matches_tournament", ("tournament_id",)),
+    ),
+}
+
+PARTITION_MONTHS_AHEAD = 3
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def _create_indexes(conn, table):
+    columns = {column for _, names in INDEXES[table] for column in names}
+    frozen = Table(table, MetaData(), *(Column(name) for name in sorted(columns)))
+    for name, names in INDEXES[table]:
+        Index(name, *(frozen.c[column] for column in names)).create(conn, checkfirst=True)
+
+def _partition(conn, table):
+    """Rebuild ``table`` as a copy range-partitioned by month on created_at"""
+    old = f"{table}_unpartitioned"
+    pkey = inspect(conn).get_pk_constraint(table)["name"]
+    conn.exec_driver_sql(f'UPDATE "{table}" SET created_at = now() WHERE created_at IS NULL')
+    conn.exec_driver_sql(f'ALTER TABLE "{table}" RENAME TO "{old}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{old}" RENAME CONSTRAINT "{pkey}" TO "{old}_pkey"')
+    conn.exec_driver_sql(
+        f'CREATE TABLE "{table}" (LIKE "{old}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'
+    )
+    conn.exec_driver_sql(f'ALTER TABLE "{table}" ALTER COLUMN created_at SET NOT NULL')
+
+    oldest = conn.exec_driver_sql(f'SELECT min(created_at) FROM "{old}"').scalar()
+    now = datetime.utcnow()
+    month = datetime((oldest or now).year, (oldest or now).month, 1)
+    last = _add_months(datetime(now.year, now.month, 1), PARTITION_MONTHS_AHEAD)
+    while month <= last:
+        conn.exec_driver_sql(
+            f'CREATE TABLE "{table}_p{month:%Y_%m}" PARTITION OF "{table}" '
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_add_months(month, 1):%Y-%m-%d}')"
+        )
+        month = _add_months(month, 1)
+    conn.exec_driver_sql(f'CREATE TABLE "{table}_default" PARTITION OF "{table}" DEFAULT')
+
+    conn.exec_driver_sql(f'INSERT INTO "{table}" SELECT * FROM "{old}"')
+    conn.exec_driver_sql(f'DROP TABLE "{old}"')
+    # A partitioned table's unique constraints must include the partition key
+    conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_pkey" PRIMARY KEY (id, created_at)')
+
+def upgrade(conn):
+    metadata.create_all(conn, checkfirst=True)
+    if conn.dialect.name != "postgresql":
+        for table in INDEXES:
+            _create_indexes(conn, table)
+        return
+
+    # Foreign keys can reference a partitioned table only through a unique
+    # constraint that includes created_at, so references to posts and
+    # matches (from comments, likes and rating_history) are dropped; the
+    # ORM relationships and cascades stay. References from the partitioned
+    # tables to ordinary ones (users, tournaments) are restored.
+    inspector = inspect(conn)
+    foreign_keys = [
+        (table, fk) for table in inspector.get_table_names() for fk in inspector.get_foreign_keys(table)
+        if table in INDEXES or fk["referred_table"] in INDEXES
+    ]
+    for table, fk in foreign_keys:
+        conn.exec_driver_sql(f'ALTER TABLE "{table}" DROP CONSTRAINT "{fk["name"]}"')
+    for table in INDEXES:
+        _partition(conn, table)
+        _create_indexes(conn, table)
+    for table, fk in foreign_keys:
+        if fk["referred_table"] in INDEXES:
+            continue
+        ondelete = fk.get("options", {}).get("ondelete")
+        conn.exec_driver_sql(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{fk["name"]}" '
+            f'FOREIGN KEY ({", ".join(fk["constrained_columns"])}) '
+            f'REFERENCES "{fk["referred_table"]}" ({", ".join(fk["referred_columns"])})'
+            + (f" ON DELETE {ondelete}" if ondelete else "")
+        )
@@ -0,0 +1,37 @@
+import logging
+from sqlalchemy import MetaData, Table, Column, Index
+from sqlalchemy.exc import DBAPIError
+
+revision = "0005"
+description = "Tournament listing indexes: date, (ruleset, is_gi, date), trigram on name (Postgres)"
+
+metadata = MetaData()
+
+tournaments = Table("tournaments", metadata, Column("name"), Column("date"), Column("ruleset"), Column("is_gi"))
+
+INDEXES = (
+    Index("IDX_tournaments_date", tournaments.c.date),
+    Index("IDX_tournaments_ruleset_gi_date", tournaments.c.ruleset, tournaments.c.is_gi, tournaments.c.date),
+)
+
+def upgrade(conn):
+    for index in INDEXES:
+        index.create(conn, checkfirst=True)
+    if conn.dialect.name != "postgresql":
+        # No trigram indexes in SQLite: the name filter scans, which is fine
+        # at the size of a tournaments table
+        return
+    try:
+        with conn.begin_nested():
+            conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DBAPIError:
+        # Managed databases may not let this role create extensions; the
+        # name filter still works, as a scan, until someone with the
+        # privilege runs CREATE EXTENSION pg_trgm and this index is added
+        logging.getLogger("bjjsocial.migrations").warning(
+            "pg_trgm is not available; skipping IDX_tournaments_name_trgm"
+        )
+        return
+    conn.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS "IDX_tournaments_name_trgm" ON tournaments USING gin (name gin_trgm_ops)'
+    )
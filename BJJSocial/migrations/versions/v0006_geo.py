@@ -0,0 +1,19 @@
+from sqlalchemy import MetaData, Table, Column, Index, inspect
+
+revision = "0006"
+description = "Geocoded latitude/longitude/geohash on users and tournaments, with geohash indexes"
+
+# Existing rows are geocoded afterwards by `python -m BJJSocial.geo backfill`
+# (the gazetteer is app data, not part of the schema).
+COLUMNS = (("latitude", "FLOAT"), ("longitude", "FLOAT"), ("geohash", "VARCHAR"))
+TABLES = ("users", "tournaments")
+
+def upgrade(conn):
+    inspector = inspect(conn)
+    for table in TABLES:
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for name, sql_type in COLUMNS:
+            if name not in existing:
+                conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN {name} {sql_type}')
+        frozen = Table(table, MetaData(), Column("geohash"))
+        Index(f"IDX_{table}_geohash", frozen.c.geohash).create(conn, checkfirst=True)
@@ -0,0 +1,23 @@
+from sqlalchemy import MetaData, Table, Column, Integer, DateTime, Index, inspect
+
+revision = "0007"
+description = "Trending score on posts with its index, and the trending epoch table"
+
+# Existing posts start at zero and are scored afterwards by
+# `python -m BJJSocial.trending` (weights and half-life are app settings,
+# not part of the schema).
+metadata = MetaData()
+
+trending_state = Table(
+    "trending_state", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("epoch", DateTime, nullable=False),
+)
+
+posts = Table("posts", metadata, Column("trending_score"), Column("id"))
+
+def upgrade(conn):
+    if "trending_score" not in {column["name"] for column in inspect(conn).get_columns("posts")}:
+        conn.exec_driver_sql("ALTER TABLE posts ADD COLUMN trending_score FLOAT DEFAULT 0 NOT NULL")
+    Index("IDX_posts_trending", posts.c.trending_score, posts.c.id).create(conn, checkfirst=True)
+    trending_state.create(conn, checkfirst=True)
@@ -0,0 +1,51 @@
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Integer, Float, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0008"
+description = "post_tags, post_mentions and tag_counts for hashtag and mention lookups"
+
+# Existing posts are tagged afterwards by `python -m BJJSocial.tags backfill`.
+# On Postgres posts is partitioned (0004), and a foreign key can only
+# reference it through (id, created_at), so there the post_id columns
+# carry no foreign key, like comments and likes.
+
+# Ids are native uuid on Postgres since 0002
+ID = String().with_variant(UUID(as_uuid=False), "postgresql")
+
+def _tables(posts_fk):
+    metadata = MetaData()
+    Table("users", metadata, Column("id", ID, primary_key=True))
+    Table("posts", metadata, Column("id", ID, primary_key=True))
+
+    def post_id():
+        if posts_fk:
+            return Column("post_id", ID, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+        return Column("post_id", ID, primary_key=True)
+
+    post_tags = Table(
+        "post_tags", metadata,
+        post_id(),
+        Column("tag", String, primary_key=True),
+        Column("created_at", DateTime, nullable=False),
+    )
+    Index("IDX_post_tags_tag_created", post_tags.c.tag, post_tags.c.created_at, post_tags.c.post_id)
+    post_mentions = Table(
+        "post_mentions", metadata,
+        post_id(),
+        Column("user_id", ID, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        Column("created_at", DateTime, nullable=False),
+    )
+    Index("IDX_post_mentions_user_created", post_mentions.c.user_id, post_mentions.c.created_at, post_mentions.c.post_id)
+    tag_counts = Table(
+        "tag_counts", metadata,
+        Column("tag", String, primary_key=True),
+        Column("post_count", Integer, nullable=False),
+        Column("trending_score", Float, nullable=False),
+        Column("last_used_at", DateTime),
+    )
+    Index("IDX_tag_counts_trending", tag_counts.c.trending_score, tag_counts.c.tag)
+    return (post_tags, post_mentions, tag_counts)
+
+def upgrade(conn):
+    for table in _tables(posts_fk=conn.dialect.name != "postgresql"):
+        table.create(conn, checkfirst=True)
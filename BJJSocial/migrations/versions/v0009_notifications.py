@@ -0,0 +1,41 @@
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Integer, JSON, ForeignKey, Index, inspect
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0009"
+description = "Notification outbox, per-user notifications and the unread counter on users"
+
+# Ids are native uuid on Postgres since 0002
+ID = String().with_variant(UUID(as_uuid=False), "postgresql")
+
+metadata = MetaData()
+
+Table("users", metadata, Column("id", ID, primary_key=True))
+
+notification_outbox = Table(
+    "notification_outbox", metadata,
+    Column("id", ID, primary_key=True),
+    Column("recipient_id", ID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("actor_id", ID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("kind", String, nullable=False),
+    Column("subject_id", ID),
+    Column("created_at", DateTime, nullable=False),
+)
+
+notifications = Table(
+    "notifications", metadata,
+    Column("id", ID, primary_key=True),
+    Column("user_id", ID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("kind", String, nullable=False),
+    Column("subject_id", ID),
+    Column("actor_ids", JSON, nullable=False),
+    Column("actor_count", Integer, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("read_at", DateTime),
+)
+Index("IDX_notifications_user_created", notifications.c.user_id, notifications.c.created_at)
+
+def upgrade(conn):
+    if "unread_notifications" not in {column["name"] for column in inspect(conn).get_columns("users")}:
+        conn.exec_driver_sql("ALTER TABLE users ADD COLUMN unread_notifications INTEGER DEFAULT 0 NOT NULL")
+    notification_outbox.create(conn, checkfirst=True)
+    notifications.create(conn, checkfirst=True)
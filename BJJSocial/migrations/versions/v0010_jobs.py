@@ -0,0 +1,48 @@
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Integer, Text, JSON, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0010"
+description = "Background job queue and schedules; rating_history.match_id index for deferred rating updates"
+
+# Ids are native uuid on Postgres since 0002
+ID = String().with_variant(UUID(as_uuid=False), "postgresql")
+
+metadata = MetaData()
+
+rating_history = Table("rating_history", metadata, Column("match_id"))
+
+jobs = Table(
+    "jobs", metadata,
+    Column("id", ID, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("payload", JSON, nullable=False),
+    Column("dedup_key", String),
+    Column("status", String, nullable=False),
+    Column("attempts", Integer, nullable=False),
+    Column("max_attempts", Integer, nullable=False),
+    Column("run_at", DateTime, nullable=False),
+    Column("locked_by", String),
+    Column("locked_at", DateTime),
+    Column("last_error", Text),
+    Column("created_at", DateTime, nullable=False),
+    Column("finished_at", DateTime),
+)
+Index("IDX_jobs_status_run_at", jobs.c.status, jobs.c.run_at)
+# Unique only among pending jobs, so a finished job's key can be reused
+Index(
+    "IDX_jobs_dedup_key", jobs.c.dedup_key, unique=True,
+    sqlite_where=text("status IN ('queued', 'running')"),
+    postgresql_where=text("status IN ('queued', 'running')"),
+)
+
+job_schedules = Table(
+    "job_schedules", metadata,
+    Column("name", String, primary_key=True),
+    Column("next_run_at", DateTime, nullable=False),
+    Column("last_enqueued_at", DateTime),
+)
+
+def upgrade(conn):
+    jobs.create(conn, checkfirst=True)
+    job_schedules.create(conn, checkfirst=True)
+    Index("IDX_rating_history_match", rating_history.c.match_id).create(conn, checkfirst=True)
@@ -0,0 +1,18 @@
+from sqlalchemy import MetaData, Table, Column, String, Float, Index
+
+revision = "0011"
+description = "Shared rate limit token buckets (RATE_LIMIT_BACKEND=database)"
+
+metadata = MetaData()
+
+rate_limit_buckets = Table(
+    "rate_limit_buckets", metadata,
+    Column("key", String, primary_key=True),
+    Column("tokens", Float, nullable=False),
+    Column("updated_at", Float, nullable=False),
+    Column("full_at", Float, nullable=False),
+)
+Index("IDX_rate_limit_buckets_full_at", rate_limit_buckets.c.full_at)
+
+def upgrade(conn):
+    rate_limit_buckets.create(conn, checkfirst=True)
@@ -0,0 +1,35 @@
+import logging
+from sqlalchemy import MetaData, Table, Column, Index, delete, exists
+
+revision = "0012"
+description = "rating_history: one row per (match_id, user_id), so a match is never rated twice"
+
+metadata = MetaData()
+
+rating_history = Table(
+    "rating_history", metadata, Column("id"), Column("match_id"), Column("user_id")
+)
+
+def upgrade(conn):
+    # A match applied twice before this would block the unique index; keep
+    # the first row. The doubled rating change stays until the season is
+    # replayed (python -m BJJSocial.ratings <season>).
+    earlier = rating_history.alias("earlier")
+    removed = conn.execute(
+        delete(rating_history).where(
+            exists().where(
+                earlier.c.match_id == rating_history.c.match_id,
+                earlier.c.user_id == rating_history.c.user_id,
+                earlier.c.id < rating_history.c.id,
+            )
+        )
+    ).rowcount
+    if removed:
+        logging.getLogger("bjjsocial.migrations").warning(
+            "Removed %d duplicate rating_history rows; replay the affected seasons", removed
+        )
+    Index(
+        "IDX_rating_history_match_user", rating_history.c.match_id, rating_history.c.user_id, unique=True
+    ).create(conn, checkfirst=True)
+    # Superseded: the unique index leads with match_id
+    Index("IDX_rating_history_match", rating_history.c.match_id).drop(conn, checkfirst=True)
@@ -0,0 +1,26 @@
+from sqlalchemy import MetaData, Table, Column, String, DateTime, Integer, Float, Boolean
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "0013"
+description = "user_suggestions_staging, written by the recommendations rebuild before the swap"
+
+# Ids are native uuid on Postgres since 0002
+ID = String().with_variant(UUID(as_uuid=False), "postgresql")
+
+metadata = MetaData()
+
+user_suggestions_staging = Table(
+    "user_suggestions_staging", metadata,
+    Column("user_id", ID, primary_key=True),
+    Column("position", Integer, primary_key=True),
+    Column("suggested_user_id", ID, nullable=False),
+    Column("score", Float, nullable=False),
+    Column("mutual_follows", Integer, nullable=False),
+    Column("shared_brackets", Integer, nullable=False),
+    Column("same_school", Boolean, nullable=False),
+    Column("same_instructor", Boolean, nullable=False),
+    Column("computed_at", DateTime, nullable=False),
+)
+
+def upgrade(conn):
+    user_suggestions_staging.create(conn, checkfirst=True)
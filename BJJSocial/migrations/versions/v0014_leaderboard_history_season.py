@@ -0,0 +1,24 @@
+from sqlalchemy import MetaData, Table, Column, String, Index, func, inspect, update
+
+revision = "0014"
+description = "leaderboard_history.season, so a season filter does not depend on collation"
+
+metadata = MetaData()
+
+leaderboard_history = Table(
+    "leaderboard_history", metadata, Column("user_id"), Column("division"), Column("season", String)
+)
+
+def upgrade(conn):
+    if "season" not in {column["name"] for column in inspect(conn).get_columns("leaderboard_history")}:
+        conn.exec_driver_sql("ALTER TABLE leaderboard_history ADD COLUMN season VARCHAR")
+    # Season is the division string up to the first "|"
+    division = leaderboard_history.c.division
+    if conn.dialect.name == "postgresql":
+        season = func.split_part(division, "|", 1)
+    else:
+        season = func.substr(division, 1, func.instr(division, "|") - 1)
+    conn.execute(update(leaderboard_history).where(leaderboard_history.c.season.is_(None)).values(season=season))
+    Index(
+        "IDX_leaderboard_history_user_season", leaderboard_history.c.user_id, leaderboard_history.c.season
+    ).create(conn, checkfirst=True)
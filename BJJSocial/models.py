@@ -1,18 +1,82 @@
 from sqlalchemy import (
-    Boolean, Column, Integer, String, Text, DateTime, ForeignKey,
-    Index, UniqueConstraint, JSON
+    Boolean, Column, Integer, SmallInteger, Float, String, Text, DateTime, ForeignKey, LargeBinary,
+    Index, UniqueConstraint, JSON, Table, TypeDecorator, event
 )
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship, defer
+from sqlalchemy.sql import func, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from datetime import datetime
+import os
+import time
 import uuid
 
 from database import Base
+from .lookups import Lookup, mappings as lookup_mappings
+from . import geo  # registers the geocoding flush hook
+
+# IDs are time-ordered UUIDs (version 7): new rows land at the right-hand
+# edge of primary key and foreign key indexes instead of at random pages.
+# Rows created before the switch keep their UUID4 ids; both are ordinary
+# UUID strings to the API.
+NIL_UUID = "00000000-0000-0000-0000-000000000000"
+
+def uuid7(timestamp_ms=None, randomness=None):
+    """RFC 9562 version 7 UUID: 48-bit Unix milliseconds, then 74 random bits"""
+    if timestamp_ms is None:
+        timestamp_ms = time.time_ns() // 1_000_000
+    if randomness is None:
+        randomness = int.from_bytes(os.urandom(10), "big")
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80 | randomness & (1 << 80) - 1
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
 
 # Helper function for UUID generation
 def generate_uuid():
-    return str(uuid.uuid4())
+    return str(uuid7())
+
+def uuid7_time(value):
+    """Creation time (naive UTC) encoded in a UUIDv7 string; None for other ids"""
+    try:
+        parsed = uuid.UUID(value)
+    except (TypeError, ValueError, AttributeError):
+        return None
+    if parsed.version != 7:
+        return None
+    return datetime.utcfromtimestamp((parsed.int >> 80) / 1000)
+
+class UUIDString(TypeDecorator):
+    """UUID string in Python and the API; native 16-byte uuid on Postgres, text elsewhere"""
+
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(PGUUID(as_uuid=False))
+        return dialect.type_descriptor(String())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "postgresql":
+            return value
+        try:
+            return str(uuid.UUID(value))
+        except (TypeError, ValueError, AttributeError):
+            # A malformed id from a URL matches no row (404) instead of
+            # failing the cast in Postgres
+            return NIL_UUID
+
+# Lookup tables for division dimensions (see lookups.py); new databases
+# start with lookups.DEFAULT_NAMES
+for _dimension, _mapping in lookup_mappings.items():
+    event.listen(
+        Table(
+            _dimension, Base.metadata,
+            Column("id", SmallInteger, primary_key=True, autoincrement=False),
+            Column("name", String, nullable=False, unique=True),
+        ),
+        "after_create", _mapping.populate
+    )
 
 # Sessions table (required for authentication)
 class Session(Base):
@@ -30,7 +94,7 @@ class Session(Base):
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
     email = Column(String, nullable=False, unique=True)
     password = Column(String, nullable=False)
     first_name = Column("first_name", String)
@@ -38,10 +102,10 @@ class User(Base):
     profile_image_url = Column("profile_image_url", String)
     
     # BJJ-specific fields
-    belt = Column(String, default="White")
+    belt = Column(Lookup("belts"), default="White")
     stripes = Column(Integer, default=0)
     weight = Column(String)
-    weight_class = Column("weight_class", String)
+    weight_class = Column("weight_class", Lookup("weight_classes"))
     school = Column(String)
     instructor = Column(String)
     years_training = Column("years_training", String)
@@ -50,13 +114,18 @@ class User(Base):
     losses = Column(Integer, default=0)
     bio = Column(Text)
     location = Column(String)
-    age_division = Column("age_division", String)
-    gender = Column(String)
+    # Geocoded from location (see geo.py)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String)
+    age_division = Column("age_division", Lookup("age_divisions"))
+    gender = Column(Lookup("genders"))
     
     # Social stats
     followers_count = Column("followers_count", Integer, default=0)
     following_count = Column("following_count", Integer, default=0)
     posts_count = Column("posts_count", Integer, default=0)
+    unread_notifications = Column("unread_notifications", Integer, nullable=False, default=0)
     
     created_at = Column("created_at", DateTime, default=func.now())
     updated_at = Column("updated_at", DateTime, default=func.now(), onupdate=func.now())
@@ -82,18 +151,24 @@ class User(Base):
     tournaments = relationship("Tournament", back_populates="organizer")
     leaderboard_entries = relationship("Leaderboard", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('IDX_users_geohash', 'geohash'),
+    )
+
 # Posts table
 class Post(Base):
     __tablename__ = "posts"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text, nullable=False)
     type = Column(String, nullable=False, default="general")
     location = Column(String)
     image_urls = Column("image_urls", JSON, default=list)
     likes = Column(Integer, default=0)
     shares = Column(Integer, default=0)
+    # Decayed engagement, relative to the trending epoch (see trending.py)
+    trending_score = Column("trending_score", Float, nullable=False, default=0.0)
     created_at = Column("created_at", DateTime, default=func.now())
     updated_at = Column("updated_at", DateTime, default=func.now(), onupdate=func.now())
     
@@ -102,13 +177,19 @@ class Post(Base):
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
     post_likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('IDX_posts_created', 'created_at'),
+        Index('IDX_posts_user_created', 'user_id', 'created_at'),
+        Index('IDX_posts_trending', 'trending_score', 'id'),
+    )
+
 # Comments table
 class Comment(Base):
     __tablename__ = "comments"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    post_id = Column("post_id", String, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    post_id = Column("post_id", UUIDString, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     content = Column(Text, nullable=False)
     created_at = Column("created_at", DateTime, default=func.now())
     
@@ -116,26 +197,72 @@ class Comment(Base):
     post = relationship("Post", back_populates="comments")
     user = relationship("User", back_populates="comments")
 
-# Likes table
+    __table_args__ = (
+        Index('IDX_comments_post_created', 'post_id', 'created_at'),
+    )
+
+# Hashtags and @mentions parsed out of post content when the post is
+# written (see tags.py). created_at is the post's, so a tag's or a user's
+# posts read newest first straight off the index.
+class PostTag(Base):
+    __tablename__ = "post_tags"
+    
+    post_id = Column("post_id", UUIDString, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    created_at = Column("created_at", DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('IDX_post_tags_tag_created', 'tag', 'created_at', 'post_id'),
+    )
+
+class PostMention(Base):
+    __tablename__ = "post_mentions"
+    
+    post_id = Column("post_id", UUIDString, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column("created_at", DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('IDX_post_mentions_user_created', 'user_id', 'created_at', 'post_id'),
+    )
+
+# Per-tag totals, kept up to date as posts are written
+class TagCount(Base):
+    __tablename__ = "tag_counts"
+    
+    tag = Column(String, primary_key=True)
+    post_count = Column("post_count", Integer, nullable=False, default=0)
+    # Decayed use count, relative to the trending epoch (see trending.py)
+    trending_score = Column("trending_score", Float, nullable=False, default=0.0)
+    last_used_at = Column("last_used_at", DateTime)
+
+    __table_args__ = (
+        Index('IDX_tag_counts_trending', 'trending_score', 'tag'),
+    )
+
 class Like(Base):
     __tablename__ = "likes"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    post_id = Column("post_id", String, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
-    user_id = Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    post_id = Column("post_id", UUIDString, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column("created_at", DateTime, default=func.now())
     
     # Relationships
     post = relationship("Post", back_populates="post_likes")
     user = relationship("User", back_populates="likes")
 
+    __table_args__ = (
+        Index('IDX_likes_post_user', 'post_id', 'user_id'),
+    )
+
 # Follows table
 class Follow(Base):
     __tablename__ = "follows"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    follower_id = Column("follower_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    following_id = Column("following_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    follower_id = Column("follower_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    following_id = Column("following_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     created_at = Column("created_at", DateTime, default=func.now())
     
     # Relationships
@@ -146,34 +273,49 @@ class Follow(Base):
 class Tournament(Base):
     __tablename__ = "tournaments"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
     name = Column(String, nullable=False)
     date = Column(DateTime, nullable=False)
     location = Column(String)
+    # Geocoded from location (see geo.py)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String)
     is_gi = Column("is_gi", Boolean, nullable=False, default=True)
-    ruleset = Column(String, nullable=False, default="IBJJF")
-    tier = Column(String, nullable=False, default="LOCAL")
-    organizer_id = Column("organizer_id", String, ForeignKey("users.id"), nullable=False)
+    ruleset = Column(Lookup("rulesets"), nullable=False, default="IBJJF")
+    tier = Column(Lookup("tiers"), nullable=False, default="LOCAL")
+    organizer_id = Column("organizer_id", UUIDString, ForeignKey("users.id"), nullable=False)
     created_at = Column("created_at", DateTime, default=func.now())
     
     # Relationships
     organizer = relationship("User", back_populates="tournaments")
     matches = relationship("Match", back_populates="tournament", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('IDX_tournaments_date', 'date'),
+        Index('IDX_tournaments_ruleset_gi_date', 'ruleset', 'is_gi', 'date'),
+        Index('IDX_tournaments_geohash', 'geohash'),
+        # Substring search on name (needs the pg_trgm extension)
+        Index(
+            'IDX_tournaments_name_trgm', 'name',
+            postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}
+        ).ddl_if(dialect='postgresql'),
+    )
+
 # Matches table
 class Match(Base):
     __tablename__ = "matches"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
-    tournament_id = Column("tournament_id", String, ForeignKey("tournaments.id", ondelete="CASCADE"), nullable=False)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    tournament_id = Column("tournament_id", UUIDString, ForeignKey("tournaments.id", ondelete="CASCADE"), nullable=False)
     round = Column(String, nullable=False)
-    belt = Column(String, nullable=False)
-    weight_class = Column("weight_class", String, nullable=False)
-    age_division = Column("age_division", String)
-    gender = Column(String, nullable=False)
-    competitor_a_id = Column("competitor_a_id", String, ForeignKey("users.id"), nullable=False)
-    competitor_b_id = Column("competitor_b_id", String, ForeignKey("users.id"), nullable=False)
-    winner_id = Column("winner_id", String, ForeignKey("users.id"))
+    belt = Column(Lookup("belts"), nullable=False)
+    weight_class = Column("weight_class", Lookup("weight_classes"), nullable=False)
+    age_division = Column("age_division", Lookup("age_divisions"))
+    gender = Column(Lookup("genders"), nullable=False)
+    competitor_a_id = Column("competitor_a_id", UUIDString, ForeignKey("users.id"), nullable=False)
+    competitor_b_id = Column("competitor_b_id", UUIDString, ForeignKey("users.id"), nullable=False)
+    winner_id = Column("winner_id", UUIDString, ForeignKey("users.id"))
     method = Column(String)
     submission_type = Column("submission_type", String)
     points_a = Column("points_a", Integer, default=0)
@@ -194,19 +336,26 @@ class Match(Base):
     competitor_b = relationship("User", foreign_keys=[competitor_b_id])
     winner = relationship("User", foreign_keys=[winner_id])
 
+    __table_args__ = (
+        Index('IDX_matches_created', 'created_at'),
+        Index('IDX_matches_competitor_a', 'competitor_a_id', 'created_at'),
+        Index('IDX_matches_competitor_b', 'competitor_b_id', 'created_at'),
+        Index('IDX_matches_tournament', 'tournament_id'),
+    )
+
 # Leaderboard table
 class Leaderboard(Base):
     __tablename__ = "leaderboard"
     
-    id = Column(String, primary_key=True, default=generate_uuid)
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
     season = Column(String, nullable=False)
-    ruleset = Column(String, nullable=False)
+    ruleset = Column(Lookup("rulesets"), nullable=False)
     is_gi = Column("is_gi", Boolean, nullable=False)
-    belt = Column(String, nullable=False)
-    weight_class = Column("weight_class", String, nullable=False)
-    age_division = Column("age_division", String, nullable=False, default="UNSPECIFIED")
-    gender = Column(String, nullable=False)
-    user_id = Column("user_id", String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    belt = Column(Lookup("belts"), nullable=False)
+    weight_class = Column("weight_class", Lookup("weight_classes"), nullable=False)
+    age_division = Column("age_division", Lookup("age_divisions"), nullable=False, default="UNSPECIFIED")
+    gender = Column(Lookup("genders"), nullable=False)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     points = Column(Integer, default=0)
     submissions = Column(Integer, default=0)
     wins = Column(Integer, default=0)
@@ -224,3 +373,262 @@ class Leaderboard(Base):
             name='unique_leaderboard_entry'
         ),
     )
+
+# Leaderboard snapshots table (one row per snapshot run)
+class LeaderboardSnapshot(Base):
+    __tablename__ = "leaderboard_snapshots"
+    
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    taken_at = Column("taken_at", DateTime, nullable=False, index=True)
+    changed_rows = Column("changed_rows", Integer, nullable=False, default=0)
+
+# Leaderboard history table. Delta-encoded: a row is written only when an
+# athlete's rank or points in a division changed since the previous
+# snapshot, so a value holds until the next row for the same key. A NULL
+# rank means the athlete left the division. The primary key doubles as the
+# only index, so one user's history is a single index range.
+class LeaderboardHistory(Base):
+    __tablename__ = "leaderboard_history"
+    
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    division = Column(String, primary_key=True)
+    taken_at = Column("taken_at", DateTime, primary_key=True)
+    rank = Column(Integer)
+    points = Column(Integer)
+    # The division's season, for the history endpoint's season filter
+    season = Column(String)
+    
+    __table_args__ = (
+        Index('IDX_leaderboard_history_user_season', 'user_id', 'season'),
+    )
+
+# Last snapshotted rank/points per live (user, division), used to compute
+# the next snapshot's deltas without scanning history
+class LeaderboardHistoryState(Base):
+    __tablename__ = "leaderboard_history_state"
+    
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    division = Column(String, primary_key=True)
+    rank = Column(Integer, nullable=False)
+    points = Column(Integer, nullable=False)
+
+# Skill ratings table (one Elo rating per athlete per division)
+class Rating(Base):
+    __tablename__ = "ratings"
+    
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    season = Column(String, nullable=False)
+    ruleset = Column(Lookup("rulesets"), nullable=False)
+    is_gi = Column("is_gi", Boolean, nullable=False)
+    belt = Column(Lookup("belts"), nullable=False)
+    weight_class = Column("weight_class", Lookup("weight_classes"), nullable=False)
+    age_division = Column("age_division", Lookup("age_divisions"), nullable=False, default="UNSPECIFIED")
+    gender = Column(Lookup("genders"), nullable=False)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    rating = Column(Float, nullable=False, default=1500.0)
+    matches_played = Column("matches_played", Integer, nullable=False, default=0)
+    last_updated = Column("last_updated", DateTime, default=func.now())
+    
+    # Unique constraint
+    __table_args__ = (
+        UniqueConstraint(
+            'user_id', 'season', 'ruleset', 'is_gi', 'belt',
+            'weight_class', 'age_division', 'gender',
+            name='unique_rating_entry'
+        ),
+    )
+
+# Rating history table (one row per athlete per rated match, for charts)
+class RatingHistory(Base):
+    __tablename__ = "rating_history"
+    
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    rating_id = Column("rating_id", UUIDString, ForeignKey("ratings.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    match_id = Column("match_id", UUIDString, ForeignKey("matches.id", ondelete="CASCADE"), nullable=False)
+    season = Column(String, nullable=False)
+    rating_before = Column("rating_before", Float, nullable=False)
+    rating_after = Column("rating_after", Float, nullable=False)
+    played_at = Column("played_at", DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index('IDX_rating_history_user', 'user_id', 'played_at'),
+        Index('IDX_rating_history_season', 'season'),
+        # The ratings.apply_match job's already-applied check; unique, so
+        # a match can never be applied twice
+        Index('IDX_rating_history_match_user', 'match_id', 'user_id', unique=True),
+    )
+
+# Precomputed "who to follow" suggestions, rebuilt by the recommendations
+# batch job. Keyed (user_id, position) so one user's list is a single
+# primary-key range read in display order.
+class UserSuggestion(Base):
+    __tablename__ = "user_suggestions"
+    
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    suggested_user_id = Column("suggested_user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
+    mutual_follows = Column("mutual_follows", Integer, nullable=False, default=0)
+    shared_brackets = Column("shared_brackets", Integer, nullable=False, default=0)
+    same_school = Column("same_school", Boolean, nullable=False, default=False)
+    same_instructor = Column("same_instructor", Boolean, nullable=False, default=False)
+    computed_at = Column("computed_at", DateTime, nullable=False)
+
+# Where a rebuild writes its suggestions, chunk by chunk, before copying
+# them into user_suggestions in one short transaction. No foreign keys:
+# rows for users deleted meanwhile are dropped by that copy.
+class UserSuggestionStaging(Base):
+    __tablename__ = "user_suggestions_staging"
+    
+    user_id = Column("user_id", UUIDString, primary_key=True)
+    position = Column(Integer, primary_key=True)
+    suggested_user_id = Column("suggested_user_id", UUIDString, nullable=False)
+    score = Column(Float, nullable=False)
+    mutual_follows = Column("mutual_follows", Integer, nullable=False)
+    shared_brackets = Column("shared_brackets", Integer, nullable=False)
+    same_school = Column("same_school", Boolean, nullable=False)
+    same_instructor = Column("same_instructor", Boolean, nullable=False)
+    computed_at = Column("computed_at", DateTime, nullable=False)
+
+# Cold months of posts/comments/likes/matches moved out of the live tables
+# by the archival job (see partitions.py): one gzipped JSON-lines payload
+# per table per month.
+class ArchivedPartition(Base):
+    __tablename__ = "archived_partitions"
+    
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    table_name = Column("table_name", String, nullable=False)
+    period_start = Column("period_start", DateTime, nullable=False)
+    period_end = Column("period_end", DateTime, nullable=False)
+    row_count = Column("row_count", Integer, nullable=False)
+    format = Column(String, nullable=False, default="jsonl.gz")
+    payload = Column(LargeBinary, nullable=False)
+    archived_at = Column("archived_at", DateTime, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint('table_name', 'period_start', name='unique_archived_partition'),
+    )
+
+# Notification events written in the same transaction as the action that
+# caused them (a transactional outbox); the delivery worker coalesces them
+# into notifications and deletes them (see notifications.py)
+class NotificationEvent(Base):
+    __tablename__ = "notification_outbox"
+    
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    recipient_id = Column("recipient_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    actor_id = Column("actor_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)
+    subject_id = Column("subject_id", UUIDString)
+    created_at = Column("created_at", DateTime, nullable=False)
+
+# Per-user inbox. One row covers every actor of the same kind on the same
+# subject until it is read ("12 people liked your post").
+class Notification(Base):
+    __tablename__ = "notifications"
+    
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    user_id = Column("user_id", UUIDString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)
+    subject_id = Column("subject_id", UUIDString)
+    # Most recent actors first, up to notifications.ACTORS_TRACKED
+    actor_ids = Column("actor_ids", JSON, nullable=False, default=list)
+    actor_count = Column("actor_count", Integer, nullable=False, default=1)
+    created_at = Column("created_at", DateTime, nullable=False)
+    read_at = Column("read_at", DateTime)
+    
+    __table_args__ = (
+        Index('IDX_notifications_user_created', 'user_id', 'created_at'),
+    )
+
+# Deferred and periodic work (see jobs.py). A dedup_key is unique among
+# jobs still queued or running, so enqueueing the same work twice is a no-op
+# until the first copy finishes.
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(UUIDString, primary_key=True, default=generate_uuid)
+    name = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False, default=dict)
+    dedup_key = Column("dedup_key", String)
+    status = Column(String, nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column("max_attempts", Integer, nullable=False)
+    run_at = Column("run_at", DateTime, nullable=False)
+    locked_by = Column("locked_by", String)
+    locked_at = Column("locked_at", DateTime)
+    last_error = Column("last_error", Text)
+    created_at = Column("created_at", DateTime, nullable=False)
+    finished_at = Column("finished_at", DateTime)
+    
+    __table_args__ = (
+        Index('IDX_jobs_status_run_at', 'status', 'run_at'),
+        Index(
+            'IDX_jobs_dedup_key', 'dedup_key', unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+    )
+
+# When each periodic job is next due, shared by every instance's scheduler
+class JobSchedule(Base):
+    __tablename__ = "job_schedules"
+    
+    name = Column(String, primary_key=True)
+    next_run_at = Column("next_run_at", DateTime, nullable=False)
+    last_enqueued_at = Column("last_enqueued_at", DateTime)
+
+# Token buckets shared by every instance when RATE_LIMIT_BACKEND=database
+# (see ratelimit.py). Times are Unix seconds; a bucket past full_at has
+# refilled and is deleted by the ratelimit.evict job.
+class RateLimitBucket(Base):
+    __tablename__ = "rate_limit_buckets"
+    
+    key = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    updated_at = Column("updated_at", Float, nullable=False)
+    full_at = Column("full_at", Float, nullable=False)
+    
+    __table_args__ = (
+        Index('IDX_rate_limit_buckets_full_at', 'full_at'),
+    )
+
+# The single row holding the epoch trending scores are relative to
+class TrendingState(Base):
+    __tablename__ = "trending_state"
+    
+    id = Column(Integer, primary_key=True)
+    epoch = Column(DateTime, nullable=False)
+
+# Columns that identify a ranking division (Leaderboard and Rating rows)
+DIVISION_FIELDS = ("season", "ruleset", "is_gi", "belt", "weight_class", "age_division", "gender")
+
+# ============= Projections =============
+# Column subsets for read paths that never need the whole row. A "card" is
+# what list endpoints (followers, feed authors, match competitors, ...)
+# render; the full row minus the password hash is reserved for profiles.
+USER_CARD_COLUMNS = (
+    User.id,
+    User.first_name,
+    User.last_name,
+    User.belt,
+    User.stripes,
+    User.school,
+)
+
+def user_profile_options():
+    """Query options for profile views: every column except the password hash"""
+    return (defer(User.password),)
+
+def user_cards_query(db):
+    """Select card columns only; rows come back as lightweight tuples"""
+    return db.query(*USER_CARD_COLUMNS)
+
+def load_user_cards(db, user_ids):
+    """Fetch card rows for ``user_ids`` in a single IN query, keyed by id"""
+    ids = {user_id for user_id in user_ids if user_id}
+    if not ids:
+        return {}
+    rows = user_cards_query(db).filter(User.id.in_(ids)).all()
+    return {row.id: row for row in rows}
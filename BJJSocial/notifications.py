@@ -0,0 +1,185 @@
+import os
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, case, or_, bindparam
+
+from .database import get_db_context
+from .models import User, Notification, NotificationEvent
+
+# Notifications. Write paths call enqueue() to add an event to
+# notification_outbox inside their own transaction, so an event exists
+# exactly when the like/comment/follow/result it describes was committed,
+# and the request never writes to anyone's inbox. deliver() takes the
+# oldest events in a batch, groups them by (recipient, kind, subject), and
+# folds each group into the recipient's unread notification for that key,
+# or a new one: a burst of likes becomes "Ana and 11 others liked your
+# post". users.unread_notifications counts unread rows, so the badge is
+# one primary-key read.
+
+LIKE = "like"
+COMMENT = "comment"
+FOLLOW = "follow"
+MATCH_RESULT = "match_result"
+
+VERBS = {
+    LIKE: "liked your post",
+    COMMENT: "commented on your post",
+    FOLLOW: "started following you",
+    MATCH_RESULT: "posted your match result",
+}
+
+# Actors named in a summary, and distinct actors remembered per
+# notification so someone who likes, unlikes and likes again counts once
+# (past that many, repeat actors may be counted twice)
+ACTORS_SHOWN = 3
+ACTORS_TRACKED = 50
+
+NOTIFICATION_BATCH_SIZE = int(os.getenv("NOTIFICATION_BATCH_SIZE", "1000"))
+NOTIFICATION_DELIVERY_INTERVAL_SEC = float(os.getenv("NOTIFICATION_DELIVERY_INTERVAL_SEC", "2"))
+
+def enqueue(db, recipient_id, kind, actor_id, subject_id=None):
+    """Add an event to the outbox in ``db``'s transaction; nobody is notified of their own actions"""
+    if recipient_id is None or recipient_id == actor_id:
+        return
+    db.add(NotificationEvent(
+        recipient_id=recipient_id, actor_id=actor_id, kind=kind, subject_id=subject_id,
+        created_at=datetime.utcnow()
+    ))
+
+def _merge_actors(new, old):
+    """Most recent first, without repeats; returns (tracked actors, how many of ``new`` were not in ``old``)"""
+    merged = list(dict.fromkeys([*new, *old]))
+    return merged[:ACTORS_TRACKED], len(merged) - len(old)
+
+def deliver(db, batch_size=NOTIFICATION_BATCH_SIZE):
+    """Move one batch of outbox events into inboxes; returns the number of events consumed"""
+    stmt = select(NotificationEvent).order_by(NotificationEvent.id).limit(batch_size)
+    if db.get_bind().dialect.name == "postgresql":
+        # Concurrent workers take disjoint batches
+        stmt = stmt.with_for_update(skip_locked=True)
+    events = db.execute(stmt).scalars().all()
+    if not events:
+        db.commit()
+        return 0
+
+    # Newest actor first within each group
+    groups = defaultdict(list)
+    for event in events:
+        groups[(event.recipient_id, event.kind, event.subject_id)].append(event)
+    for group in groups.values():
+        group.reverse()
+
+    # Unread notifications these groups fold into, one query per kind. Two
+    # workers folding the same key at once can each add a row; that only
+    # splits one notification in two.
+    open_rows = {}
+    keys_by_kind = defaultdict(lambda: (set(), set()))
+    for recipient_id, kind, subject_id in groups:
+        recipients, subjects = keys_by_kind[kind]
+        recipients.add(recipient_id)
+        subjects.add(subject_id)
+    for kind, (recipients, subjects) in keys_by_kind.items():
+        subject = Notification.subject_id.in_(subjects - {None})
+        if None in subjects:
+            subject = or_(subject, Notification.subject_id.is_(None))
+        rows = db.execute(
+            select(Notification.id, Notification.user_id, Notification.subject_id,
+                   Notification.actor_ids, Notification.actor_count)
+            .where(
+                Notification.user_id.in_(recipients), Notification.kind == kind,
+                subject, Notification.read_at.is_(None)
+            )
+        ).all()
+        for row in rows:
+            open_rows[(row.user_id, kind, row.subject_id)] = row
+
+    new_rows, unread = [], defaultdict(int)
+
+    def add_new(key, actors, latest):
+        recipient_id, kind, subject_id = key
+        new_rows.append({
+            "user_id": recipient_id, "kind": kind, "subject_id": subject_id,
+            "actor_ids": actors[:ACTORS_TRACKED], "actor_count": len(actors), "created_at": latest,
+        })
+        unread[recipient_id] += 1
+
+    table = Notification.__table__
+    for key, group in groups.items():
+        actors = list(dict.fromkeys(event.actor_id for event in group))
+        latest = group[0].created_at
+        existing = open_rows.get(key)
+        if existing is None:
+            add_new(key, actors, latest)
+            continue
+        tracked, added = _merge_actors(actors, existing.actor_ids or [])
+        # A folded-in event moves the notification back to the top. One
+        # statement per row, to see which ones were marked read since the
+        # select above: those get a new unread notification instead.
+        folded = db.execute(
+            update(table).where(table.c.id == existing.id, table.c.read_at.is_(None)).values(
+                actor_ids=tracked, actor_count=existing.actor_count + added, created_at=latest
+            )
+        ).rowcount
+        if not folded:
+            add_new(key, actors, latest)
+
+    if new_rows:
+        db.execute(insert(Notification), new_rows)
+    if unread:
+        table = User.__table__
+        db.execute(
+            update(table).where(table.c.id == bindparam("recipient")).values(
+                unread_notifications=table.c.unread_notifications + bindparam("delta")
+            ),
+            [{"recipient": recipient_id, "delta": delta} for recipient_id, delta in unread.items()]
+        )
+    db.execute(delete(NotificationEvent.__table__).where(NotificationEvent.id.in_([event.id for event in events])))
+    db.commit()
+    return len(events)
+
+def deliver_pending(db):
+    """Deliver batches until the outbox is drained; returns the number of events consumed"""
+    total = 0
+    while True:
+        delivered = deliver(db)
+        total += delivered
+        if delivered < NOTIFICATION_BATCH_SIZE:
+            return total
+
+def mark_read(db, user_id, ids=None):
+    """Mark a user's notifications read (all of them without ``ids``); returns how many changed"""
+    stmt = update(Notification.__table__).where(
+        Notification.user_id == user_id, Notification.read_at.is_(None)
+    ).values(read_at=datetime.utcnow())
+    if ids is not None:
+        stmt = stmt.where(Notification.id.in_(ids))
+    changed = db.execute(stmt).rowcount
+    if changed:
+        unread = User.__table__.c.unread_notifications
+        db.execute(
+            update(User.__table__).where(User.__table__.c.id == user_id)
+            .values(unread_notifications=case((unread > changed, unread - changed), else_=0))
+        )
+    db.commit()
+    return changed
+
+def summary(notification, actors):
+    """One line for a notification, e.g. "Ana Silva and 11 others liked your post" """
+    names = [
+        " ".join(part for part in (actor.first_name, actor.last_name) if part) or "Someone"
+        for actor in actors
+    ]
+    count = notification.actor_count
+    if not names:
+        who = "Someone" if count == 1 else f"{count} people"
+    elif count == 1:
+        who = names[0]
+    elif count == 2 and len(names) > 1:
+        who = f"{names[0]} and {names[1]}"
+    else:
+        who = f"{names[0]} and {count - 1} other{'s' if count > 2 else ''}"
+    return f"{who} {VERBS.get(notification.kind, notification.kind)}"
+
+if __name__ == "__main__":
+    with get_db_context() as db:
+        print(f"Delivered {deliver_pending(db)} notification events")
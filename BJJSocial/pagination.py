@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime, timezone
+
+# Keyset ("cursor") pagination. A cursor is the sort key of the last row
+# on a page, opaque to clients: the next page starts strictly after it, so
+# reading page N costs the same as page 1 (OFFSET reads and discards every
+# earlier row) and rows inserted meanwhile do not shift pages. Endpoints
+# return the next cursor in the X-Next-Cursor header, leaving the body
+# shape unchanged; no header means there are no more rows.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def naive_utc(value):
+    """``value`` as the naive UTC datetime the database stores; naive values are taken as UTC already"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode(value):
+    if isinstance(value, dict):
+        return naive_utc(datetime.fromisoformat(value["dt"]))
+    return value
+
+def encode_cursor(*values):
+    raw = json.dumps([_encode(value) for value in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, types):
+    """Sort key values from ``cursor``; ValueError if it is malformed or its values are not of ``types``
+
+    ``types`` has one type per sort key, e.g. ``(datetime, str)``, so a
+    forged cursor never binds a value of the wrong type.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = [_decode(value) for value in json.loads(raw)]
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if len(values) != len(types) or not all(isinstance(value, kind) for value, kind in zip(values, types)):
+        raise ValueError("Invalid cursor")
+    return values
+
+def page(rows, limit, key):
+    """Trim a ``limit + 1`` row fetch to ``limit``; returns (rows, next cursor or None)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+def with_next_cursor(response, cursor):
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return response
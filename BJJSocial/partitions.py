@@ -0,0 +1,324 @@
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, delete, func, true, DateTime
+from sqlalchemy.exc import IntegrityError
+
+from .database import engine, get_db_context
+from .models import Post, Comment, Like, Match, PostTag, PostMention, ArchivedPartition, uuid7_time
+
+# Time-partitioned storage for the tables that grow without bound. Nearly
+# every read wants recent rows (the feed by created_at, an athlete's latest
+# matches), so:
+#
+# * On Postgres, migration 0004 turns posts, comments, likes and matches
+#   into tables range-partitioned by month on created_at (plus a default
+#   partition). ensure_partitions keeps PARTITION_MONTHS_AHEAD months
+#   created ahead of time.
+# * Queries carry a created_at bound so the planner prunes partitions:
+#   recent_first for "newest N" listings, and created_near/created_since
+#   for lookups by id, whose UUIDv7 timestamp says when the row was made.
+#   On SQLite the same bounds are ranges on the created_at indexes.
+# * The archival job moves cold months out of the live tables into
+#   archived_partitions as gzipped JSON lines (Postgres detaches and drops
+#   the month's partitions). restore_period puts a month back.
+#
+# Archival is off unless ARCHIVE_AFTER_MONTHS / ARCHIVE_MATCHES_AFTER_MONTHS
+# are set. A month of posts is archived together with every comment and
+# like on those posts, so nothing live points at an archived post. Matches
+# are archived on their own schedule: rating history keeps its match ids,
+# but replaying an archived season needs the month restored first.
+
+logger = logging.getLogger("bjjsocial.partitions")
+
+# Partitioned tables and their partition key
+PARTITIONED = {
+    "posts": "created_at",
+    "comments": "created_at",
+    "likes": "created_at",
+    "matches": "created_at",
+}
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
+# Months older than this many whole months are archived (0 disables)
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "0"))
+ARCHIVE_MATCHES_AFTER_MONTHS = int(os.getenv("ARCHIVE_MATCHES_AFTER_MONTHS", "0"))
+
+PARTITION_MAINTENANCE_INTERVAL_SEC = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_SEC", "86400"))
+
+# A row's created_at and its id's timestamp come from different clocks
+# (database vs app server, and a naive Postgres now() is in the server's
+# time zone), so id-derived bounds are widened by this much
+ID_TIME_SLACK = timedelta(days=1)
+
+# "Newest N" listings look this many months back before giving up on a bound
+RECENT_WINDOWS_MONTHS = (1, 6)
+
+# Rows fetched per round trip when archiving, and inserted per statement
+# when restoring
+ARCHIVE_CHUNK_SIZE = 1000
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+def add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+# ============= Pruning =============
+
+def created_near(column, entity_id):
+    """Bound ``column`` (a created_at) around the time in ``entity_id``, a UUIDv7 of the same row"""
+    created = uuid7_time(entity_id)
+    if created is None:
+        return true()
+    return column.between(created - ID_TIME_SLACK, created + ID_TIME_SLACK)
+
+def created_since(column, entity_id):
+    """Bound ``column`` to rows created after ``entity_id`` (e.g. likes of a post)"""
+    created = uuid7_time(entity_id)
+    if created is None:
+        return true()
+    return column >= created - ID_TIME_SLACK
+
+def recent_first(fetch, needed, windows=RECENT_WINDOWS_MONTHS, now=None):
+    """Run ``fetch(since)`` over growing created_at windows until it returns ``needed`` rows
+
+    ``fetch`` must order newest first, so a window holding at least
+    ``needed`` rows gives the same answer as the unbounded query. The last
+    attempt passes ``since=None`` (no bound).
+    """
+    now = now or datetime.utcnow()
+    for months in windows:
+        rows = fetch(add_months(month_start(now), -months))
+        if len(rows) >= needed:
+            return rows
+    return fetch(None)
+
+# ============= Partition maintenance (Postgres) =============
+
+def is_partitioned(conn, table):
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.exec_driver_sql(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%(table)s)", {"table": table}
+    ).first() is not None
+
+def partition_exists(conn, table, month):
+    return conn.exec_driver_sql(
+        "SELECT to_regclass(%(name)s) IS NOT NULL", {"name": partition_name(table, month)}
+    ).scalar()
+
+def create_partition(conn, table, month):
+    conn.exec_driver_sql(
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(table, month)}" PARTITION OF "{table}" '
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    )
+
+def ensure_partitions(conn, now=None):
+    """Create monthly partitions through PARTITION_MONTHS_AHEAD months from now; returns how many tables"""
+    month = month_start(now or datetime.utcnow())
+    tables = [table for table in PARTITIONED if is_partitioned(conn, table)]
+    for table in tables:
+        for offset in range(PARTITION_MONTHS_AHEAD + 1):
+            create_partition(conn, table, add_months(month, offset))
+    return len(tables)
+
+def drop_partition(conn, table, month, only_if_empty=False):
+    """Detach and drop ``table``'s partition for ``month``; False if there is none (or it has rows)"""
+    name = partition_name(table, month)
+    if not partition_exists(conn, table, month):
+        return False
+    if only_if_empty and conn.exec_driver_sql(f'SELECT 1 FROM "{name}" LIMIT 1').first() is not None:
+        return False
+    conn.exec_driver_sql(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"')
+    conn.exec_driver_sql(f'DROP TABLE "{name}"')
+    return True
+
+# ============= Archival =============
+
+MODELS = {
+    "posts": Post, "comments": Comment, "likes": Like, "matches": Match,
+    "post_tags": PostTag, "post_mentions": PostMention,
+}
+# Rows filed and restored together with their posts
+POST_CHILDREN = (Comment, Like, PostTag, PostMention)
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive value of type {type(value).__name__}")
+
+def _write_archive(conn, table, month, rows, archived_at):
+    buffer = io.BytesIO()
+    count = 0
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as out:
+        for row in rows:
+            out.write(json.dumps(dict(row._mapping), default=_encode).encode() + b"\n")
+            count += 1
+    conn.execute(insert(ArchivedPartition.__table__).values(
+        table_name=table,
+        period_start=month,
+        period_end=add_months(month, 1),
+        row_count=count,
+        payload=buffer.getvalue(),
+        archived_at=archived_at,
+    ))
+    return count
+
+def _in_month(column, month):
+    return (column >= month) & (column < add_months(month, 1))
+
+def archive_period(conn, table, month, archived_at=None):
+    """Move ``table``'s rows from ``month`` into archived_partitions; returns {table: rows}
+
+    For posts this includes every comment, like, tag and mention on those
+    posts, filed under the post's month whenever they were made.
+    """
+    archived_at = archived_at or datetime.utcnow()
+    model = MODELS[table]
+    rows = select(model.__table__).where(_in_month(model.created_at, month)).execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+    counts = {table: _write_archive(conn, table, month, conn.execute(rows), archived_at)}
+
+    if table == "posts":
+        post_ids = select(Post.id).where(_in_month(Post.created_at, month))
+        for child in POST_CHILDREN:
+            child_rows = select(child.__table__).where(child.post_id.in_(post_ids)).execution_options(yield_per=ARCHIVE_CHUNK_SIZE)
+            counts[child.__tablename__] = _write_archive(conn, child.__tablename__, month, conn.execute(child_rows), archived_at)
+            conn.execute(delete(child.__table__).where(child.post_id.in_(post_ids)))
+
+    # Dropping the month's partition is instant; rows that landed in the
+    # default partition (or a SQLite table) are deleted
+    if not (is_partitioned(conn, table) and drop_partition(conn, table, month)):
+        conn.execute(delete(model.__table__).where(_in_month(model.created_at, month)))
+    if table == "posts" and is_partitioned(conn, "comments"):
+        # Comments and likes are never older than their post, so with this
+        # month's posts (and every earlier month's) archived, this month's
+        # comment and like partitions are empty
+        for child in ("comments", "likes"):
+            drop_partition(conn, child, month, only_if_empty=True)
+    return counts
+
+def cold_months(conn, table, keep_months, now=None):
+    """Months of ``table`` older than ``keep_months`` whole months that still have live rows"""
+    model = MODELS[table]
+    cutoff = add_months(month_start(now or datetime.utcnow()), -keep_months)
+    archived = set(conn.execute(
+        select(ArchivedPartition.period_start).where(ArchivedPartition.table_name == table)
+    ).scalars())
+    # Skip from one month with rows to the next on the created_at index
+    months, oldest = [], conn.execute(select(func.min(model.created_at))).scalar()
+    while oldest is not None and oldest < cutoff:
+        month = month_start(oldest)
+        if month not in archived:
+            months.append(month)
+        oldest = conn.execute(
+            select(func.min(model.created_at)).where(model.created_at >= add_months(month, 1))
+        ).scalar()
+    return months
+
+def archive_cold(now=None, log=logger.info):
+    """Archive every cold month of posts (with comments, likes, tags and mentions) and matches; returns row counts"""
+    totals = {}
+    schedules = (("posts", ARCHIVE_AFTER_MONTHS), ("matches", ARCHIVE_MATCHES_AFTER_MONTHS))
+    for table, keep_months in schedules:
+        if keep_months <= 0:
+            continue
+        with engine.connect() as conn:
+            months = cold_months(conn, table, keep_months, now)
+        # Oldest first, one transaction per month
+        for month in months:
+            try:
+                with engine.begin() as conn:
+                    counts = archive_period(conn, table, month)
+            except IntegrityError:
+                # Another instance archived this month first
+                continue
+            log(f"Archived {table} {month:%Y-%m}: " + ", ".join(f"{name} {count}" for name, count in counts.items()))
+            for name, count in counts.items():
+                totals[name] = totals.get(name, 0) + count
+    return totals
+
+def _decode(model, row):
+    for name, value in row.items():
+        if value is not None and isinstance(model.__table__.c[name].type, DateTime):
+            row[name] = datetime.fromisoformat(value)
+    return row
+
+def restore_period(conn, table, month):
+    """Put an archived month back into the live tables; returns {table: rows}"""
+    tables = [table, *(child.__tablename__ for child in POST_CHILDREN)] if table == "posts" else [table]
+    counts = {}
+    for name in tables:
+        archive = conn.execute(select(ArchivedPartition.__table__).where(
+            ArchivedPartition.table_name == name, ArchivedPartition.period_start == month
+        )).first()
+        if archive is None:
+            continue
+        model = MODELS[name]
+        rows = [
+            _decode(model, json.loads(line))
+            for line in gzip.decompress(archive.payload).splitlines() if line
+        ]
+        if is_partitioned(conn, name):
+            for row_month in {month_start(row["created_at"]) for row in rows}:
+                create_partition(conn, name, row_month)
+        for start in range(0, len(rows), ARCHIVE_CHUNK_SIZE):
+            conn.execute(insert(model.__table__), rows[start:start + ARCHIVE_CHUNK_SIZE])
+        conn.execute(delete(ArchivedPartition.__table__).where(ArchivedPartition.id == archive.id))
+        counts[name] = len(rows)
+    return counts
+
+# ============= Periodic job =============
+
+def maintain():
+    """Create upcoming partitions, then archive cold months; returns archived row counts"""
+    with engine.begin() as conn:
+        ensure_partitions(conn)
+    return archive_cold()
+
+def _month(value):
+    return datetime.strptime(value, "%Y-%m")
+
+def main():
+    parser = argparse.ArgumentParser(description="Partition maintenance and archival")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("ensure", help="Create upcoming monthly partitions (Postgres)")
+    archive = commands.add_parser("archive", help="Archive one month, or every cold month if none is given")
+    archive.add_argument("table", nargs="?", choices=("posts", "matches"))
+    archive.add_argument("month", nargs="?", type=_month, help="YYYY-MM")
+    restore = commands.add_parser("restore", help="Restore an archived month")
+    restore.add_argument("table", choices=("posts", "matches"))
+    restore.add_argument("month", type=_month, help="YYYY-MM")
+    commands.add_parser("list", help="List archived months")
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        with engine.begin() as conn:
+            print(f"Partitions ensured for {ensure_partitions(conn)} tables")
+    elif args.command == "archive" and args.month:
+        with engine.begin() as conn:
+            print(archive_period(conn, args.table, args.month))
+    elif args.command == "archive":
+        print(archive_cold(log=print))
+    elif args.command == "restore":
+        with engine.begin() as conn:
+            print(restore_period(conn, args.table, args.month))
+    else:
+        with get_db_context() as db:
+            for table, start, count, size in db.execute(select(
+                ArchivedPartition.table_name, ArchivedPartition.period_start,
+                ArchivedPartition.row_count, func.length(ArchivedPartition.payload)
+            ).order_by(ArchivedPartition.period_start, ArchivedPartition.table_name)):
+                print(f"{table:>10} {start:%Y-%m} {count:8} rows {size / 1024:10.1f} KB")
+
+if __name__ == "__main__":
+    main()
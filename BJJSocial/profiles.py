@@ -0,0 +1,134 @@
+import asyncio
+import os
+from starlette.concurrency import run_in_threadpool
+
+from .cache import TTLCache
+from .database import read_session, recently_wrote
+from .dto import follower_cards_select, fetch_user_cards
+from .partitions import recent_first
+from .models import User, Leaderboard, Match, Tournament, user_profile_options, load_user_cards
+from .serializers import (
+    serialize_user, serialize_user_card, serialize_leaderboard, serialize_match, serialize_tournament_summary
+)
+
+# Sections of an athlete's profile page. The per-section endpoints and
+# /api/users/{id}/profile-bundle build their payloads from the same
+# functions; the bundle runs the sections concurrently, each in its own
+# session, after a single user lookup.
+
+PROFILE_SECTIONS = ("user", "stats", "leaderboard", "matches", "followers")
+
+PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "5000"))
+# Per-section TTLs, e.g. PROFILE_CACHE_TTL_LEADERBOARD_SEC=120; 0 disables a section's cache
+PROFILE_CACHE_TTLS = {
+    section: float(os.getenv(f"PROFILE_CACHE_TTL_{section.upper()}_SEC", default))
+    for section, default in (("user", "30"), ("leaderboard", "60"), ("matches", "30"), ("followers", "30"))
+}
+
+_caches = {section: TTLCache(PROFILE_CACHE_SIZE, ttl) for section, ttl in PROFILE_CACHE_TTLS.items()}
+_MISSING = object()
+
+def load_user(db, user_id):
+    return db.query(User).options(*user_profile_options()).filter(User.id == user_id).first()
+
+def user_stats(user):
+    return {
+        "userId": user.id,
+        "competitions": user.competitions,
+        "wins": user.wins,
+        "losses": user.losses,
+        "winRate": round(user.wins / max(user.competitions, 1) * 100, 2) if user.competitions > 0 else 0
+    }
+
+def leaderboard_entries(db, user_id, season=None, user=None):
+    """A user's leaderboard entries; ``user`` avoids reloading the card when already known"""
+    query = db.query(Leaderboard).filter(Leaderboard.user_id == user_id)
+    if season:
+        query = query.filter(Leaderboard.season == season)
+    entries = query.all()
+    if user is None:
+        user = load_user_cards(db, [user_id]).get(user_id)
+    return [serialize_leaderboard(entry, user) for entry in entries]
+
+def recent_matches(db, user_id, limit=10):
+    query = db.query(Match).filter(
+        (Match.competitor_a_id == user_id) | (Match.competitor_b_id == user_id)
+    )
+
+    def fetch(since):
+        bounded = query if since is None else query.filter(Match.created_at >= since)
+        return bounded.order_by(Match.created_at.desc()).limit(limit).all()
+
+    # Athletes compete a few times a season: look back a year before
+    # reading every partition
+    matches = recent_first(fetch, limit, windows=(12,))
+
+    competitors = load_user_cards(
+        db, (uid for match in matches for uid in (match.competitor_a_id, match.competitor_b_id))
+    )
+    tournament_ids = {match.tournament_id for match in matches}
+    tournaments = {
+        tournament.id: tournament
+        for tournament in db.query(Tournament).filter(Tournament.id.in_(tournament_ids))
+    } if tournament_ids else {}
+
+    result = []
+    for match in matches:
+        data = serialize_match(
+            match,
+            competitors.get(match.competitor_a_id),
+            competitors.get(match.competitor_b_id),
+            competitors.get(match.winner_id)
+        )
+        data["tournament"] = serialize_tournament_summary(tournaments.get(match.tournament_id))
+        result.append(data)
+    return result
+
+def followers(db, user_id, limit=50, offset=0):
+    cards = fetch_user_cards(db, follower_cards_select(user_id).offset(offset).limit(limit))
+    return [serialize_user_card(card) for card in cards]
+
+def _run(request, builder, args):
+    with read_session(request) as db:
+        return builder(db, *args)
+
+async def _cached(request, section, key, use_cache, builder, *args):
+    cache = _caches[section]
+    if use_cache and cache.ttl > 0:
+        value = cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+    value = await run_in_threadpool(_run, request, builder, args)
+    if cache.ttl > 0 and value is not None:
+        cache.set(key, value)
+    return value
+
+async def profile_bundle(request, user_id, sections, season=None, limit=10):
+    """Selected profile sections for ``user_id``, or None if the user does not exist"""
+    # Someone who just wrote reads fresh data, like the read-your-writes
+    # routing in get_read_db
+    use_cache = not recently_wrote(request)
+
+    user = await _cached(request, "user", user_id, use_cache, load_user, user_id)
+    if user is None:
+        return None
+
+    bundle = {}
+    if "user" in sections:
+        bundle["user"] = serialize_user(user)
+    if "stats" in sections:
+        bundle["stats"] = user_stats(user)
+
+    pending = {}
+    if "leaderboard" in sections:
+        pending["leaderboard"] = _cached(
+            request, "leaderboard", (user_id, season), use_cache, leaderboard_entries, user_id, season, user
+        )
+    if "matches" in sections:
+        pending["matches"] = _cached(request, "matches", (user_id, limit), use_cache, recent_matches, user_id, limit)
+    if "followers" in sections:
+        pending["followers"] = _cached(request, "followers", (user_id, limit), use_cache, followers, user_id, limit)
+
+    results = await asyncio.gather(*pending.values())
+    bundle.update(zip(pending, results))
+    return bundle
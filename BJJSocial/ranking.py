@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from .database import get_db_context
+from .models import Leaderboard, DIVISION_FIELDS
+from . import lookups
+
+# In-memory ranked index over leaderboard points, one per division, so
+# "what rank am I" and "N around me" are O(log n) instead of paging with
+# OFFSET. Each division is a treap (randomized balanced BST) keyed on
+# (-points, user_id) with subtree sizes, which gives order statistics:
+# the number of keys before a key, and the key at a given position.
+
+# Each instance only sees its own writes, so the index is rebuilt from the
+# table periodically to pick up changes made through other instances.
+LEADERBOARD_INDEX_REFRESH_SEC = float(os.getenv("LEADERBOARD_INDEX_REFRESH_SEC", "300"))
+
+logger = logging.getLogger("bjjsocial.ranking")
+
+class _Node:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+    def update(self):
+        self.size = 1 + (self.left.size if self.left else 0) + (self.right.size if self.right else 0)
+
+def _split(node, key, inclusive=False):
+    """Split into (keys < key, keys >= key), or (<=, >) when inclusive"""
+    if node is None:
+        return None, None
+    if node.key < key or (inclusive and node.key == key):
+        left, right = _split(node.right, key, inclusive)
+        node.right = left
+        node.update()
+        return node, right
+    left, right = _split(node.left, key, inclusive)
+    node.left = right
+    node.update()
+    return left, node
+
+def _merge(left, right):
+    """Join two treaps where every key in ``left`` is below every key in ``right``"""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+class RankedDivision:
+    """Order-statistic set of (points, user_id) for one division"""
+
+    def __init__(self):
+        self._root = None
+        self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, user_id):
+        return user_id in self._points
+
+    def upsert(self, user_id, points):
+        if user_id in self._points:
+            self.remove(user_id)
+        key = (-points, user_id)
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key)), right)
+        self._points[user_id] = points
+
+    def remove(self, user_id):
+        points = self._points.pop(user_id, None)
+        if points is None:
+            return
+        key = (-points, user_id)
+        left, rest = _split(self._root, key)
+        _, right = _split(rest, key, inclusive=True)
+        self._root = _merge(left, right)
+
+    def points(self, user_id):
+        return self._points.get(user_id)
+
+    def _count_before(self, key):
+        count, node = 0, self._root
+        while node is not None:
+            if node.key < key:
+                count += 1 + (node.left.size if node.left else 0)
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def _at(self, position):
+        node = self._root
+        while node is not None:
+            left_size = node.left.size if node.left else 0
+            if position < left_size:
+                node = node.left
+            elif position == left_size:
+                return node.key
+            else:
+                position -= left_size + 1
+                node = node.right
+        raise IndexError(position)
+
+    def rank_of_points(self, points):
+        """Competition rank ("1224") for a score: 1 + entries with more points"""
+        # "" sorts before every user id, so this counts strictly higher scores
+        return self._count_before((-points, "")) + 1
+
+    def position(self, user_id):
+        """0-based position in standings order, ties broken by user id"""
+        return self._count_before((-self._points[user_id], user_id))
+
+    def window(self, user_id, around):
+        """Entries from ``around`` places above to ``around`` below ``user_id``"""
+        center = self.position(user_id)
+        start = max(center - around, 0)
+        end = min(center + around + 1, len(self))
+        entries = []
+        for position in range(start, end):
+            negative_points, entry_user_id = self._at(position)
+            entries.append((entry_user_id, -negative_points, self.rank_of_points(-negative_points)))
+        return entries
+
+class LeaderboardIndex:
+    """Ranked divisions keyed by DIVISION_FIELDS, mirroring the leaderboard table"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._divisions = {}
+        self._entries = {}
+        self._user_divisions = {}
+        self.loaded = False
+        # Changes applied while a load reads the table, replayed onto its
+        # result: the read may predate them. Kept while any load runs.
+        self._loads = 0
+        self._changes_during_load = []
+        self._first_load_lock = threading.Lock()
+
+    def load(self, db):
+        with self._lock:
+            self._loads += 1
+            replay_from = len(self._changes_during_load)
+        try:
+            columns = [getattr(Leaderboard, field) for field in DIVISION_FIELDS]
+            rows = db.execute(select(Leaderboard.id, Leaderboard.user_id, Leaderboard.points, *columns))
+            divisions, entries, user_divisions = {}, {}, {}
+            for entry_id, user_id, points, *division in rows:
+                key = tuple(division)
+                divisions.setdefault(key, RankedDivision()).upsert(user_id, points or 0)
+                entries[entry_id] = (key, user_id)
+                user_divisions.setdefault(user_id, set()).add(key)
+            with self._lock:
+                self._divisions, self._entries, self._user_divisions = divisions, entries, user_divisions
+                # Reapplying a change the read already saw leaves it as is
+                self._apply(self._changes_during_load[replay_from:])
+                self.loaded = True
+        finally:
+            with self._lock:
+                self._loads -= 1
+                if not self._loads:
+                    self._changes_during_load = []
+
+    def reload(self):
+        with get_db_context() as db:
+            self.load(db)
+
+    def ensure_loaded(self, db):
+        """Load the index if nothing has yet; blocking, so call it from a thread"""
+        if not self.loaded:
+            with self._first_load_lock:
+                if not self.loaded:
+                    self.load(db)
+
+    def apply(self, changes):
+        """Apply committed (entry_id, division key, user_id, points) changes; points None deletes"""
+        with self._lock:
+            if self._loads:
+                self._changes_during_load.extend(changes)
+            self._apply(changes)
+
+    def _apply(self, changes):
+        with self._lock:
+            for entry_id, key, user_id, points in changes:
+                previous = self._entries.pop(entry_id, None)
+                if previous is not None:
+                    old_key, old_user_id = previous
+                    old_division = self._divisions.get(old_key)
+                    if old_division is not None:
+                        old_division.remove(old_user_id)
+                    self._user_divisions.get(old_user_id, set()).discard(old_key)
+                if points is None:
+                    continue
+                self._divisions.setdefault(key, RankedDivision()).upsert(user_id, points)
+                self._entries[entry_id] = (key, user_id)
+                self._user_divisions.setdefault(user_id, set()).add(key)
+
+    def standings_for(self, user_id, filters, around=0):
+        """Rank of ``user_id`` in every division matching ``filters`` (None matches anything)
+
+        Returns (division key, points, rank, total, window) tuples, where
+        window is a list of (user_id, points, rank) around the user.
+        """
+        wanted = [
+            (DIVISION_FIELDS.index(field), lookups.canonical(field, value))
+            for field, value in filters.items() if value is not None
+        ]
+        results = []
+        with self._lock:
+            for key in self._user_divisions.get(user_id, ()):
+                if any(key[index] != value for index, value in wanted):
+                    continue
+                division = self._divisions[key]
+                points = division.points(user_id)
+                window = division.window(user_id, around) if around else []
+                results.append((key, points, division.rank_of_points(points), len(division), window))
+        return results
+
+leaderboard_index = LeaderboardIndex()
+
+async def refresh_forever():
+    """Build the index, then rebuild it from the table periodically (startup task)"""
+    while True:
+        try:
+            await run_in_threadpool(leaderboard_index.reload)
+        except Exception:
+            # Keep serving the last good index; try again next period
+            logger.exception("Leaderboard index refresh failed")
+        await asyncio.sleep(LEADERBOARD_INDEX_REFRESH_SEC)
+
+# ============= Change Capture =============
+# Leaderboard rows written through the ORM are captured at flush time and
+# applied to the index only once the transaction commits.
+
+def _division_key(entry):
+    return tuple(getattr(entry, field) for field in DIVISION_FIELDS)
+
+@event.listens_for(Session, "after_flush")
+def _capture_leaderboard_changes(session, flush_context):
+    pending = None
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Leaderboard):
+            pending = session.info.setdefault("leaderboard_changes", [])
+            pending.append((obj.id, _division_key(obj), obj.user_id, obj.points or 0))
+    for obj in session.deleted:
+        if isinstance(obj, Leaderboard):
+            pending = session.info.setdefault("leaderboard_changes", [])
+            pending.append((obj.id, None, obj.user_id, None))
+
+@event.listens_for(Session, "after_commit")
+def _apply_leaderboard_changes(session):
+    changes = session.info.pop("leaderboard_changes", None)
+    if changes:
+        leaderboard_index.apply(changes)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_leaderboard_changes(session):
+    session.info.pop("leaderboard_changes", None)
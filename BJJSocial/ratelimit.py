@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from sqlalchemy import select, insert, update, delete, case
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from .database import get_db_context
+from .models import RateLimitBucket
+from . import metrics
+
+# Rate limiting. Each policy is a token bucket per caller: ``burst``
+# requests at once, refilled at ``burst`` per ``period`` seconds. Callers
+# are told apart by their session's user id, or by client address when
+# signed out (always by address for login and register, which are
+# anonymous and expensive because of bcrypt). A request over the limit
+# gets 429 with Retry-After before any route, session write or query runs.
+#
+# Buckets live in this process by default (MemoryStore): a dict touched
+# only from the event loop thread, with no await between reading a bucket
+# and writing it back, so it needs no lock. Limits are then per instance.
+# RATE_LIMIT_BACKEND=database keeps buckets in rate_limit_buckets instead,
+# so all instances share them, at one UPDATE per limited request. Any
+# object with the same ``take`` coroutine can be passed as the store.
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+
+# "<burst>/<period seconds>"; "0" turns a policy off
+RATE_LIMIT_AUTH = os.getenv("RATE_LIMIT_AUTH", "10/60")
+RATE_LIMIT_SEARCH = os.getenv("RATE_LIMIT_SEARCH", "30/10")
+RATE_LIMIT_LEADERBOARD = os.getenv("RATE_LIMIT_LEADERBOARD", "60/10")
+
+# Proxies in front of the app that append to X-Forwarded-For (Cloud Run's
+# front end is one); the client address is the entry the outermost
+# trusted proxy added. Entries to its left are client-supplied.
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "1" if os.getenv("K_SERVICE") else "0"))
+
+# How often idle buckets are dropped from memory
+RATE_LIMIT_EVICT_INTERVAL_SEC = float(os.getenv("RATE_LIMIT_EVICT_INTERVAL_SEC", "60"))
+RATE_LIMIT_EVICT_CHUNK = 10000
+
+logger = logging.getLogger("bjjsocial.ratelimit")
+
+RATE_LIMITED = metrics.register(metrics.Counter(
+    "bjj_rate_limited_total", "Requests rejected with 429, by policy", ("policy",)
+))
+
+class RatePolicy:
+    """A token bucket shape and the paths it covers"""
+
+    __slots__ = ("name", "paths", "burst", "period", "rate", "by_user")
+
+    def __init__(self, name, paths, limit, by_user=True):
+        burst, _, period = limit.partition("/")
+        self.name = name
+        self.paths = paths
+        self.burst = float(burst)
+        self.period = float(period or 1)
+        # Tokens per second
+        self.rate = self.burst / self.period
+        self.by_user = by_user
+
+    def covers(self, path):
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.paths)
+
+POLICIES = [
+    policy for policy in (
+        RatePolicy("auth", ("/api/login", "/api/register"), RATE_LIMIT_AUTH, by_user=False),
+        RatePolicy("search", ("/api/search",), RATE_LIMIT_SEARCH),
+        RatePolicy("leaderboard", ("/api/leaderboard",), RATE_LIMIT_LEADERBOARD),
+    )
+    if policy.burst > 0
+]
+
+# ============= Stores =============
+
+class MemoryStore:
+    """Buckets in a dict, (policy name, caller) -> [tokens, updated at]; call from the event loop only"""
+
+    def __init__(self):
+        self._buckets = {}
+        self._policies = {}
+
+    def __len__(self):
+        return len(self._buckets)
+
+    async def take(self, policy, caller):
+        """Spend one token; returns 0 if the request may proceed, else seconds until a token is due"""
+        now = time.monotonic()
+        key = (policy.name, caller)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            self._policies[policy.name] = policy
+            self._buckets[key] = [policy.burst - 1.0, now]
+            return 0.0
+        tokens = bucket[0] + (now - bucket[1]) * policy.rate
+        if tokens > policy.burst:
+            tokens = policy.burst
+        bucket[1] = now
+        if tokens >= 1.0:
+            bucket[0] = tokens - 1.0
+            return 0.0
+        bucket[0] = tokens
+        return (1.0 - tokens) / policy.rate
+
+    async def evict(self):
+        """Drop buckets that have refilled (the same as having none); returns how many
+
+        Works through a snapshot in chunks, yielding to the loop between
+        them so a large table never stalls requests.
+        """
+        items = list(self._buckets.items())
+        evicted = 0
+        for start in range(0, len(items), RATE_LIMIT_EVICT_CHUNK):
+            now = time.monotonic()
+            for key, bucket in items[start:start + RATE_LIMIT_EVICT_CHUNK]:
+                policy = self._policies[key[0]]
+                # Checked now, not at snapshot time: a request may have used it since
+                if bucket[0] + (now - bucket[1]) * policy.rate >= policy.burst:
+                    if self._buckets.get(key) is bucket:
+                        del self._buckets[key]
+                        evicted += 1
+            await asyncio.sleep(0)
+        return evicted
+
+class DatabaseStore:
+    """Buckets in rate_limit_buckets, shared by every instance on the database"""
+
+    async def take(self, policy, caller):
+        return await run_in_threadpool(self._take, policy, f"{policy.name}:{caller}", time.time())
+
+    def _take(self, policy, key, now):
+        table = RateLimitBucket.__table__
+        refilled = table.c.tokens + (now - table.c.updated_at) * policy.rate
+        refilled = case((refilled > policy.burst, policy.burst), else_=refilled)
+        with get_db_context() as db:
+            # The common case is this one statement: spend a token if one
+            # has refilled. The row lock serializes instances on one key.
+            spent = db.execute(
+                update(table)
+                .where(table.c.key == key, refilled >= 1.0)
+                .values(
+                    tokens=refilled - 1.0, updated_at=now,
+                    full_at=now + (policy.burst - (refilled - 1.0)) / policy.rate,
+                )
+            ).rowcount
+            if not spent:
+                try:
+                    with db.begin_nested():
+                        db.execute(insert(table).values(
+                            key=key, tokens=policy.burst - 1.0, updated_at=now, full_at=now + 1.0 / policy.rate
+                        ))
+                    spent = 1
+                except IntegrityError:
+                    pass
+            if spent:
+                db.commit()
+                return 0.0
+            tokens = db.execute(select(refilled).where(table.c.key == key)).scalar()
+            db.commit()
+        return (1.0 - (tokens or 0.0)) / policy.rate
+
+    @staticmethod
+    def evict_expired(db):
+        """Delete buckets that have refilled; returns how many (the ratelimit.evict job)"""
+        removed = db.execute(
+            delete(RateLimitBucket.__table__).where(RateLimitBucket.full_at < time.time())
+        ).rowcount
+        db.commit()
+        return removed
+
+store = DatabaseStore() if RATE_LIMIT_BACKEND == "database" else MemoryStore()
+
+async def evict_forever():
+    """Evict idle in-memory buckets every RATE_LIMIT_EVICT_INTERVAL_SEC (startup task)"""
+    if not isinstance(store, MemoryStore):
+        return
+    while True:
+        await asyncio.sleep(RATE_LIMIT_EVICT_INTERVAL_SEC)
+        try:
+            await store.evict()
+        except Exception:
+            logger.exception("Rate limit eviction failed")
+
+# ============= Middleware =============
+
+def client_address(scope, trusted_proxies=RATE_LIMIT_TRUSTED_PROXIES):
+    """The caller's address: from X-Forwarded-For behind ``trusted_proxies`` proxies, else the peer"""
+    if trusted_proxies:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                hops = value.decode("latin-1").split(",")
+                return hops[max(len(hops) - trusted_proxies, 0)].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+class RateLimitMiddleware:
+    """Rejects requests over their policy's limit with 429 and Retry-After
+
+    Must sit inside ServerSessionMiddleware to key signed-in callers by
+    user id.
+    """
+
+    def __init__(self, app, policies=POLICIES, store=store, enabled=RATE_LIMIT_ENABLED):
+        self.app = app
+        self.policies = policies if enabled else []
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.policies:
+            path = scope["path"]
+            for policy in self.policies:
+                if policy.covers(path):
+                    user_id = scope.get("session", {}).get("user_id") if policy.by_user else None
+                    caller = f"user:{user_id}" if user_id else f"ip:{client_address(scope)}"
+                    retry_after = await self.store.take(policy, caller)
+                    if retry_after:
+                        RATE_LIMITED.inc(policy.name)
+                        await self._reject(send, retry_after)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+    async def _reject(self, send, retry_after):
+        body = b'{"detail":"Too many requests"}'
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(math.ceil(retry_after), 1)).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,208 @@
+import argparse
+import os
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from .database import get_db_context
+from .models import Rating, RatingHistory, Match, Tournament, DIVISION_FIELDS, generate_uuid
+
+# Elo skill ratings per division, so athletes who never meet can still be
+# compared. Ratings update in O(1) when a match result is finalized
+# (apply_match, run as the ratings.apply_match job); replay_season
+# rebuilds a season from scratch in chronological order, streaming
+# matches in chunks.
+
+INITIAL_RATING = 1500.0
+# New athletes move faster until their rating settles
+K_PROVISIONAL = 40.0
+K_ESTABLISHED = 20.0
+PROVISIONAL_MATCHES = 15
+
+REPLAY_CHUNK_SIZE = int(os.getenv("RATING_REPLAY_CHUNK_SIZE", "10000"))
+
+def season_for(date):
+    return str(date.year)
+
+def division_for(match, tournament):
+    """Division key fields shared by Rating and Leaderboard"""
+    return {
+        "season": season_for(tournament.date),
+        "ruleset": tournament.ruleset,
+        "is_gi": tournament.is_gi,
+        "belt": match.belt,
+        "weight_class": match.weight_class,
+        "age_division": match.age_division or "UNSPECIFIED",
+        "gender": match.gender,
+    }
+
+def expected_score(rating, opponent_rating):
+    return 1.0 / (1.0 + 10.0 ** ((opponent_rating - rating) / 400.0))
+
+def k_factor(matches_played):
+    return K_PROVISIONAL if matches_played < PROVISIONAL_MATCHES else K_ESTABLISHED
+
+def rate(rating_a, played_a, rating_b, played_b, score_a):
+    """New (rating_a, rating_b) after one match; score_a is 1.0 for an A win, 0.0 for a loss"""
+    expected_a = expected_score(rating_a, rating_b)
+    new_a = rating_a + k_factor(played_a) * (score_a - expected_a)
+    new_b = rating_b + k_factor(played_b) * ((1.0 - score_a) - (1.0 - expected_a))
+    return new_a, new_b
+
+def _get_or_create_rating(db, user_id, division, lock=False):
+    query = db.query(Rating).filter_by(user_id=user_id, **division)
+    if lock:
+        query = query.with_for_update()
+    rating = query.first()
+    if rating is None:
+        # FOR UPDATE locks nothing until the row exists, so another job may
+        # be inserting it for the athlete's other first match; if that one
+        # wins, take the lock on its row instead
+        try:
+            with db.begin_nested():
+                db.add(Rating(
+                    id=generate_uuid(), user_id=user_id, rating=INITIAL_RATING, matches_played=0, **division
+                ))
+        except IntegrityError:
+            pass
+        rating = query.first()
+    return rating
+
+def apply_match(db, match, tournament, lock=False):
+    """Update both competitors' ratings for a newly finalized match (caller commits)
+
+    ``lock`` takes row locks on both ratings, in user id order, so
+    concurrent updates in one division apply one after the other.
+    """
+    if match.winner_id not in (match.competitor_a_id, match.competitor_b_id):
+        return
+    division = division_for(match, tournament)
+    locked = {
+        user_id: _get_or_create_rating(db, user_id, division, lock)
+        for user_id in sorted((match.competitor_a_id, match.competitor_b_id))
+    }
+    rating_a, rating_b = locked[match.competitor_a_id], locked[match.competitor_b_id]
+    score_a = 1.0 if match.winner_id == match.competitor_a_id else 0.0
+    new_a, new_b = rate(rating_a.rating, rating_a.matches_played, rating_b.rating, rating_b.matches_played, score_a)
+
+    for rating, new_value in ((rating_a, new_a), (rating_b, new_b)):
+        db.add(RatingHistory(
+            rating_id=rating.id,
+            user_id=rating.user_id,
+            match_id=match.id,
+            season=division["season"],
+            rating_before=rating.rating,
+            rating_after=new_value,
+            played_at=tournament.date
+        ))
+        rating.rating = new_value
+        rating.matches_played += 1
+        rating.last_updated = datetime.utcnow()
+
+def apply_finalized(db, match_id):
+    """Apply a finalized match's rating change exactly once (the ratings.apply_match job); returns whether it applied"""
+    lock = db.get_bind().dialect.name == "postgresql"
+    # The match row lock makes a rerun of the same job wait, then see the history
+    match = db.get(Match, match_id, with_for_update=lock)
+    already_rated = db.execute(
+        select(RatingHistory.id).where(RatingHistory.match_id == match_id).limit(1)
+    ).first()
+    if match is None or not match.result_final or already_rated:
+        db.commit()
+        return False
+    apply_match(db, match, db.get(Tournament, match.tournament_id), lock=lock)
+    try:
+        db.commit()
+    except IntegrityError:
+        # SQLite has no row lock, so two runs can both pass the check
+        # above; IDX_rating_history_match_user lets only one commit
+        db.rollback()
+        if db.execute(
+            select(RatingHistory.id).where(RatingHistory.match_id == match_id).limit(1)
+        ).first():
+            return False
+        # Some other conflict: fail the job so it is retried with backoff
+        raise
+    return True
+
+def replay_season(db, season, chunk_size=REPLAY_CHUNK_SIZE):
+    """Recompute every rating and history row for ``season`` from its finalized matches"""
+    year = int(season)
+    start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+    db.execute(delete(RatingHistory).where(RatingHistory.season == season))
+    db.execute(delete(Rating).where(Rating.season == season))
+
+    stmt = (
+        select(
+            Match.id, Match.competitor_a_id, Match.competitor_b_id, Match.winner_id,
+            Match.belt, Match.weight_class, Match.age_division, Match.gender,
+            Tournament.ruleset, Tournament.is_gi, Tournament.date
+        )
+        .join(Tournament, Tournament.id == Match.tournament_id)
+        .where(
+            Match.result_final.is_(True),
+            Match.winner_id.isnot(None),
+            Tournament.date >= start,
+            Tournament.date < end
+        )
+        .order_by(Tournament.date, Match.created_at, Match.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+    # (user_id, division tuple) -> [rating id, rating, matches played]
+    state = {}
+    matches_rated = 0
+    for chunk in db.execute(stmt).partitions():
+        new_ratings, history = [], []
+        for (match_id, comp_a, comp_b, winner_id, belt, weight_class, age_division,
+             gender, ruleset, is_gi, played_at) in chunk:
+            if winner_id not in (comp_a, comp_b):
+                continue
+            division = (season, ruleset, is_gi, belt, weight_class, age_division or "UNSPECIFIED", gender)
+            entries = []
+            for user_id in (comp_a, comp_b):
+                entry = state.get((user_id, division))
+                if entry is None:
+                    entry = state[(user_id, division)] = [generate_uuid(), INITIAL_RATING, 0]
+                    new_ratings.append(dict(
+                        zip(DIVISION_FIELDS, division),
+                        id=entry[0], user_id=user_id, rating=INITIAL_RATING, matches_played=0
+                    ))
+                entries.append((user_id, entry))
+            (_, entry_a), (_, entry_b) = entries
+            new_a, new_b = rate(entry_a[1], entry_a[2], entry_b[1], entry_b[2], 1.0 if winner_id == comp_a else 0.0)
+            for (user_id, entry), new_value in zip(entries, (new_a, new_b)):
+                history.append(dict(
+                    id=generate_uuid(), rating_id=entry[0], user_id=user_id, match_id=match_id,
+                    season=season, rating_before=entry[1], rating_after=new_value, played_at=played_at
+                ))
+                entry[1] = new_value
+                entry[2] += 1
+            matches_rated += 1
+        # Rating rows first: history rows reference them
+        if new_ratings:
+            db.execute(insert(Rating), new_ratings)
+        if history:
+            db.execute(insert(RatingHistory), history)
+
+    now = datetime.utcnow()
+    if state:
+        db.execute(update(Rating), [
+            {"id": rating_id, "rating": value, "matches_played": played, "last_updated": now}
+            for rating_id, value, played in state.values()
+        ])
+    db.commit()
+    return matches_rated
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild skill ratings from finalized matches")
+    parser.add_argument("season", help="Season (year) to replay, e.g. 2025")
+    parser.add_argument("--chunk-size", type=int, default=REPLAY_CHUNK_SIZE)
+    args = parser.parse_args()
+    with get_db_context() as db:
+        count = replay_season(db, args.season, chunk_size=args.chunk_size)
+    print(f"Replayed {count} matches for season {args.season}")
+
+if __name__ == "__main__":
+    main()
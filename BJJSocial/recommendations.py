@@ -0,0 +1,218 @@
+import array
+import heapq
+import os
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import select, insert, delete
+from sqlalchemy.orm import aliased
+
+from .database import get_db_context
+from .models import User, Follow, Match, UserSuggestion, UserSuggestionStaging
+
+# "Who to follow" suggestions, computed in bulk by a periodic job and stored
+# per user in user_suggestions so the endpoint is one indexed read.
+#
+# Users are numbered 0..n-1 and the follow graph and bracket membership are
+# packed into CSR adjacency arrays, so a two-hop walk is slicing flat
+# integer arrays instead of querying per user. Candidates are scored by:
+#   - mutual follows: people you follow who follow them
+#   - shared brackets: same tournament, belt, weight, age division, gender
+#   - same school / same instructor
+
+RECOMMENDATIONS_TOP_N = int(os.getenv("RECOMMENDATIONS_TOP_N", "20"))
+RECOMMENDATIONS_INTERVAL_SEC = float(os.getenv("RECOMMENDATIONS_INTERVAL_SEC", "21600"))
+# Same-school/instructor candidates considered per user, most-followed first
+RECOMMENDATIONS_GROUP_SAMPLE = int(os.getenv("RECOMMENDATIONS_GROUP_SAMPLE", "200"))
+
+WEIGHT_MUTUAL = 3.0
+WEIGHT_BRACKET = 2.0
+WEIGHT_SCHOOL = 1.5
+WEIGHT_INSTRUCTOR = 2.5
+
+WRITE_CHUNK_SIZE = 5000
+STREAM_CHUNK_SIZE = 10000
+
+class CSR:
+    """Adjacency lists of nodes 0..n-1 packed into two flat arrays
+
+    The neighbors of node i are indices[indptr[i]:indptr[i + 1]].
+    """
+
+    __slots__ = ("indptr", "indices")
+
+    def __init__(self, node_count, sources, targets):
+        indptr = array.array("l", [0]) * (node_count + 1)
+        for source in sources:
+            indptr[source + 1] += 1
+        for node in range(node_count):
+            indptr[node + 1] += indptr[node]
+        indices = array.array("l", [0]) * len(sources)
+        fill = indptr[:-1]
+        for source, target in zip(sources, targets):
+            indices[fill[source]] = target
+            fill[source] += 1
+        self.indptr = indptr
+        self.indices = indices
+
+    def neighbors(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+def _normalize(value):
+    value = (value or "").strip().lower()
+    return value or None
+
+class Graph:
+    """Everything the scorer needs, keyed by dense user numbers"""
+
+    def __init__(self, db):
+        self.user_ids = []
+        number = {}
+        schools, instructors = defaultdict(list), defaultdict(list)
+        self.school = []
+        self.instructor = []
+        # Most-followed first, so group samples prefer established athletes
+        rows = db.execute(
+            select(User.id, User.school, User.instructor)
+            .order_by(User.followers_count.desc(), User.id)
+        )
+        for user_id, school, instructor in rows:
+            node = len(self.user_ids)
+            number[user_id] = node
+            self.user_ids.append(user_id)
+            school, instructor = _normalize(school), _normalize(instructor)
+            self.school.append(school)
+            self.instructor.append(instructor)
+            if school:
+                schools[school].append(node)
+            if instructor:
+                instructors[instructor].append(node)
+        self.schools = schools
+        self.instructors = instructors
+        node_count = len(self.user_ids)
+
+        sources, targets = array.array("l"), array.array("l")
+        stmt = select(Follow.follower_id, Follow.following_id).execution_options(yield_per=STREAM_CHUNK_SIZE)
+        for chunk in db.execute(stmt).partitions():
+            for follower_id, following_id in chunk:
+                if follower_id in number and following_id in number:
+                    sources.append(number[follower_id])
+                    targets.append(number[following_id])
+        self.follows = CSR(node_count, sources, targets)
+
+        brackets = {}
+        members = []
+        stmt = select(
+            Match.tournament_id, Match.belt, Match.weight_class, Match.age_division, Match.gender,
+            Match.competitor_a_id, Match.competitor_b_id
+        ).execution_options(yield_per=STREAM_CHUNK_SIZE)
+        for chunk in db.execute(stmt).partitions():
+            for *bracket, competitor_a_id, competitor_b_id in chunk:
+                bracket_number = brackets.setdefault(tuple(bracket), len(brackets))
+                if bracket_number == len(members):
+                    members.append(set())
+                for user_id in (competitor_a_id, competitor_b_id):
+                    if user_id in number:
+                        members[bracket_number].add(number[user_id])
+        bracket_sources, bracket_targets = array.array("l"), array.array("l")
+        for bracket_number, nodes in enumerate(members):
+            for node in nodes:
+                bracket_sources.append(bracket_number)
+                bracket_targets.append(node)
+        self.bracket_members = CSR(len(members), bracket_sources, bracket_targets)
+        self.user_brackets = CSR(node_count, bracket_targets, bracket_sources)
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def suggestions_for(self, node, top_n=RECOMMENDATIONS_TOP_N):
+        """Top (score, candidate, mutual, brackets, same school, same instructor) for one user"""
+        following = set(self.follows.neighbors(node))
+        mutual = defaultdict(int)
+        for followed in following:
+            for candidate in self.follows.neighbors(followed):
+                mutual[candidate] += 1
+        shared = defaultdict(int)
+        for bracket in self.user_brackets.neighbors(node):
+            for candidate in self.bracket_members.neighbors(bracket):
+                shared[candidate] += 1
+
+        school, instructor = self.school[node], self.instructor[node]
+        candidates = set(mutual)
+        candidates.update(shared)
+        if school:
+            candidates.update(self.schools[school][:RECOMMENDATIONS_GROUP_SAMPLE])
+        if instructor:
+            candidates.update(self.instructors[instructor][:RECOMMENDATIONS_GROUP_SAMPLE])
+        candidates.discard(node)
+        candidates.difference_update(following)
+
+        scored = []
+        for candidate in candidates:
+            same_school = school is not None and self.school[candidate] == school
+            same_instructor = instructor is not None and self.instructor[candidate] == instructor
+            score = (
+                WEIGHT_MUTUAL * mutual.get(candidate, 0)
+                + WEIGHT_BRACKET * shared.get(candidate, 0)
+                + WEIGHT_SCHOOL * same_school
+                + WEIGHT_INSTRUCTOR * same_instructor
+            )
+            scored.append((score, candidate, mutual.get(candidate, 0), shared.get(candidate, 0), same_school, same_instructor))
+        # Ties go to the lower number, i.e. the more-followed user
+        return heapq.nsmallest(top_n, scored, key=lambda row: (-row[0], row[1]))
+
+SUGGESTION_COLUMNS = (
+    "user_id", "position", "suggested_user_id", "score", "mutual_follows",
+    "shared_brackets", "same_school", "same_instructor", "computed_at",
+)
+
+def _stage(db, rows):
+    db.execute(insert(UserSuggestionStaging), [dict(zip(SUGGESTION_COLUMNS, row)) for row in rows])
+    db.commit()
+
+def rebuild_suggestions(db, top_n=RECOMMENDATIONS_TOP_N):
+    """Recompute every user's suggestions and replace user_suggestions; returns users covered
+
+    Suggestions are written to user_suggestions_staging a chunk at a time,
+    each in its own short transaction, so neither memory nor the write
+    lock (the whole database on SQLite) grows with the user count until
+    the final copy into user_suggestions.
+    """
+    graph = Graph(db)
+    computed_at = datetime.utcnow()
+    db.execute(delete(UserSuggestionStaging))
+    db.commit()
+    users_covered = 0
+    rows = []
+    for node, user_id in enumerate(graph.user_ids):
+        suggestions = graph.suggestions_for(node, top_n)
+        if suggestions:
+            users_covered += 1
+        for position, (score, candidate, mutual, shared, same_school, same_instructor) in enumerate(suggestions):
+            rows.append((
+                user_id, position, graph.user_ids[candidate], score, mutual,
+                shared, same_school, same_instructor, computed_at,
+            ))
+        if len(rows) >= WRITE_CHUNK_SIZE:
+            _stage(db, rows)
+            rows = []
+    if rows:
+        _stage(db, rows)
+
+    # The swap: one INSERT ... SELECT, joined to users so anyone deleted
+    # during the rebuild is left out
+    suggested = aliased(User)
+    staged = (
+        select(*(getattr(UserSuggestionStaging, column) for column in SUGGESTION_COLUMNS))
+        .join(User, User.id == UserSuggestionStaging.user_id)
+        .join(suggested, suggested.id == UserSuggestionStaging.suggested_user_id)
+    )
+    db.execute(delete(UserSuggestion))
+    db.execute(insert(UserSuggestion).from_select(SUGGESTION_COLUMNS, staged))
+    db.execute(delete(UserSuggestionStaging))
+    # Readers keep seeing the previous suggestions until this commits
+    db.commit()
+    return users_covered
+
+if __name__ == "__main__":
+    with get_db_context() as db:
+        print(f"Suggestions rebuilt for {rebuild_suggestions(db)} users")
@@ -0,0 +1,59 @@
+import os
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from ..slowlog import slow_query_log, SLOW_QUERY_THRESHOLD_MS
+from ..instrumentation import recent_profiles
+from ..serializers import json_response
+from ..schemas import RegisterLookupNames
+from .. import lookups
+
+# Operator endpoints. Disabled unless ADMIN_TOKEN is set; callers send it
+# in the X-Admin-Token header.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+router = APIRouter(prefix="/api/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=200),
+    sort: str = Query("total", pattern="^(total|max|count)$")
+):
+    """Get the worst statement fingerprints seen by this instance"""
+    return json_response({
+        "thresholdMs": SLOW_QUERY_THRESHOLD_MS,
+        "data": slow_query_log.top(limit, order_by=sort)
+    })
+
+@router.delete("/slow-queries")
+async def clear_slow_queries():
+    """Reset this instance's slow query table"""
+    slow_query_log.clear()
+    return {"message": "Slow query log cleared"}
+
+@router.get("/profiles")
+async def get_profiles():
+    """Get the most recent request profiles taken by this instance"""
+    return json_response(list(reversed(recent_profiles)))
+
+@router.get("/lookups/{field}")
+async def get_lookup_names(field: str):
+    """Registered names for a division field (belt, weight_class, age_division, gender, ruleset, tier)"""
+    if field not in lookups.FIELD_DIMENSIONS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown lookup field")
+    return {"field": field, "names": lookups.mappings[lookups.FIELD_DIMENSIONS[field]].names()}
+
+@router.post("/lookups/{field}")
+async def register_lookup_names(field: str, body: RegisterLookupNames):
+    """Register new names for a division field; known names and their aliases are skipped"""
+    if field not in lookups.FIELD_DIMENSIONS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown lookup field")
+    added = await run_in_threadpool(lookups.register, field, body.names)
+    return {"field": field, "added": added}
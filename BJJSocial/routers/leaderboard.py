@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy import and_, func
 from typing import Optional
-from ..database import get_db
-from ..models import User, Leaderboard, Match, Tournament
+from ..database import get_read_db
+from ..models import User, Leaderboard, LeaderboardHistory, Match, Tournament, Rating, RatingHistory, load_user_cards
 from ..schemas import LeaderboardResponse
-from ..auth import sanitize_user
+from ..serializers import serialize_leaderboard, serialize_match, serialize_tournament_summary, serialize_user_card, serialize_division, serialize_rating, serialize_rating_history, json_response
+from ..ranking import leaderboard_index
+from ..snapshots import decode_division
+from .. import geo, profiles
 
 router = APIRouter(prefix="/api", tags=["leaderboard"])
 
@@ -20,7 +24,7 @@ async def get_leaderboard(
     age_division: Optional[str] = Query(None, alias="ageDivision"),
     gender: Optional[str] = None,
     season: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get leaderboard with filters and pagination"""
     offset = (page - 1) * limit
@@ -44,128 +48,149 @@ async def get_leaderboard(
     
     entries = query.order_by(Leaderboard.points.desc()).offset(offset).limit(limit).all()
     
-    result = []
-    for entry in entries:
-        user = db.query(User).filter(User.id == entry.user_id).first()
-        result.append({
-            "id": entry.id,
-            "season": entry.season,
-            "ruleset": entry.ruleset,
-            "isGi": entry.is_gi,
-            "belt": entry.belt,
-            "weightClass": entry.weight_class,
-            "ageDivision": entry.age_division,
-            "gender": entry.gender,
-            "userId": entry.user_id,
-            "points": entry.points,
-            "submissions": entry.submissions,
-            "wins": entry.wins,
-            "losses": entry.losses,
-            "lastUpdated": entry.last_updated.isoformat(),
-            "user": sanitize_user(user) if user else None
-        })
+    users = load_user_cards(db, (entry.user_id for entry in entries))
+    result = [serialize_leaderboard(entry, users.get(entry.user_id)) for entry in entries]
     
-    return {
+    return json_response({
         "data": result,
         "page": page,
         "limit": limit,
         "hasMore": len(entries) == limit
-    }
+    })
+
+@router.get("/leaderboard/rank/{user_id}")
+async def get_leaderboard_rank(
+    user_id: str,
+    around: int = Query(0, ge=0, le=50),
+    ruleset: Optional[str] = None,
+    is_gi: Optional[bool] = Query(None, alias="isGi"),
+    belt: Optional[str] = None,
+    weight_class: Optional[str] = Query(None, alias="weightClass"),
+    age_division: Optional[str] = Query(None, alias="ageDivision"),
+    gender: Optional[str] = None,
+    season: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Get a user's rank in each matching division, optionally with the entries around them"""
+    # A cold index (before the startup refresh) reads the whole table; keep that off the loop
+    await run_in_threadpool(leaderboard_index.ensure_loaded, db)
+    standings = leaderboard_index.standings_for(user_id, {
+        "season": season,
+        "ruleset": ruleset,
+        "is_gi": is_gi,
+        "belt": belt,
+        "weight_class": weight_class,
+        "age_division": age_division,
+        "gender": gender,
+    }, around=around)
+    
+    users = load_user_cards(db, (uid for *_, window in standings for uid, _, _ in window))
+    
+    result = []
+    for key, points, rank, total, window in standings:
+        data = serialize_division(key)
+        data.update({
+            "userId": user_id,
+            "points": points,
+            "rank": rank,
+            "total": total,
+            "around": [
+                {"userId": uid, "points": pts, "rank": pos, "user": serialize_user_card(users.get(uid))}
+                for uid, pts, pos in window
+            ]
+        })
+        result.append(data)
+    
+    return json_response(result)
 
 @router.get("/users/{user_id}/leaderboard")
 async def get_user_leaderboard_entries(
     user_id: str,
     season: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a user's leaderboard entries"""
-    query = db.query(Leaderboard).filter(Leaderboard.user_id == user_id)
+    return json_response(profiles.leaderboard_entries(db, user_id, season))
+
+@router.get("/users/{user_id}/leaderboard/history")
+async def get_user_leaderboard_history(
+    user_id: str,
+    season: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Get how a user's rank moved over time in each division
+
+    Points are delta-encoded: each value holds until the next point. A null
+    rank means the user left the division at that time.
+    """
+    query = db.query(
+        LeaderboardHistory.division,
+        LeaderboardHistory.taken_at,
+        LeaderboardHistory.rank,
+        LeaderboardHistory.points
+    ).filter(LeaderboardHistory.user_id == user_id)
     
     if season:
-        query = query.filter(Leaderboard.season == season)
+        query = query.filter(LeaderboardHistory.season == season)
     
-    entries = query.all()
-    
-    user = db.query(User).filter(User.id == user_id).first()
+    rows = query.order_by(LeaderboardHistory.division, LeaderboardHistory.taken_at).all()
     
     result = []
-    for entry in entries:
-        result.append({
-            "id": entry.id,
-            "season": entry.season,
-            "ruleset": entry.ruleset,
-            "isGi": entry.is_gi,
-            "belt": entry.belt,
-            "weightClass": entry.weight_class,
-            "ageDivision": entry.age_division,
-            "gender": entry.gender,
-            "userId": entry.user_id,
-            "points": entry.points,
-            "submissions": entry.submissions,
-            "wins": entry.wins,
-            "losses": entry.losses,
-            "lastUpdated": entry.last_updated.isoformat(),
-            "user": sanitize_user(user) if user else None
-        })
+    current = None
+    for division, taken_at, rank, points in rows:
+        if current is None or current["_division"] != division:
+            current = serialize_division(decode_division(division))
+            current["_division"] = division
+            current["history"] = []
+            result.append(current)
+        current["history"].append({"takenAt": taken_at, "rank": rank, "points": points})
+    for entry in result:
+        del entry["_division"]
     
-    return result
+    return json_response(result)
+
+@router.get("/users/{user_id}/ratings")
+async def get_user_ratings(
+    user_id: str,
+    season: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Get a user's current skill ratings, one per division"""
+    query = db.query(Rating).filter(Rating.user_id == user_id)
+    
+    if season:
+        query = query.filter(Rating.season == season)
+    
+    entries = query.order_by(Rating.season.desc(), Rating.rating.desc()).all()
+    
+    return json_response([serialize_rating(entry) for entry in entries])
+
+@router.get("/users/{user_id}/ratings/history")
+async def get_user_rating_history(
+    user_id: str,
+    season: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_read_db)
+):
+    """Get a user's rating after each rated match, oldest first, for charts"""
+    query = db.query(RatingHistory).filter(RatingHistory.user_id == user_id)
+    
+    if season:
+        query = query.filter(RatingHistory.season == season)
+    
+    entries = query.order_by(RatingHistory.played_at.desc()).limit(limit).all()
+    entries.reverse()
+    
+    return json_response([serialize_rating_history(entry) for entry in entries])
 
 @router.get("/users/{user_id}/matches")
 async def get_user_matches(
     user_id: str,
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a user's recent matches"""
-    # Get matches where user is either competitor
-    matches = db.query(Match).filter(
-        (Match.competitor_a_id == user_id) | (Match.competitor_b_id == user_id)
-    ).order_by(Match.created_at.desc()).limit(limit).all()
-    
-    result = []
-    for match in matches:
-        tournament = db.query(Tournament).filter(Tournament.id == match.tournament_id).first()
-        comp_a = db.query(User).filter(User.id == match.competitor_a_id).first()
-        comp_b = db.query(User).filter(User.id == match.competitor_b_id).first()
-        winner = db.query(User).filter(User.id == match.winner_id).first() if match.winner_id else None
-        
-        result.append({
-            "id": match.id,
-            "tournamentId": match.tournament_id,
-            "round": match.round,
-            "belt": match.belt,
-            "weightClass": match.weight_class,
-            "ageDivision": match.age_division,
-            "gender": match.gender,
-            "competitorAId": match.competitor_a_id,
-            "competitorBId": match.competitor_b_id,
-            "winnerId": match.winner_id,
-            "method": match.method,
-            "submissionType": match.submission_type,
-            "pointsA": match.points_a,
-            "pointsB": match.points_b,
-            "advantagesA": match.advantages_a,
-            "advantagesB": match.advantages_b,
-            "penaltiesA": match.penalties_a,
-            "penaltiesB": match.penalties_b,
-            "durationSec": match.duration_sec,
-            "resultFinal": match.result_final,
-            "awardedWinnerPts": match.awarded_winner_pts,
-            "awardedLoserPts": match.awarded_loser_pts,
-            "createdAt": match.created_at.isoformat(),
-            "competitorA": sanitize_user(comp_a) if comp_a else None,
-            "competitorB": sanitize_user(comp_b) if comp_b else None,
-            "winner": sanitize_user(winner) if winner else None,
-            "tournament": {
-                "id": tournament.id,
-                "name": tournament.name,
-                "date": tournament.date.isoformat(),
-                "ruleset": tournament.ruleset,
-                "isGi": tournament.is_gi
-            } if tournament else None
-        })
-    
-    return result
+    return json_response(profiles.recent_matches(db, user_id, limit))
 
 @router.get("/schools/{school}/leaderboard")
 async def get_school_leaderboard(
@@ -179,13 +204,13 @@ async def get_school_leaderboard(
     age_division: Optional[str] = Query(None, alias="ageDivision"),
     gender: Optional[str] = None,
     season: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get leaderboard for a specific school"""
     offset = (page - 1) * limit
     
     # Get users from the school
-    school_users = db.query(User).filter(User.school == school).all()
+    school_users = db.query(User.id).filter(User.school == school).all()
     user_ids = [u.id for u in school_users]
     
     if not user_ids:
@@ -216,41 +241,69 @@ async def get_school_leaderboard(
     
     entries = query.order_by(Leaderboard.points.desc()).offset(offset).limit(limit).all()
     
-    result = []
-    for entry in entries:
-        user = db.query(User).filter(User.id == entry.user_id).first()
-        result.append({
-            "id": entry.id,
-            "season": entry.season,
-            "ruleset": entry.ruleset,
-            "isGi": entry.is_gi,
-            "belt": entry.belt,
-            "weightClass": entry.weight_class,
-            "ageDivision": entry.age_division,
-            "gender": entry.gender,
-            "userId": entry.user_id,
-            "points": entry.points,
-            "submissions": entry.submissions,
-            "wins": entry.wins,
-            "losses": entry.losses,
-            "lastUpdated": entry.last_updated.isoformat(),
-            "user": sanitize_user(user) if user else None
-        })
+    users = load_user_cards(db, (entry.user_id for entry in entries))
+    result = [serialize_leaderboard(entry, users.get(entry.user_id)) for entry in entries]
     
-    return {
+    return json_response({
         "data": result,
         "page": page,
         "limit": limit,
         "school": school,
         "hasMore": len(entries) == limit
-    }
+    })
+
+@router.get("/schools/nearby")
+async def get_nearby_schools(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    near: Optional[str] = None,
+    radius_km: Optional[float] = Query(None, alias="radiusKm", gt=0, le=20000),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Schools with athletes nearest a point (``lat``/``lon``, or a place name in ``near``)
+
+    A school's position is where its athletes are: each school is listed
+    once, at its location nearest the point, with the number of its
+    athletes there.
+    """
+    try:
+        center = geo.center(lat, lon, near)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    def fetch(cells):
+        query = db.query(
+            User.school, User.location, User.latitude, User.longitude,
+            func.count(User.id).label('athletes')
+        ).filter(User.school.isnot(None), User.geohash.isnot(None))
+        if cells is not None:
+            query = query.filter(geo.cells_predicate(User.geohash, cells))
+        return query.group_by(User.school, User.location, User.latitude, User.longitude).all()
+    
+    hits = geo.nearest(fetch, *center, limit, radius_km=radius_km, key=lambda row: row.school)
+    
+    return json_response([
+        {
+            "school": row.school,
+            "location": row.location,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "athleteCount": row.athletes,
+            "distanceKm": round(distance, 1)
+        }
+        for distance, row in hits
+    ])
 
 @router.get("/schools/rankings")
 async def get_school_rankings(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
     season: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get school-wide rankings"""
     offset = (page - 1) * limit
@@ -275,9 +328,9 @@ async def get_school_rankings(
             "athleteCount": int(athlete_count) if athlete_count else 0
         })
     
-    return {
+    return json_response({
         "data": result,
         "page": page,
         "limit": limit,
         "hasMore": len(school_rankings) == limit
-    }
+    })
@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import select, and_, or_
+from typing import Optional
+from datetime import datetime
+from ..database import get_db
+from ..models import User, Notification, load_user_cards
+from ..schemas import MarkNotificationsRead
+from ..auth import get_current_user
+from ..serializers import serialize_notification, json_response
+from ..pagination import decode_cursor, page, with_next_cursor
+from .. import notifications
+
+router = APIRouter(prefix="/api", tags=["notifications"])
+
+@router.get("/notifications")
+async def get_notifications(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    unread: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """The current user's notifications, newest first, with cursor pagination
+
+    ``unread=true`` returns only unread ones. The next page's cursor comes
+    back in the X-Next-Cursor header.
+    """
+    # Served by IDX_notifications_user_created
+    stmt = select(Notification).where(Notification.user_id == current_user.id)
+    if unread:
+        stmt = stmt.where(Notification.read_at.is_(None))
+    if cursor:
+        try:
+            last_created_at, last_id = decode_cursor(cursor, (datetime, str))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        stmt = stmt.where(or_(
+            Notification.created_at < last_created_at,
+            and_(Notification.created_at == last_created_at, Notification.id < last_id)
+        ))
+    rows, next_cursor = page(
+        db.execute(
+            stmt.order_by(Notification.created_at.desc(), Notification.id.desc()).limit(limit + 1)
+        ).scalars().all(),
+        limit,
+        lambda n: (n.created_at, n.id)
+    )
+
+    # Load every named actor in one query
+    named = {n.id: (n.actor_ids or [])[:notifications.ACTORS_SHOWN] for n in rows}
+    actors = load_user_cards(db, (actor_id for ids in named.values() for actor_id in ids))
+    result = []
+    for n in rows:
+        shown = [actors[actor_id] for actor_id in named[n.id] if actor_id in actors]
+        result.append(serialize_notification(n, shown, notifications.summary(n, shown)))
+
+    return with_next_cursor(json_response(result), next_cursor)
+
+@router.get("/notifications/unread-count")
+async def get_unread_count(
+    current_user: User = Depends(get_current_user)
+):
+    """Unread notifications, from the user's counter"""
+    return {"unread": current_user.unread_notifications or 0}
+
+@router.post("/notifications/read")
+async def mark_notifications_read(
+    body: Optional[MarkNotificationsRead] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Mark notifications read: the listed ``ids``, or all of them"""
+    ids = body.ids if body else None
+    marked = notifications.mark_read(db, current_user.id, ids)
+    unread = db.execute(select(User.unread_notifications).where(User.id == current_user.id)).scalar()
+    return {"marked": marked, "unread": unread or 0}
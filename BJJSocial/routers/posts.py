@@ -1,10 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Literal
 from ..database import get_db
-from ..models import User, Post, Comment, Like
+from ..models import User, Post, Comment, Like, load_user_cards
 from ..schemas import InsertPost, PostResponse, InsertComment, CommentResponse
-from ..auth import get_current_user, get_current_user_optional, sanitize_user
+from ..auth import get_current_user, get_current_user_optional
+from ..serializers import serialize_post, serialize_comment, json_response
+from ..partitions import recent_first, created_near, created_since
+from .. import trending, tags, notifications
 
 router = APIRouter(prefix="/api", tags=["posts"])
 
@@ -25,20 +28,14 @@ async def create_post(
     
     db.add(new_post)
     current_user.posts_count += 1
+    db.flush()
+    trending.bump(db, new_post.id, trending.POST_WEIGHT)
+    tags.record(db, new_post)
     db.commit()
     db.refresh(new_post)
     
     # Return post with user data
-    return {
-        **post_data.model_dump(),
-        "id": new_post.id,
-        "userId": new_post.user_id,
-        "likes": new_post.likes,
-        "shares": new_post.shares,
-        "createdAt": new_post.created_at.isoformat(),
-        "updatedAt": new_post.updated_at.isoformat(),
-        "user": sanitize_user(current_user)
-    }
+    return json_response(serialize_post(new_post, current_user), status_code=status.HTTP_201_CREATED)
 
 @router.get("/posts")
 async def get_posts(
@@ -46,10 +43,11 @@ async def get_posts(
     offset: int = Query(0, ge=0),
     type: Optional[str] = None,
     user_id: Optional[str] = Query(None, alias="userId"),
+    sort: Literal["recent", "trending"] = "recent",
     current_user: Optional[User] = Depends(get_current_user_optional),
     db: Session = Depends(get_db)
 ):
-    """Get posts with pagination and filters"""
+    """Get posts with pagination and filters; ``sort=trending`` ranks by decayed engagement"""
     query = db.query(Post)
     
     if type:
@@ -57,27 +55,23 @@ async def get_posts(
     if user_id:
         query = query.filter(Post.user_id == user_id)
     
-    posts = query.order_by(Post.created_at.desc()).offset(offset).limit(limit).all()
-    
-    # Load users for all posts
-    result = []
-    for post in posts:
-        user = db.query(User).filter(User.id == post.user_id).first()
-        result.append({
-            "id": post.id,
-            "userId": post.user_id,
-            "content": post.content,
-            "type": post.type,
-            "location": post.location,
-            "imageUrls": post.image_urls or [],
-            "likes": post.likes,
-            "shares": post.shares,
-            "createdAt": post.created_at.isoformat(),
-            "updatedAt": post.updated_at.isoformat(),
-            "user": sanitize_user(user) if user else None
-        })
-    
-    return result
+    def fetch(since):
+        if sort == "trending":
+            # Read off IDX_posts_trending; scores are relative to one epoch,
+            # so the stored order is the decayed order
+            return query.order_by(Post.trending_score.desc(), Post.id.desc()).offset(offset).limit(limit).all()
+        bounded = query if since is None else query.filter(Post.created_at >= since)
+        return bounded.order_by(Post.created_at.desc()).offset(offset).limit(limit).all()
+    
+    # The feed is nearly always served from the last month's partition. One
+    # user's posts are sparse, and their index already bounds the read.
+    posts = fetch(None) if user_id or sort == "trending" else recent_first(fetch, limit)
+    
+    # Load author cards for all posts in one query
+    authors = load_user_cards(db, (post.user_id for post in posts))
+    result = [serialize_post(post, authors.get(post.user_id)) for post in posts]
+    
+    return json_response(result)
 
 @router.post("/posts/{post_id}/like")
 async def like_post(
@@ -86,7 +80,7 @@ async def like_post(
     db: Session = Depends(get_db)
 ):
     """Like a post"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = db.query(Post).filter(Post.id == post_id, created_near(Post.created_at, post_id)).first()
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -96,7 +90,8 @@ async def like_post(
     # Check if already liked
     existing_like = db.query(Like).filter(
         Like.post_id == post_id,
-        Like.user_id == current_user.id
+        Like.user_id == current_user.id,
+        created_since(Like.created_at, post_id)
     ).first()
     
     if existing_like:
@@ -106,9 +101,13 @@ async def like_post(
         )
     
     # Create like
+    # Before post.likes changes: the epoch is locked ahead of the post row,
+    # in the same order as a rebase takes them
+    trending.bump(db, post_id, trending.LIKE_WEIGHT)
     new_like = Like(post_id=post_id, user_id=current_user.id)
     db.add(new_like)
     post.likes += 1
+    notifications.enqueue(db, post.user_id, notifications.LIKE, current_user.id, post_id)
     db.commit()
     
     return {"message": "Post liked successfully"}
@@ -122,7 +121,8 @@ async def unlike_post(
     """Unlike a post"""
     like = db.query(Like).filter(
         Like.post_id == post_id,
-        Like.user_id == current_user.id
+        Like.user_id == current_user.id,
+        created_since(Like.created_at, post_id)
     ).first()
     
     if not like:
@@ -131,8 +131,10 @@ async def unlike_post(
             detail="Like not found"
         )
     
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = db.query(Post).filter(Post.id == post_id, created_near(Post.created_at, post_id)).first()
     if post:
+        # Take out what the like added when it was made
+        trending.bump(db, post_id, -trending.LIKE_WEIGHT, like.created_at)
         post.likes -= 1
     
     db.delete(like)
@@ -148,7 +150,7 @@ async def create_comment(
     db: Session = Depends(get_db)
 ):
     """Create a comment on a post"""
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = db.query(Post).filter(Post.id == post_id, created_near(Post.created_at, post_id)).first()
     if not post:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -162,17 +164,12 @@ async def create_comment(
     )
     
     db.add(new_comment)
+    trending.bump(db, post_id, trending.COMMENT_WEIGHT)
+    notifications.enqueue(db, post.user_id, notifications.COMMENT, current_user.id, post_id)
     db.commit()
     db.refresh(new_comment)
     
-    return {
-        "id": new_comment.id,
-        "postId": new_comment.post_id,
-        "userId": new_comment.user_id,
-        "content": new_comment.content,
-        "createdAt": new_comment.created_at.isoformat(),
-        "user": sanitize_user(current_user)
-    }
+    return json_response(serialize_comment(new_comment, current_user), status_code=status.HTTP_201_CREATED)
 
 @router.get("/posts/{post_id}/comments")
 async def get_post_comments(
@@ -180,18 +177,12 @@ async def get_post_comments(
     db: Session = Depends(get_db)
 ):
     """Get comments for a post"""
-    comments = db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.created_at.desc()).all()
-    
-    result = []
-    for comment in comments:
-        user = db.query(User).filter(User.id == comment.user_id).first()
-        result.append({
-            "id": comment.id,
-            "postId": comment.post_id,
-            "userId": comment.user_id,
-            "content": comment.content,
-            "createdAt": comment.created_at.isoformat(),
-            "user": sanitize_user(user) if user else None
-        })
-    
-    return result
+    comments = db.query(Comment).filter(
+        Comment.post_id == post_id,
+        created_since(Comment.created_at, post_id)
+    ).order_by(Comment.created_at.desc()).all()
+    
+    authors = load_user_cards(db, (comment.user_id for comment in comments))
+    result = [serialize_comment(comment, authors.get(comment.user_id)) for comment in comments]
+    
+    return json_response(result)
@@ -1,30 +1,33 @@
 from fastapi import APIRouter, Query, Depends
 from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import User, Post, Tournament
+from ..database import get_read_db
+from ..models import User, Post, Tournament, load_user_cards
 
 router = APIRouter()
 
 @router.get("/api/search")
-async def search(q: str = Query(..., min_length=1), db: Session = Depends(get_db)):
+async def search(q: str = Query(..., min_length=1), db: Session = Depends(get_read_db)):
     # Search for users, posts, and tournaments
-    users = db.query(User).filter(User.firstName.contains(q) | User.lastName.contains(q)).all()
+    users = db.query(User).filter(User.first_name.contains(q) | User.last_name.contains(q)).all()
     posts = db.query(Post).filter(Post.content.contains(q)).all()
     tournaments = db.query(Tournament).filter(Tournament.name.contains(q)).all()
+    # Post authors in one query rather than a lazy load per post
+    authors = load_user_cards(db, (post.user_id for post in posts))
 
     results = []
     for user in users:
         results.append({
             "id": user.id,
             "type": "user",
-            "title": f"{user.firstName} {user.lastName}",
+            "title": f"{user.first_name} {user.last_name}",
             "description": user.bio or ""
         })
     for post in posts:
+        author = authors.get(post.user_id)
         results.append({
             "id": post.id,
             "type": "post",
-            "title": f"Post by {post.author.firstName}",
+            "title": f"Post by {author.first_name if author else 'unknown'}",
             "description": post.content
         })
     for tournament in tournaments:
@@ -32,7 +35,7 @@ async def search(q: str = Query(..., min_length=1), db: Session = Depends(get_db
             "id": tournament.id,
             "type": "tournament",
             "title": tournament.name,
-            "description": tournament.description or ""
+            "description": tournament.location or ""
         })
 
     return {"results": results}
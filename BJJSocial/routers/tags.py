@@ -0,0 +1,102 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.orm import Session
+from sqlalchemy import select, and_, or_
+from typing import Optional
+from datetime import datetime
+from ..database import get_read_db
+from ..models import Post, PostTag, PostMention, TagCount, load_user_cards
+from ..serializers import serialize_post, serialize_tag, json_response
+from ..pagination import decode_cursor, page, with_next_cursor
+from ..tags import normalize_tag
+
+router = APIRouter(prefix="/api", tags=["tags"])
+
+def _linked_posts(db, link, condition, limit, cursor):
+    """Posts joined through ``link`` (post_tags or post_mentions) newest first, with the next cursor
+
+    Reads the link table's (key, created_at, post_id) index.
+    """
+    on = link.post_id == Post.id
+    if db.get_bind().dialect.name == "postgresql":
+        # Lets each post lookup prune to one partition. Not on SQLite, where
+        # the copied timestamp's text can differ from CURRENT_TIMESTAMP's
+        on = and_(on, link.created_at == Post.created_at)
+    stmt = select(Post).join(link, on).where(condition)
+    if cursor:
+        try:
+            last_created_at, last_id = decode_cursor(cursor, (datetime, str))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        stmt = stmt.where(or_(
+            link.created_at < last_created_at,
+            and_(link.created_at == last_created_at, link.post_id < last_id)
+        ))
+    posts, next_cursor = page(
+        db.execute(stmt.order_by(link.created_at.desc(), link.post_id.desc()).limit(limit + 1)).scalars().all(),
+        limit,
+        lambda post: (post.created_at, post.id)
+    )
+    authors = load_user_cards(db, (post.user_id for post in posts))
+    result = [serialize_post(post, authors.get(post.user_id)) for post in posts]
+    return with_next_cursor(json_response(result), next_cursor)
+
+@router.get("/tags/trending")
+async def get_trending_tags(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Tags ranked by recent use, decayed with age like the trending feed"""
+    tags = db.execute(
+        select(TagCount)
+        .where(TagCount.trending_score > 0)
+        .order_by(TagCount.trending_score.desc(), TagCount.tag)
+        .limit(limit)
+    ).scalars().all()
+    return json_response([serialize_tag(tag) for tag in tags])
+
+@router.get("/tags/{tag}")
+async def get_tag(
+    tag: str,
+    db: Session = Depends(get_read_db)
+):
+    """A tag's post count and when it was last used"""
+    normalized = normalize_tag(tag)
+    entry = db.get(TagCount, normalized) if normalized else None
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tag not found"
+        )
+    return json_response(serialize_tag(entry))
+
+@router.get("/tags/{tag}/posts")
+async def get_tag_posts(
+    tag: str,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Posts with a hashtag (with or without the '#', any case), newest first
+
+    The next page's cursor comes back in the X-Next-Cursor header.
+    """
+    normalized = normalize_tag(tag)
+    if normalized is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid tag"
+        )
+    return _linked_posts(db, PostTag, PostTag.tag == normalized, limit, cursor)
+
+@router.get("/users/{user_id}/mentions")
+async def get_user_mentions(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Posts that @mention a user, newest first, with cursor pagination"""
+    return _linked_posts(db, PostMention, PostMention.user_id == user_id, limit, cursor)
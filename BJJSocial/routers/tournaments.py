@@ -1,11 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
 from typing import Optional
 from datetime import datetime
-from ..database import get_db
-from ..models import User, Tournament, Match
+from ..database import get_db, get_read_db
+from ..models import User, Tournament, Match, load_user_cards
+from ..dto import tournaments_select, fetch_tournaments
 from ..schemas import InsertTournament, TournamentResponse, InsertMatch, FinalizeMatch, MatchResponse
-from ..auth import get_current_user, sanitize_user
+from ..auth import get_current_user
+from ..serializers import serialize_tournament, serialize_match, json_response
+from ..pagination import decode_cursor, naive_utc, page, with_next_cursor
+from .. import geo, jobs, notifications
 
 router = APIRouter(prefix="/api", tags=["tournaments"])
 
@@ -32,18 +37,12 @@ async def create_tournament(
     db.commit()
     db.refresh(new_tournament)
     
-    return {
-        "id": new_tournament.id,
-        "name": new_tournament.name,
-        "date": new_tournament.date.isoformat(),
-        "location": new_tournament.location,
-        "isGi": new_tournament.is_gi,
-        "ruleset": new_tournament.ruleset,
-        "tier": new_tournament.tier,
-        "organizerId": new_tournament.organizer_id,
-        "createdAt": new_tournament.created_at.isoformat(),
-        "organizer": sanitize_user(current_user)
-    }
+    return json_response(serialize_tournament(new_tournament, current_user), status_code=status.HTTP_201_CREATED)
+
+def season_bounds(season):
+    """[start, end) of a season (a calendar year, see ratings.season_for)"""
+    year = int(season)
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
 
 @router.get("/tournaments")
 async def get_tournaments(
@@ -51,47 +50,122 @@ async def get_tournaments(
     ruleset: Optional[str] = None,
     is_gi: Optional[bool] = Query(None, alias="isGi"),
     season: Optional[str] = None,
-    db: Session = Depends(get_db)
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
 ):
-    """Get tournaments with filters"""
-    query = db.query(Tournament)
+    """Get tournaments, newest first, with filters and cursor pagination
+
+    ``from``/``to`` bound the tournament date (``from`` inclusive, ``to``
+    exclusive); ``season`` is shorthand for that year. The next page's
+    cursor comes back in the X-Next-Cursor header. ``offset`` still works
+    for old clients but reads every skipped row.
+    """
+    stmt = tournaments_select()
+    # Stored dates are naive UTC; "...Z" or "+02:00" bounds are converted
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
     
     if q:
-        query = query.filter(Tournament.name.ilike(f"%{q}%"))
+        # Served by the trigram index on Postgres (see migration 0005)
+        stmt = stmt.where(Tournament.name.ilike(f"%{q}%"))
     if ruleset:
-        query = query.filter(Tournament.ruleset == ruleset)
+        stmt = stmt.where(Tournament.ruleset == ruleset)
     if is_gi is not None:
-        query = query.filter(Tournament.is_gi == is_gi)
+        stmt = stmt.where(Tournament.is_gi == is_gi)
     if season:
-        # Filter by year
-        year = int(season)
-        query = query.filter(db.func.extract('year', Tournament.date) == year)
+        try:
+            season_from, season_to = season_bounds(season)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Season must be a year"
+            )
+        date_from = max(date_from, season_from) if date_from else season_from
+        date_to = min(date_to, season_to) if date_to else season_to
+    # Plain range predicates on the column, so the (date) and
+    # (ruleset, is_gi, date) indexes apply
+    if date_from:
+        stmt = stmt.where(Tournament.date >= date_from)
+    if date_to:
+        stmt = stmt.where(Tournament.date < date_to)
+    if cursor:
+        try:
+            last_date, last_id = decode_cursor(cursor, (datetime, str))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        stmt = stmt.where(or_(
+            Tournament.date < last_date,
+            and_(Tournament.date == last_date, Tournament.id > last_id)
+        ))
+    elif offset:
+        stmt = stmt.offset(offset)
+    
+    tournaments, next_cursor = page(
+        fetch_tournaments(db, stmt.order_by(Tournament.date.desc(), Tournament.id).limit(limit + 1)),
+        limit,
+        lambda t: (t.date, t.id)
+    )
+    
+    # Load organizers in one query
+    organizers = load_user_cards(db, (t.organizer_id for t in tournaments))
+    result = [serialize_tournament(t, organizers.get(t.organizer_id)) for t in tournaments]
+    
+    return with_next_cursor(json_response(result), next_cursor)
+
+@router.get("/tournaments/nearby")
+async def get_nearby_tournaments(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    near: Optional[str] = None,
+    radius_km: Optional[float] = Query(None, alias="radiusKm", gt=0, le=20000),
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Tournaments nearest a point (``lat``/``lon``, or a place name in ``near``)
+
+    With ``radiusKm``, every tournament within it (up to ``limit``);
+    otherwise the ``limit`` nearest. ``from`` keeps only tournaments on or
+    after that date. Each row carries ``distanceKm``.
+    """
+    date_from = naive_utc(date_from)
+    try:
+        center = geo.center(lat, lon, near)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    def fetch(cells):
+        stmt = tournaments_select().where(Tournament.geohash.isnot(None))
+        if cells is not None:
+            stmt = stmt.where(geo.cells_predicate(Tournament.geohash, cells))
+        if date_from:
+            stmt = stmt.where(Tournament.date >= date_from)
+        return fetch_tournaments(db, stmt)
     
-    tournaments = query.order_by(Tournament.date.desc()).all()
+    hits = geo.nearest(fetch, *center, limit, radius_km=radius_km)
     
-    # Load organizers
+    organizers = load_user_cards(db, (t.organizer_id for _, t in hits))
     result = []
-    for tournament in tournaments:
-        organizer = db.query(User).filter(User.id == tournament.organizer_id).first()
-        result.append({
-            "id": tournament.id,
-            "name": tournament.name,
-            "date": tournament.date.isoformat(),
-            "location": tournament.location,
-            "isGi": tournament.is_gi,
-            "ruleset": tournament.ruleset,
-            "tier": tournament.tier,
-            "organizerId": tournament.organizer_id,
-            "createdAt": tournament.created_at.isoformat(),
-            "organizer": sanitize_user(organizer) if organizer else None
-        })
+    for distance, tournament in hits:
+        data = serialize_tournament(tournament, organizers.get(tournament.organizer_id))
+        data["distanceKm"] = round(distance, 1)
+        result.append(data)
     
-    return result
+    return json_response(result)
 
 @router.get("/tournaments/{tournament_id}")
 async def get_tournament(
     tournament_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a tournament by ID"""
     tournament = db.query(Tournament).filter(Tournament.id == tournament_id).first()
@@ -103,18 +177,7 @@ async def get_tournament(
     
     organizer = db.query(User).filter(User.id == tournament.organizer_id).first()
     
-    return {
-        "id": tournament.id,
-        "name": tournament.name,
-        "date": tournament.date.isoformat(),
-        "location": tournament.location,
-        "isGi": tournament.is_gi,
-        "ruleset": tournament.ruleset,
-        "tier": tournament.tier,
-        "organizerId": tournament.organizer_id,
-        "createdAt": tournament.created_at.isoformat(),
-        "organizer": sanitize_user(organizer) if organizer else None
-    }
+    return json_response(serialize_tournament(tournament, organizer))
 
 # ============= Match Routes =============
 
@@ -161,47 +224,26 @@ async def create_match(
 @router.get("/tournaments/{tournament_id}/matches")
 async def get_tournament_matches(
     tournament_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get all matches for a tournament"""
     matches = db.query(Match).filter(Match.tournament_id == tournament_id).all()
     
+    # Competitor cards for the whole bracket in one query
+    competitors = load_user_cards(
+        db, (uid for match in matches for uid in (match.competitor_a_id, match.competitor_b_id))
+    )
+    
     result = []
     for match in matches:
-        comp_a = db.query(User).filter(User.id == match.competitor_a_id).first()
-        comp_b = db.query(User).filter(User.id == match.competitor_b_id).first()
-        winner = db.query(User).filter(User.id == match.winner_id).first() if match.winner_id else None
-        
-        result.append({
-            "id": match.id,
-            "tournamentId": match.tournament_id,
-            "round": match.round,
-            "belt": match.belt,
-            "weightClass": match.weight_class,
-            "ageDivision": match.age_division,
-            "gender": match.gender,
-            "competitorAId": match.competitor_a_id,
-            "competitorBId": match.competitor_b_id,
-            "winnerId": match.winner_id,
-            "method": match.method,
-            "submissionType": match.submission_type,
-            "pointsA": match.points_a,
-            "pointsB": match.points_b,
-            "advantagesA": match.advantages_a,
-            "advantagesB": match.advantages_b,
-            "penaltiesA": match.penalties_a,
-            "penaltiesB": match.penalties_b,
-            "durationSec": match.duration_sec,
-            "resultFinal": match.result_final,
-            "awardedWinnerPts": match.awarded_winner_pts,
-            "awardedLoserPts": match.awarded_loser_pts,
-            "createdAt": match.created_at.isoformat(),
-            "competitorA": sanitize_user(comp_a) if comp_a else None,
-            "competitorB": sanitize_user(comp_b) if comp_b else None,
-            "winner": sanitize_user(winner) if winner else None
-        })
+        result.append(serialize_match(
+            match,
+            competitors.get(match.competitor_a_id),
+            competitors.get(match.competitor_b_id),
+            competitors.get(match.winner_id)
+        ))
     
-    return result
+    return json_response(result)
 
 @router.post("/matches/{match_id}/result")
 async def submit_match_result(
@@ -228,6 +270,8 @@ async def submit_match_result(
             detail="Only tournament organizers can submit match results"
         )
     
+    was_final = match.result_final
+    
     # Update match with result
     if result_data.winner_id:
         match.winner_id = result_data.winner_id
@@ -257,6 +301,15 @@ async def submit_match_result(
     
     match.result_final = True
     
+    # Ratings move once, when the result is first finalized; corrections
+    # to an already-final result need a season replay (ratings.replay_season).
+    # The update runs as a job committed with the result (tasks.py).
+    if not was_final:
+        jobs.enqueue(db, "ratings.apply_match", {"match_id": match.id}, dedup_key=f"ratings.apply_match:{match.id}")
+    
+    for competitor_id in (match.competitor_a_id, match.competitor_b_id):
+        notifications.enqueue(db, competitor_id, notifications.MATCH_RESULT, current_user.id, match.id)
+    
     db.commit()
     
     return {"message": "Match result submitted successfully"}
@@ -1,26 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-from typing import List
-from ..database import get_db
-from ..models import User, Post, Comment, Follow
+from typing import List, Optional
+from ..database import get_db, get_read_db
+from ..models import User, Post, Comment, Follow, UserSuggestion, load_user_cards
+from ..dto import following_cards_select, fetch_user_cards
+from .. import profiles, notifications
 from ..schemas import UserResponse, UpdateUser
-from ..auth import get_current_user, sanitize_user
+from ..auth import get_current_user
+from ..serializers import serialize_user, serialize_user_card, serialize_suggestion, json_response
 
 router = APIRouter(prefix="/api", tags=["users"])
 
 @router.get("/users/{user_id}", response_model=dict)
 async def get_user_profile(
     user_id: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a user's profile by ID"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = profiles.load_user(db, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
-    return sanitize_user(user)
+    return json_response(serialize_user(user))
+
+@router.get("/users/{user_id}/profile-bundle")
+async def get_profile_bundle(
+    user_id: str,
+    request: Request,
+    include: Optional[str] = None,
+    season: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Get everything a profile page shows in one response
+
+    ``include`` is a comma-separated subset of user, stats, leaderboard,
+    matches and followers (default: all). ``season`` filters the
+    leaderboard entries; ``limit`` applies to matches and followers.
+    """
+    sections = profiles.PROFILE_SECTIONS
+    if include:
+        sections = {section.strip() for section in include.split(",") if section.strip()}
+        unknown = sections.difference(profiles.PROFILE_SECTIONS)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown sections: {', '.join(sorted(unknown))}"
+            )
+    
+    bundle = await profiles.profile_bundle(request, user_id, sections, season=season, limit=limit)
+    if bundle is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return json_response(bundle)
 
 @router.put("/user/profile", response_model=dict)
 async def update_user_profile(
@@ -49,29 +84,46 @@ async def update_user_profile(
     db.commit()
     db.refresh(current_user)
     
-    return sanitize_user(current_user)
+    return json_response(serialize_user(current_user))
+
+@router.get("/users/me/suggestions")
+async def get_suggestions(
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """Get who-to-follow suggestions for the current user (rebuilt periodically)"""
+    suggestions = db.query(UserSuggestion).filter(
+        UserSuggestion.user_id == current_user.id
+    ).order_by(UserSuggestion.position).limit(limit).all()
+    
+    users = load_user_cards(db, (suggestion.suggested_user_id for suggestion in suggestions))
+    
+    return json_response([
+        serialize_suggestion(suggestion, users.get(suggestion.suggested_user_id))
+        for suggestion in suggestions
+    ])
 
 @router.get("/users/{user_id}/followers")
 async def get_followers(
     user_id: str,
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
 ):
     """Get a user's followers"""
-    follows = db.query(Follow).filter(Follow.following_id == user_id).all()
-    follower_ids = [f.follower_id for f in follows]
-    followers = db.query(User).filter(User.id.in_(follower_ids)).all()
-    return [sanitize_user(user) for user in followers]
+    return json_response(profiles.followers(db, user_id, limit=limit, offset=offset))
 
 @router.get("/users/{user_id}/following")
 async def get_following(
     user_id: str,
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db)
 ):
     """Get users that a user is following"""
-    follows = db.query(Follow).filter(Follow.follower_id == user_id).all()
-    following_ids = [f.following_id for f in follows]
-    following = db.query(User).filter(User.id.in_(following_ids)).all()
-    return [sanitize_user(user) for user in following]
+    following = fetch_user_cards(db, following_cards_select(user_id).offset(offset).limit(limit))
+    return json_response([serialize_user_card(user) for user in following])
 
 @router.post("/users/{user_id}/follow")
 async def follow_user(
@@ -113,6 +165,7 @@ async def follow_user(
     # Update counts
     current_user.following_count += 1
     target_user.followers_count += 1
+    notifications.enqueue(db, user_id, notifications.FOLLOW, current_user.id)
     
     db.commit()
     
@@ -159,7 +212,7 @@ async def unfollow_user(
 async def get_user_stats(
     user_id: str,
     season: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get a user's competition statistics"""
     user = db.query(User).filter(User.id == user_id).first()
@@ -170,10 +223,4 @@ async def get_user_stats(
         )
     
     # Return basic stats (can be enhanced with season-specific stats)
-    return {
-        "userId": user.id,
-        "competitions": user.competitions,
-        "wins": user.wins,
-        "losses": user.losses,
-        "winRate": round(user.wins / max(user.competitions, 1) * 100, 2) if user.competitions > 0 else 0
-    }
+    return profiles.user_stats(user)
@@ -1,6 +1,14 @@
 from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
+from . import lookups
+
+def _known_lookup_name(cls, value, info):
+    # Division dimensions take only registered names (any spelling or alias
+    # of one); anything else is a 422, never a new lookup row
+    if value is None:
+        return value
+    return lookups.validate(info.field_name, value)
 
 # ============= Authentication Schemas =============
 class RegisterUser(BaseModel):
@@ -65,6 +73,8 @@ class UpdateUser(BaseModel):
     age_division: Optional[str] = Field(None, alias="ageDivision")
     gender: Optional[str] = None
 
+    check_lookups = field_validator("belt", "weight_class", "age_division", "gender")(_known_lookup_name)
+
     class Config:
         populate_by_name = True
 
@@ -124,6 +134,8 @@ class InsertTournament(BaseModel):
     ruleset: str = "IBJJF"
     tier: str = "LOCAL"
 
+    check_lookups = field_validator("ruleset", "tier")(_known_lookup_name)
+
     class Config:
         populate_by_name = True
 
@@ -132,6 +144,8 @@ class TournamentResponse(BaseModel):
     name: str
     date: datetime
     location: Optional[str]
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     is_gi: bool = Field(..., alias="isGi")
     ruleset: str
     tier: str
@@ -165,6 +179,8 @@ class InsertMatch(BaseModel):
     duration_sec: Optional[int] = Field(None, alias="durationSec")
     result_final: Optional[bool] = Field(False, alias="resultFinal")
 
+    check_lookups = field_validator("belt", "weight_class", "age_division", "gender")(_known_lookup_name)
+
     class Config:
         populate_by_name = True
 
@@ -236,3 +252,20 @@ class LeaderboardResponse(BaseModel):
     class Config:
         populate_by_name = True
         from_attributes = True
+
+# ============= Notification Schemas =============
+class MarkNotificationsRead(BaseModel):
+    # Omitted: mark every notification read
+    ids: Optional[List[str]] = Field(None, max_length=500)
+
+# ============= Admin Schemas =============
+class RegisterLookupNames(BaseModel):
+    names: List[str] = Field(..., min_length=1, max_length=100)
+
+    @field_validator("names")
+    @classmethod
+    def check_names(cls, names):
+        names = [name.strip() for name in names]
+        if any(not name or len(name) > 64 for name in names):
+            raise ValueError("Names must be 1-64 characters")
+        return names
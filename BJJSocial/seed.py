@@ -0,0 +1,309 @@
+"""Generate realistic synthetic data at a configurable scale.
+
+Run with: python -m BJJSocial.seed [--users N] [--seed S]
+
+Writes to DATABASE_URL (after applying migrations) with bulk inserts.
+Everything derives from --seed, so the same arguments always produce the
+same data. Follows, likes and comments are power-law distributed: a few
+athletes and posts get most of the attention. Tournament brackets pair
+athletes of the same belt, weight class and gender; leaderboard rows,
+win/loss counters, ratings, leaderboard history, follow suggestions, post
+tags and trending scores are derived from the generated results.
+
+Every seeded user can log in with SEED_PASSWORD.
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert
+
+from .database import engine, get_db_context
+from .models import User, Follow, Post, Like, Comment, Tournament, Match, Leaderboard, uuid7
+from . import geo, lookups, migrations
+
+SEED_PASSWORD = "bjjsocial-seed"
+INSERT_CHUNK_SIZE = 5000
+
+FIRST_NAMES = (
+    "Ana", "Bruno", "Carla", "Diego", "Elena", "Felipe", "Gabi", "Hugo", "Isabela", "João",
+    "Kayla", "Lucas", "Marcus", "Nina", "Otavio", "Priscila", "Rafael", "Sofia", "Tiago", "Vitor",
+    "Will", "Yasmin", "Zach", "Mikey", "Gordon", "Ffion", "Kade", "Bea", "Andre", "Mackenzie",
+)
+LAST_NAMES = (
+    "Silva", "Santos", "Souza", "Oliveira", "Pereira", "Costa", "Ribeiro", "Almeida", "Ryan",
+    "Musumeci", "Mendes", "Miyao", "Meregali", "Tackett", "Davies", "Ruotolo", "Galvao", "Lopes",
+    "Nguyen", "Smith", "Johnson", "Garcia", "Kim", "Tanaka", "Rossi", "Müller", "Dubois",
+)
+CITIES = (
+    "Austin, TX", "San Diego, CA", "Las Vegas, NV", "New York, NY", "Miami, FL", "Chicago, IL",
+    "Seattle, WA", "Denver, CO", "Atlanta, GA", "Boston, MA", "Orlando, FL", "Dallas, TX",
+)
+SCHOOL_NAMES = (
+    "Atos", "Alliance", "Gracie Barra", "Checkmat", "Art of Jiu Jitsu", "Unity", "B-Team",
+    "Ribeiro JJ", "Nova Uniao", "GF Team", "Zenith", "Fight Sports", "Renzo Gracie", "10th Planet",
+    "Carlson Gracie", "Team Lloyd Irvin", "Marcelo Garcia", "Danaher Death Squad", "Soul Fighters",
+    "Dream Art", "Cicero Costha", "Ares BJJ", "Kingsway", "New Wave", "Yamasaki", "Brasa",
+    "Origin", "Legacy", "Heroes Martial Arts", "Infinity",
+)
+# (belt, share of users)
+BELTS = (("White", 0.42), ("Blue", 0.30), ("Purple", 0.14), ("Brown", 0.08), ("Black", 0.06))
+WEIGHT_CLASSES = ("Rooster", "Light Feather", "Feather", "Light", "Middle", "Medium Heavy", "Heavy", "Super Heavy", "Ultra Heavy")
+AGE_DIVISIONS = (("Adult", 0.7), ("Master 1", 0.15), ("Master 2", 0.1), ("Juvenile", 0.05))
+RULESETS = (("IBJJF", 0.6), ("ADCC", 0.15), ("NAGA", 0.15), ("SJJIF", 0.1))
+TIERS = (("LOCAL", 0.7), ("REGIONAL", 0.2), ("NATIONAL", 0.08), ("WORLD", 0.02))
+METHODS = (("Points", 0.55), ("Submission", 0.35), ("Advantages", 0.06), ("Referee Decision", 0.04))
+SUBMISSIONS = ("Armbar", "Triangle", "Rear Naked Choke", "Heel Hook", "Kimura", "Guillotine", "Bow and Arrow", "Ezekiel")
+POST_TYPES = (("general", 0.6), ("training", 0.25), ("competition", 0.1), ("technique", 0.05))
+POST_PHRASES = (
+    "Great rounds tonight", "Drilling {sub} setups all week", "Finally hit the {sub} in live rolling",
+    "Competition prep day {n}", "Open mat this Saturday", "Guard retention is a lifestyle",
+    "New stripe today!", "Recovering from a tough camp", "Who's going to the {city} open?",
+)
+TAGS = ("bjj", "jiujitsu", "nogi", "gi", "opens", "drilling", "compete", "ossss", "leglocks", "guard")
+
+def _weighted(rng, table):
+    values, weights = zip(*table)
+    return rng.choices(values, weights=weights)[0]
+
+def _zipf_weights(count, exponent):
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+def _chunked_insert(conn, model, rows):
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        conn.execute(insert(model), rows[start:start + INSERT_CHUNK_SIZE])
+
+def _place(location):
+    """Location columns for a bulk-inserted row (the ORM geocodes on flush; Core inserts do not)"""
+    point = geo.geocode(location)
+    return {
+        "location": location,
+        "latitude": point and point[0],
+        "longitude": point and point[1],
+        "geohash": point and geo.encode_geohash(*point),
+    }
+
+def _uuid(rng, created_at):
+    """Time-ordered id like generate_uuid(), but reproducible and dated to the row"""
+    return str(uuid7(int(created_at.replace(tzinfo=timezone.utc).timestamp() * 1000), rng.getrandbits(80)))
+
+def generate(rng, users=2000, tournaments=None, posts_per_user=4.0, now=None):
+    """All rows as {model: [row dicts]}, generated in memory"""
+    now = now or datetime(2025, 6, 1)
+    tournaments = tournaments or max(users // 50, 5)
+
+    # Schools follow a power law too: a handful of big academies
+    school_weights = _zipf_weights(len(SCHOOL_NAMES), 1.1)
+    instructors = {school: [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(3)]
+                   for school in SCHOOL_NAMES}
+
+    user_rows = []
+    for index in range(users):
+        school = rng.choices(SCHOOL_NAMES, weights=school_weights)[0]
+        belt = _weighted(rng, BELTS)
+        created_at = now - timedelta(days=rng.randint(30, 1500))
+        user_rows.append({
+            "id": _uuid(rng, created_at),
+            "email": f"athlete{index}@example.com",
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "belt": belt,
+            "stripes": rng.randint(0, 4),
+            "weight_class": rng.choice(WEIGHT_CLASSES),
+            "school": school,
+            "instructor": rng.choice(instructors[school]),
+            "years_training": str(rng.randint(0, 20)),
+            "competitions": 0,
+            "wins": 0,
+            "losses": 0,
+            **_place(rng.choice(CITIES)),
+            "age_division": _weighted(rng, AGE_DIVISIONS),
+            "gender": "Female" if rng.random() < 0.3 else "Male",
+            "followers_count": 0,
+            "following_count": 0,
+            "posts_count": 0,
+            "created_at": created_at,
+        })
+    ids = [row["id"] for row in user_rows]
+    by_id = {row["id"]: row for row in user_rows}
+
+    # Follows: out-degree is Pareto-distributed and targets are chosen by
+    # popularity rank, so follower counts end up heavy-tailed
+    popularity = _zipf_weights(users, 0.9)
+    popular = ids[:]
+    rng.shuffle(popular)
+    follow_rows = []
+    for follower in user_rows:
+        degree = min(int(rng.paretovariate(1.3) * 3), users - 1)
+        targets = set(rng.choices(popular, weights=popularity, k=degree))
+        targets.discard(follower["id"])
+        for target in targets:
+            created_at = now - timedelta(minutes=rng.randint(0, 525600))
+            follow_rows.append({
+                "id": _uuid(rng, created_at), "follower_id": follower["id"], "following_id": target,
+                "created_at": created_at,
+            })
+            follower["following_count"] += 1
+            by_id[target]["followers_count"] += 1
+
+    # Posts: per-user activity is heavy-tailed as well
+    post_rows = []
+    for author in user_rows:
+        count = min(int(rng.expovariate(1 / posts_per_user)), int(posts_per_user * 20))
+        for _ in range(count):
+            text = rng.choice(POST_PHRASES).format(sub=rng.choice(SUBMISSIONS), n=rng.randint(1, 60), city=rng.choice(CITIES).split(",")[0])
+            tags = " ".join("#" + tag for tag in rng.sample(TAGS, rng.randint(0, 3)))
+            created_at = now - timedelta(minutes=rng.randint(0, 525600))
+            post_rows.append({
+                "id": _uuid(rng, created_at), "user_id": author["id"], "content": f"{text} {tags}".strip(),
+                "type": _weighted(rng, POST_TYPES), "location": author["location"], "image_urls": [],
+                "likes": 0, "shares": 0, "created_at": created_at,
+            })
+            author["posts_count"] += 1
+
+    like_rows, comment_rows = [], []
+    for post in post_rows:
+        likers = set(rng.choices(popular, weights=popularity, k=min(int(rng.paretovariate(1.2)) - 1, users)))
+        for liker in likers:
+            created_at = post["created_at"] + timedelta(minutes=rng.randint(1, 1440))
+            like_rows.append({"id": _uuid(rng, created_at), "post_id": post["id"], "user_id": liker, "created_at": created_at})
+        post["likes"] = len(likers)
+        for _ in range(min(int(rng.paretovariate(1.5)) - 1, 50)):
+            created_at = post["created_at"] + timedelta(minutes=rng.randint(1, 600))
+            comment_rows.append({
+                "id": _uuid(rng, created_at), "post_id": post["id"], "user_id": rng.choice(ids),
+                "content": rng.choice(("Osss", "Congrats!", "See you at open mat", "Nice finish", "Details please")),
+                "created_at": created_at,
+            })
+
+    # Tournaments across the last three seasons
+    tournament_rows = []
+    for index in range(tournaments):
+        city = rng.choice(CITIES)
+        created_at = now - timedelta(days=3 * 365 + rng.randint(0, 60))
+        tournament_rows.append({
+            "id": _uuid(rng, created_at),
+            "name": f"{city.split(',')[0]} {rng.choice(('Open', 'Championship', 'Invitational', 'Classic'))} #{index}",
+            "date": now - timedelta(days=rng.randint(0, 3 * 365)),
+            **_place(city),
+            "is_gi": rng.random() < 0.6,
+            "ruleset": _weighted(rng, RULESETS),
+            "tier": _weighted(rng, TIERS),
+            "organizer_id": rng.choice(ids),
+            "created_at": created_at,
+        })
+
+    # Brackets: each tournament draws a fraction of athletes; competitors in
+    # the same bracket are paired off round by round
+    match_rows = []
+    standings = defaultdict(lambda: {"points": 0, "submissions": 0, "wins": 0, "losses": 0})
+    for tournament in tournament_rows:
+        entrants = rng.sample(user_rows, min(users, rng.randint(20, 120)))
+        brackets = defaultdict(list)
+        for athlete in entrants:
+            brackets[(athlete["belt"], athlete["weight_class"], athlete["age_division"], athlete["gender"])].append(athlete)
+        season = str(tournament["date"].year)
+        for (belt, weight_class, age_division, gender), bracket in brackets.items():
+            round_number = 1
+            while len(bracket) > 1:
+                rng.shuffle(bracket)
+                advancing = bracket[len(bracket) // 2 * 2:]
+                for a, b in zip(bracket[0::2], bracket[1::2]):
+                    winner, loser = (a, b) if rng.random() < 0.5 else (b, a)
+                    method = _weighted(rng, METHODS)
+                    created_at = tournament["date"] + timedelta(minutes=round_number * 15)
+                    match_rows.append({
+                        "id": _uuid(rng, created_at), "tournament_id": tournament["id"],
+                        "round": "Final" if len(bracket) == 2 else f"Round {round_number}",
+                        "belt": belt, "weight_class": weight_class, "age_division": age_division, "gender": gender,
+                        "competitor_a_id": a["id"], "competitor_b_id": b["id"], "winner_id": winner["id"],
+                        "method": method,
+                        "submission_type": rng.choice(SUBMISSIONS) if method == "Submission" else None,
+                        "points_a": rng.randint(0, 12), "points_b": rng.randint(0, 12),
+                        "advantages_a": rng.randint(0, 3), "advantages_b": rng.randint(0, 3),
+                        "penalties_a": rng.randint(0, 2), "penalties_b": rng.randint(0, 2),
+                        "duration_sec": rng.randint(30, 600), "result_final": True,
+                        "awarded_winner_pts": 3, "awarded_loser_pts": 1,
+                        "created_at": created_at,
+                    })
+                    division = (season, tournament["ruleset"], tournament["is_gi"], belt, weight_class, age_division, gender)
+                    won, lost = standings[(winner["id"], division)], standings[(loser["id"], division)]
+                    won["points"] += 3
+                    won["wins"] += 1
+                    won["submissions"] += method == "Submission"
+                    lost["points"] += 1
+                    lost["losses"] += 1
+                    winner["wins"] += 1
+                    loser["losses"] += 1
+                    advancing.append(winner)
+                bracket = advancing
+                round_number += 1
+        for athlete in entrants:
+            athlete["competitions"] += 1
+
+    leaderboard_rows = [
+        {
+            "id": _uuid(rng, now), "user_id": user_id,
+            "season": season, "ruleset": ruleset, "is_gi": is_gi, "belt": belt,
+            "weight_class": weight_class, "age_division": age_division, "gender": gender,
+            "last_updated": now, **totals,
+        }
+        for (user_id, (season, ruleset, is_gi, belt, weight_class, age_division, gender)), totals in standings.items()
+    ]
+
+    return {
+        User: user_rows, Follow: follow_rows, Post: post_rows, Like: like_rows, Comment: comment_rows,
+        Tournament: tournament_rows, Match: match_rows, Leaderboard: leaderboard_rows,
+    }
+
+def seed(users=2000, seed_value=42, tournaments=None, posts_per_user=4.0, derived=True, log=print):
+    """Generate and insert a dataset into the configured database; returns row counts"""
+    from .auth import hash_password
+
+    migrations.upgrade(engine, log=log)
+    started = time.perf_counter()
+    data = generate(random.Random(seed_value), users=users, tournaments=tournaments, posts_per_user=posts_per_user)
+    password = hash_password(SEED_PASSWORD)
+    for row in data[User]:
+        row["password"] = password
+    log(f"Generated in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for model, rows in data.items():
+            # Seeded names are registered here; requests can only use registered ones
+            for field in lookups.FIELD_DIMENSIONS:
+                if rows and field in rows[0]:
+                    lookups.ensure(conn, field, {row[field] for row in rows})
+            _chunked_insert(conn, model, rows)
+    log(f"Inserted in {time.perf_counter() - started:.1f}s")
+
+    if derived:
+        from . import ratings, snapshots, recommendations, tags, trending
+        started = time.perf_counter()
+        with get_db_context() as db:
+            for season in sorted({str(t["date"].year) for t in data[Tournament]}):
+                ratings.replay_season(db, season)
+            snapshots.take_snapshot(db)
+            recommendations.rebuild_suggestions(db)
+            tags.backfill(db, log=log)
+            trending.rebuild_scores(db)
+        log(f"Derived ratings, snapshot, suggestions, tags and trending scores in {time.perf_counter() - started:.1f}s")
+
+    return {model.__tablename__: len(rows) for model, rows in data.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the database with synthetic data")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--tournaments", type=int, default=None, help="Default: users / 50")
+    parser.add_argument("--posts-per-user", type=float, default=4.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-derived", action="store_true", help="Skip ratings, snapshots, suggestions, tags and trending scores")
+    args = parser.parse_args()
+    counts = seed(args.users, args.seed, args.tournaments, args.posts_per_user, derived=not args.no_derived)
+    for table, count in counts.items():
+        print(f"{table:>12}: {count}")
+
+if __name__ == "__main__":
+    main()
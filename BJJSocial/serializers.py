@@ -0,0 +1,265 @@
+from operator import attrgetter
+
+from fastapi.responses import ORJSONResponse
+
+# Serializers are compiled once at import time: each one is a single
+# attrgetter over the model's columns zipped onto the camelCase API keys.
+# Datetimes are left as-is; orjson encodes them natively in ISO 8601, so
+# there is no per-field .isoformat() call and no jsonable_encoder pass.
+
+def compile_serializer(fields):
+    """Build a row -> dict function from an ordered {api_key: attribute} mapping"""
+    keys = tuple(fields)
+    getter = attrgetter(*fields.values())
+
+    def serialize(obj):
+        return dict(zip(keys, getter(obj)))
+
+    return serialize
+
+# ============= Field Maps =============
+USER_FIELDS = {
+    "id": "id",
+    "email": "email",
+    "firstName": "first_name",
+    "lastName": "last_name",
+    "profileImageUrl": "profile_image_url",
+    "belt": "belt",
+    "stripes": "stripes",
+    "weight": "weight",
+    "weightClass": "weight_class",
+    "school": "school",
+    "instructor": "instructor",
+    "yearsTraining": "years_training",
+    "competitions": "competitions",
+    "wins": "wins",
+    "losses": "losses",
+    "bio": "bio",
+    "location": "location",
+    "ageDivision": "age_division",
+    "gender": "gender",
+    "followersCount": "followers_count",
+    "followingCount": "following_count",
+    "postsCount": "posts_count",
+    "createdAt": "created_at",
+    "updatedAt": "updated_at",
+}
+
+USER_CARD_FIELDS = {
+    "id": "id",
+    "firstName": "first_name",
+    "lastName": "last_name",
+    "belt": "belt",
+    "stripes": "stripes",
+    "school": "school",
+}
+
+POST_FIELDS = {
+    "id": "id",
+    "userId": "user_id",
+    "content": "content",
+    "type": "type",
+    "location": "location",
+    "imageUrls": "image_urls",
+    "likes": "likes",
+    "shares": "shares",
+    "createdAt": "created_at",
+    "updatedAt": "updated_at",
+}
+
+COMMENT_FIELDS = {
+    "id": "id",
+    "postId": "post_id",
+    "userId": "user_id",
+    "content": "content",
+    "createdAt": "created_at",
+}
+
+TOURNAMENT_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "date": "date",
+    "location": "location",
+    "latitude": "latitude",
+    "longitude": "longitude",
+    "isGi": "is_gi",
+    "ruleset": "ruleset",
+    "tier": "tier",
+    "organizerId": "organizer_id",
+    "createdAt": "created_at",
+}
+
+TOURNAMENT_SUMMARY_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "date": "date",
+    "ruleset": "ruleset",
+    "isGi": "is_gi",
+}
+
+MATCH_FIELDS = {
+    "id": "id",
+    "tournamentId": "tournament_id",
+    "round": "round",
+    "belt": "belt",
+    "weightClass": "weight_class",
+    "ageDivision": "age_division",
+    "gender": "gender",
+    "competitorAId": "competitor_a_id",
+    "competitorBId": "competitor_b_id",
+    "winnerId": "winner_id",
+    "method": "method",
+    "submissionType": "submission_type",
+    "pointsA": "points_a",
+    "pointsB": "points_b",
+    "advantagesA": "advantages_a",
+    "advantagesB": "advantages_b",
+    "penaltiesA": "penalties_a",
+    "penaltiesB": "penalties_b",
+    "durationSec": "duration_sec",
+    "resultFinal": "result_final",
+    "awardedWinnerPts": "awarded_winner_pts",
+    "awardedLoserPts": "awarded_loser_pts",
+    "createdAt": "created_at",
+}
+
+LEADERBOARD_FIELDS = {
+    "id": "id",
+    "season": "season",
+    "ruleset": "ruleset",
+    "isGi": "is_gi",
+    "belt": "belt",
+    "weightClass": "weight_class",
+    "ageDivision": "age_division",
+    "gender": "gender",
+    "userId": "user_id",
+    "points": "points",
+    "submissions": "submissions",
+    "wins": "wins",
+    "losses": "losses",
+    "lastUpdated": "last_updated",
+}
+
+RATING_FIELDS = {
+    "id": "id",
+    "season": "season",
+    "ruleset": "ruleset",
+    "isGi": "is_gi",
+    "belt": "belt",
+    "weightClass": "weight_class",
+    "ageDivision": "age_division",
+    "gender": "gender",
+    "userId": "user_id",
+    "rating": "rating",
+    "matchesPlayed": "matches_played",
+    "lastUpdated": "last_updated",
+}
+
+RATING_HISTORY_FIELDS = {
+    "ratingId": "rating_id",
+    "matchId": "match_id",
+    "ratingBefore": "rating_before",
+    "ratingAfter": "rating_after",
+    "playedAt": "played_at",
+}
+
+SUGGESTION_FIELDS = {
+    "userId": "suggested_user_id",
+    "score": "score",
+    "mutualFollows": "mutual_follows",
+    "sharedBrackets": "shared_brackets",
+    "sameSchool": "same_school",
+    "sameInstructor": "same_instructor",
+}
+
+NOTIFICATION_FIELDS = {
+    "id": "id",
+    "kind": "kind",
+    "subjectId": "subject_id",
+    "actorCount": "actor_count",
+    "createdAt": "created_at",
+    "readAt": "read_at",
+}
+
+TAG_FIELDS = {
+    "tag": "tag",
+    "postCount": "post_count",
+    "lastUsedAt": "last_used_at",
+}
+
+# Division keys are tuples in models.DIVISION_FIELDS order
+DIVISION_KEYS = ("season", "ruleset", "isGi", "belt", "weightClass", "ageDivision", "gender")
+
+# ============= Compiled Serializers =============
+_user = compile_serializer(USER_FIELDS)
+_user_card = compile_serializer(USER_CARD_FIELDS)
+_post = compile_serializer(POST_FIELDS)
+_comment = compile_serializer(COMMENT_FIELDS)
+_tournament = compile_serializer(TOURNAMENT_FIELDS)
+_tournament_summary = compile_serializer(TOURNAMENT_SUMMARY_FIELDS)
+_match = compile_serializer(MATCH_FIELDS)
+_leaderboard = compile_serializer(LEADERBOARD_FIELDS)
+serialize_rating = compile_serializer(RATING_FIELDS)
+serialize_rating_history = compile_serializer(RATING_HISTORY_FIELDS)
+_suggestion = compile_serializer(SUGGESTION_FIELDS)
+serialize_tag = compile_serializer(TAG_FIELDS)
+_notification = compile_serializer(NOTIFICATION_FIELDS)
+
+def serialize_user(user):
+    """Serialize a user without the password hash"""
+    return _user(user) if user is not None else None
+
+def serialize_user_card(user):
+    """Serialize the card projection of a user; accepts card rows or full users"""
+    return _user_card(user) if user is not None else None
+
+# Nested users in list payloads are always cards; the full profile is only
+# served by the profile endpoints.
+def serialize_post(post, user):
+    data = _post(post)
+    data["imageUrls"] = data["imageUrls"] or []
+    data["user"] = serialize_user_card(user)
+    return data
+
+def serialize_comment(comment, user):
+    data = _comment(comment)
+    data["user"] = serialize_user_card(user)
+    return data
+
+def serialize_tournament(tournament, organizer):
+    data = _tournament(tournament)
+    data["organizer"] = serialize_user_card(organizer)
+    return data
+
+def serialize_tournament_summary(tournament):
+    return _tournament_summary(tournament) if tournament is not None else None
+
+def serialize_match(match, competitor_a, competitor_b, winner):
+    data = _match(match)
+    data["competitorA"] = serialize_user_card(competitor_a)
+    data["competitorB"] = serialize_user_card(competitor_b)
+    data["winner"] = serialize_user_card(winner)
+    return data
+
+def serialize_leaderboard(entry, user):
+    data = _leaderboard(entry)
+    data["user"] = serialize_user_card(user)
+    return data
+
+def serialize_suggestion(suggestion, user):
+    data = _suggestion(suggestion)
+    data["user"] = serialize_user_card(user)
+    return data
+
+def serialize_notification(notification, actors, summary):
+    data = _notification(notification)
+    data["actors"] = [serialize_user_card(actor) for actor in actors]
+    data["summary"] = summary
+    return data
+
+def serialize_division(key):
+    return dict(zip(DIVISION_KEYS, key))
+
+def json_response(content, status_code=200):
+    """Encode already-serialized content with orjson, bypassing jsonable_encoder"""
+    return ORJSONResponse(content, status_code=status_code)
@@ -0,0 +1,192 @@
+import copy
+import os
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from .cache import TTLCache
+from .database import get_db_context
+from .models import Session as SessionRow
+
+# Server-side sessions in the sessions table. The cookie only carries a
+# random session id, so there is no signature to verify per request, and
+# the row (including the resolved user_id) is cached in-process so most
+# requests do not touch the database at all. Deleting a row revokes the
+# session; other instances stop honoring it within SESSION_CACHE_TTL_SEC.
+# Ids that resolve to no live session are remembered briefly as well, and
+# their cookie is cleared, so a stale or made-up cookie costs one query.
+
+SESSION_MAX_AGE_SEC = int(os.getenv("SESSION_MAX_AGE_SEC", str(30 * 24 * 60 * 60)))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_TTL_SEC = float(os.getenv("SESSION_CACHE_TTL_SEC", "30"))
+SESSION_MISS_TTL_SEC = float(os.getenv("SESSION_MISS_TTL_SEC", "10"))
+SESSION_SWEEP_INTERVAL_SEC = float(os.getenv("SESSION_SWEEP_INTERVAL_SEC", "600"))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", "1000"))
+
+class SessionStore:
+    """Session rows with a read-through LRU/TTL cache of (data, expire)"""
+
+    def __init__(self, max_age=SESSION_MAX_AGE_SEC):
+        self.max_age = max_age
+        self.cache = TTLCache(SESSION_CACHE_SIZE, SESSION_CACHE_TTL_SEC)
+        # Ids known to have no live session
+        self.misses = TTLCache(SESSION_CACHE_SIZE, SESSION_MISS_TTL_SEC)
+
+    def cached(self, sid):
+        entry = self.cache.get(sid)
+        if entry is not None and entry[1] <= datetime.utcnow():
+            self.cache.delete(sid)
+            return None
+        return entry
+
+    def load(self, sid):
+        """(data, expire) for a live session, or None"""
+        if self.misses.get(sid) is not None:
+            return None
+        with get_db_context() as db:
+            row = db.execute(
+                select(SessionRow.sess, SessionRow.expire).where(
+                    SessionRow.sid == sid, SessionRow.expire > datetime.utcnow()
+                )
+            ).first()
+        if row is None:
+            self.misses.set(sid, True)
+            return None
+        entry = (row.sess, row.expire)
+        self.cache.set(sid, entry)
+        return entry
+
+    def save(self, sid, data):
+        """Write ``data`` under ``sid`` (a new id if None), extending expiry
+
+        Returns the sid, or None if the session was revoked meanwhile.
+        """
+        expire = datetime.utcnow() + timedelta(seconds=self.max_age)
+        with get_db_context() as db:
+            if sid is None:
+                sid = secrets.token_urlsafe(32)
+                db.add(SessionRow(sid=sid, sess=data, expire=expire))
+            elif db.execute(
+                update(SessionRow).where(SessionRow.sid == sid).values(sess=data, expire=expire)
+            ).rowcount == 0:
+                self.cache.delete(sid)
+                return None
+            db.commit()
+        self.cache.set(sid, (data, expire))
+        return sid
+
+    def delete(self, sid):
+        with get_db_context() as db:
+            db.execute(delete(SessionRow).where(SessionRow.sid == sid))
+            db.commit()
+        self.cache.delete(sid)
+
+    def revoke_user(self, user_id):
+        """Delete every session logged in as ``user_id``; returns how many"""
+        with get_db_context() as db:
+            sids = db.execute(
+                select(SessionRow.sid).where(SessionRow.sess["user_id"].as_string() == user_id)
+            ).scalars().all()
+            if sids:
+                db.execute(delete(SessionRow).where(SessionRow.sid.in_(sids)))
+                db.commit()
+        for sid in sids:
+            self.cache.delete(sid)
+        return len(sids)
+
+    def sweep_expired(self, batch_size=SESSION_SWEEP_BATCH_SIZE):
+        """Delete expired rows in batches (IDX_session_expire range scans); returns how many"""
+        removed = 0
+        now = datetime.utcnow()
+        with get_db_context() as db:
+            while True:
+                sids = db.execute(
+                    select(SessionRow.sid).where(SessionRow.expire <= now).limit(batch_size)
+                ).scalars().all()
+                if not sids:
+                    break
+                db.execute(delete(SessionRow).where(SessionRow.sid.in_(sids)))
+                # Commit per batch so locks are short and progress survives a failure
+                db.commit()
+                removed += len(sids)
+                if len(sids) < batch_size:
+                    break
+        return removed
+
+session_store = SessionStore()
+
+class ServerSessionMiddleware:
+    """Drop-in for Starlette's SessionMiddleware that keeps scope["session"] server-side"""
+
+    def __init__(self, app, store=session_store, session_cookie="bjj_session",
+                 path="/", same_site="lax", https_only=False):
+        self.app = app
+        self.store = store
+        self.session_cookie = session_cookie
+        self.path = path
+        self.security_flags = "httponly; samesite=" + same_site
+        if https_only:
+            self.security_flags += "; secure"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        sid = cookie_sid = HTTPConnection(scope).cookies.get(self.session_cookie)
+        entry = None
+        if sid:
+            entry = self.store.cached(sid)
+            if entry is None:
+                entry = await run_in_threadpool(self.store.load, sid)
+        if entry is None:
+            sid, initial, expire = None, {}, None
+        else:
+            initial, expire = entry
+        # Routes mutate scope["session"]; the cached copy must stay untouched
+        scope["session"] = copy.deepcopy(initial)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                await self.commit(scope["session"], sid, initial, expire, message, cookie_sid)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def commit(self, session, sid, initial, expire, message, cookie_sid=None):
+        if session:
+            changed = session != initial
+            # Sliding expiry, but only rewrite the row once half of max_age has passed
+            stale = expire is None or expire - datetime.utcnow() < timedelta(seconds=self.store.max_age / 2)
+            if not (changed or stale):
+                return
+            new_sid = sid
+            if sid is not None and session.get("user_id") != initial.get("user_id"):
+                # New identity, new id: an id seen before login is never promoted
+                await run_in_threadpool(self.store.delete, sid)
+                new_sid = None
+            new_sid = await run_in_threadpool(self.store.save, new_sid, session)
+            if new_sid is None:
+                self._clear_cookie(message)
+            else:
+                self._set_cookie(message, new_sid, f"Max-Age={self.store.max_age}; ")
+        elif sid is not None:
+            # Cleared (logout): revoke the row, not just the cookie
+            await run_in_threadpool(self.store.delete, sid)
+            self._clear_cookie(message)
+        elif cookie_sid:
+            # Expired, revoked or made up: stop the client sending it
+            self._clear_cookie(message)
+
+    def _clear_cookie(self, message):
+        self._set_cookie(message, "null", "expires=Thu, 01 Jan 1970 00:00:00 GMT; ")
+
+    def _set_cookie(self, message, value, lifetime):
+        headers = MutableHeaders(scope=message)
+        headers.append(
+            "Set-Cookie",
+            f"{self.session_cookie}={value}; path={self.path}; {lifetime}{self.security_flags}"
+        )
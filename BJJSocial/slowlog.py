@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from . import instrumentation
+
+# Slow query log. Statements slower than SLOW_QUERY_THRESHOLD_MS are logged
+# with their normalized SQL, the shape (not values) of their parameters and
+# the application function that ran them, and aggregated per fingerprint
+# (hash of the normalized SQL) into an in-memory table served by the admin
+# router. The first slow run of a SELECT fingerprint, and then at most one
+# per SLOW_QUERY_EXPLAIN_INTERVAL_SEC, also captures the plan.
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1") == "1"
+SLOW_QUERY_EXPLAIN_INTERVAL_SEC = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SEC", "300"))
+# Fingerprints kept; the ones with the least total time are dropped first
+SLOW_QUERY_MAX_FINGERPRINTS = int(os.getenv("SLOW_QUERY_MAX_FINGERPRINTS", "500"))
+CALL_SITES_PER_FINGERPRINT = 5
+
+logger = logging.getLogger("bjjsocial.slowlog")
+
+# ============= Normalization =============
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize(statement):
+    """SQL with literals and placeholders replaced by ? and lists collapsed, so shapes compare equal"""
+    sql = _STRING.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("(?, ...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode("utf-8")).hexdigest()[:16]
+
+def parameter_shape(parameters, executemany=False):
+    """Types of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters or ())
+        return {"executemany": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+# Modules whose frames are plumbing rather than the caller
+_SKIPPED_MODULES = {__name__, "BJJSocial.database", "BJJSocial.instrumentation"}
+
+def call_site():
+    """First application frame ("module:function:line") outside the database plumbing"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("BJJSocial.") and module not in _SKIPPED_MODULES:
+            return f"{module}:{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return "unknown"
+
+# ============= Aggregation =============
+
+class FingerprintStats:
+    __slots__ = ("fingerprint", "sql", "count", "total_ms", "max_ms", "last_seen",
+                 "parameter_shape", "call_sites", "explain", "explained_at")
+
+    def __init__(self, key, sql):
+        self.fingerprint = key
+        self.sql = sql
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_seen = None
+        self.parameter_shape = None
+        self.call_sites = {}
+        self.explain = None
+        self.explained_at = 0.0
+
+    def as_dict(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "sql": self.sql,
+            "count": self.count,
+            "totalMs": round(self.total_ms, 2),
+            "meanMs": round(self.total_ms / self.count, 2) if self.count else 0,
+            "maxMs": round(self.max_ms, 2),
+            "lastSeen": self.last_seen,
+            "parameterShape": self.parameter_shape,
+            "callSites": self.call_sites,
+            "explain": self.explain,
+        }
+
+class SlowQueryLog:
+    """Slow statements aggregated per fingerprint"""
+
+    def __init__(self, max_fingerprints=SLOW_QUERY_MAX_FINGERPRINTS):
+        self.max_fingerprints = max_fingerprints
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def record(self, sql, elapsed_ms, shape, site):
+        """Add one slow run; returns its FingerprintStats"""
+        key = fingerprint(sql)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    coldest = min(self._entries.values(), key=lambda e: e.total_ms)
+                    del self._entries[coldest.fingerprint]
+                entry = self._entries[key] = FingerprintStats(key, sql)
+            entry.count += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.last_seen = datetime.utcnow().isoformat()
+            entry.parameter_shape = shape
+            if site in entry.call_sites or len(entry.call_sites) < CALL_SITES_PER_FINGERPRINT:
+                entry.call_sites[site] = entry.call_sites.get(site, 0) + 1
+        return entry
+
+    def claim_explain(self, entry):
+        """True if this caller should capture a plan for ``entry`` now (rate limit per fingerprint)"""
+        now = time.monotonic()
+        with self._lock:
+            if entry.explained_at and now - entry.explained_at < SLOW_QUERY_EXPLAIN_INTERVAL_SEC:
+                return False
+            entry.explained_at = now
+            return True
+
+    def top(self, limit=20, order_by="total"):
+        attribute = {"total": "total_ms", "max": "max_ms", "count": "count"}[order_by]
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: getattr(e, attribute), reverse=True)[:limit]
+            return [entry.as_dict() for entry in entries]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+slow_query_log = SlowQueryLog()
+
+# ============= EXPLAIN =============
+
+def _explain(dialect_name, cursor, statement, parameters):
+    """Plan text for a SELECT, run on the statement's own DBAPI connection (no ORM events)"""
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if dialect_name == "sqlite":
+            explain_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return "\n".join(" | ".join(str(column) for column in row) for row in explain_cursor.fetchall())
+        if dialect_name == "postgresql":
+            # A failed EXPLAIN would abort the caller's transaction; contain it
+            explain_cursor.execute("SAVEPOINT slowlog_explain")
+            try:
+                explain_cursor.execute("EXPLAIN " + statement, parameters)
+                plan = "\n".join(row[0] for row in explain_cursor.fetchall())
+            except Exception:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT slowlog_explain")
+                raise
+            explain_cursor.execute("RELEASE SAVEPOINT slowlog_explain")
+            return plan
+        return None
+    finally:
+        explain_cursor.close()
+
+# ============= Statement Hook =============
+
+def _record_if_slow(conn, cursor, statement, parameters, executemany, seconds):
+    # Timed by instrumentation's cursor listeners, on every engine they cover
+    elapsed_ms = seconds * 1000
+    if elapsed_ms < SLOW_QUERY_THRESHOLD_MS:
+        return
+    sql = normalize(statement)
+    shape = parameter_shape(parameters, executemany)
+    site = call_site()
+    entry = slow_query_log.record(sql, elapsed_ms, shape, site)
+    logger.warning("Slow query %.1f ms [%s] at %s: %s params=%s", elapsed_ms, entry.fingerprint, site, sql, shape)
+
+    is_select = sql.split(" ", 1)[0].lower() in ("select", "with")
+    if SLOW_QUERY_EXPLAIN and is_select and not executemany and slow_query_log.claim_explain(entry):
+        try:
+            plan = _explain(conn.dialect.name, cursor, statement, parameters)
+        except Exception as error:
+            plan = f"EXPLAIN failed: {error}"
+        entry.explain = plan
+        if plan:
+            logger.warning("Plan for [%s]:\n%s", entry.fingerprint, plan)
+
+instrumentation.add_statement_hook(_record_if_slow)
@@ -0,0 +1,91 @@
+import os
+from datetime import datetime
+from sqlalchemy import select, insert, update, delete, func, tuple_
+
+from .database import get_db_context
+from .models import (
+    Leaderboard, LeaderboardSnapshot, LeaderboardHistory, LeaderboardHistoryState, DIVISION_FIELDS
+)
+
+# Periodic snapshots of every division's standings into leaderboard_history.
+# Only (user, division) pairs whose rank or points changed since the last
+# snapshot get a row, so storage grows with the number of changes rather
+# than snapshots x athletes.
+
+LEADERBOARD_SNAPSHOT_INTERVAL_SEC = float(os.getenv("LEADERBOARD_SNAPSHOT_INTERVAL_SEC", "3600"))
+
+# Divisions are stored as one compact string, season first. History rows
+# also carry the season in its own column: a prefix range on the string
+# depends on the collation (most non-C ones sort U+FFFF below letters).
+DIVISION_SEPARATOR = "|"
+
+def encode_division(key):
+    season, ruleset, is_gi, belt, weight_class, age_division, gender = key
+    return DIVISION_SEPARATOR.join(
+        (season, ruleset, "gi" if is_gi else "nogi", belt, weight_class, age_division, gender)
+    )
+
+def decode_division(value):
+    season, ruleset, gi, belt, weight_class, age_division, gender = value.split(DIVISION_SEPARATOR)
+    return (season, ruleset, gi == "gi", belt, weight_class, age_division, gender)
+
+def season_of(division):
+    return division.split(DIVISION_SEPARATOR, 1)[0]
+
+def current_standings(db):
+    """{(user_id, division string): (rank, points)} from the live leaderboard"""
+    division_columns = [getattr(Leaderboard, field) for field in DIVISION_FIELDS]
+    rank = func.rank().over(partition_by=division_columns, order_by=Leaderboard.points.desc())
+    rows = db.execute(select(Leaderboard.user_id, Leaderboard.points, rank, *division_columns))
+    return {
+        (user_id, encode_division(division)): (position, points or 0)
+        for user_id, points, position, *division in rows
+    }
+
+def take_snapshot(db, taken_at=None):
+    """Write history rows for every change since the last snapshot; returns the count"""
+    taken_at = (taken_at or datetime.utcnow()).replace(microsecond=0)
+    current = current_standings(db)
+    previous = {
+        (user_id, division): (rank, points)
+        for user_id, division, rank, points in db.execute(select(
+            LeaderboardHistoryState.user_id, LeaderboardHistoryState.division,
+            LeaderboardHistoryState.rank, LeaderboardHistoryState.points
+        ))
+    }
+
+    history, inserted, changed = [], [], []
+    for key, value in current.items():
+        old = previous.get(key)
+        if old == value:
+            continue
+        history.append({
+            "user_id": key[0], "division": key[1], "season": season_of(key[1]),
+            "taken_at": taken_at, "rank": value[0], "points": value[1],
+        })
+        state = {"user_id": key[0], "division": key[1], "rank": value[0], "points": value[1]}
+        (inserted if old is None else changed).append(state)
+    removed = [key for key in previous if key not in current]
+    for user_id, division in removed:
+        history.append({
+            "user_id": user_id, "division": division, "season": season_of(division),
+            "taken_at": taken_at, "rank": None, "points": None,
+        })
+
+    if history:
+        db.execute(insert(LeaderboardHistory), history)
+    if inserted:
+        db.execute(insert(LeaderboardHistoryState), inserted)
+    if changed:
+        db.execute(update(LeaderboardHistoryState), changed)
+    if removed:
+        db.execute(delete(LeaderboardHistoryState).where(
+            tuple_(LeaderboardHistoryState.user_id, LeaderboardHistoryState.division).in_(removed)
+        ))
+    db.add(LeaderboardSnapshot(taken_at=taken_at, changed_rows=len(history)))
+    db.commit()
+    return len(history)
+
+if __name__ == "__main__":
+    with get_db_context() as db:
+        print(f"Snapshot wrote {take_snapshot(db)} changed rows")
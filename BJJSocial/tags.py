@@ -0,0 +1,145 @@
+import argparse
+import re
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from .database import get_db_context
+from .models import User, Post, PostTag, PostMention, TagCount
+from . import trending
+
+# Hashtags (#berimbolo) and mentions (@<user id>; users have no handles)
+# are parsed out of a post when it is written and stored in post_tags and
+# post_mentions, so browsing them reads an index instead of scanning
+# content. Tags are case-folded: #Berimbolo and #berimbolo are one tag.
+
+MAX_TAG_LENGTH = 64
+MAX_TAGS_PER_POST = 30
+MAX_MENTIONS_PER_POST = 30
+
+# At least one letter, so "#1" or "#2024" is not a tag; not preceded by a
+# word character, '&' or '/', so "a#b", "&#39;" and URL fragments are skipped
+TAG_PATTERN = re.compile(r"(?<![\w&/])#(\w*[^\W\d_]\w*)")
+MENTION_PATTERN = re.compile(
+    r"(?<![\w.])@([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})\b"
+)
+
+def normalize_tag(tag):
+    """The stored form of a tag, with or without its leading '#'; None if it is not a valid tag"""
+    tag = tag.strip().removeprefix("#").casefold()
+    if not tag or len(tag) > MAX_TAG_LENGTH or not TAG_PATTERN.fullmatch("#" + tag):
+        return None
+    return tag
+
+def extract_tags(content):
+    """Distinct normalized hashtags in ``content``, in order of first use"""
+    tags = {}
+    for match in TAG_PATTERN.finditer(content or ""):
+        tag = match.group(1).casefold()
+        if len(tag) <= MAX_TAG_LENGTH:
+            tags.setdefault(tag, None)
+    return list(tags)[:MAX_TAGS_PER_POST]
+
+def extract_mentions(content):
+    """Distinct user ids mentioned in ``content``, in order of first use"""
+    ids = {match.group(1).lower(): None for match in MENTION_PATTERN.finditer(content or "")}
+    return list(ids)[:MAX_MENTIONS_PER_POST]
+
+def _count_tag(db, tag, used_at):
+    # The row is created on a tag's first use; a concurrent first use
+    # loses the insert and falls through to the update
+    values = dict(post_count=TagCount.post_count + 1, last_used_at=used_at)
+    if not db.execute(update(TagCount.__table__).where(TagCount.tag == tag).values(**values)).rowcount:
+        try:
+            with db.begin_nested():
+                db.execute(insert(TagCount.__table__).values(
+                    tag=tag, post_count=1, trending_score=0.0, last_used_at=used_at
+                ))
+        except IntegrityError:
+            db.execute(update(TagCount.__table__).where(TagCount.tag == tag).values(**values))
+    trending.bump_tag(db, tag, at=used_at)
+
+def record(db, post):
+    """Store ``post``'s tags and mentions and count its tags, in ``db``'s transaction
+
+    ``post`` must be flushed (its id and created_at assigned).
+    """
+    created_at = post.created_at
+    tags = extract_tags(post.content)
+    if tags:
+        db.execute(insert(PostTag.__table__), [
+            {"post_id": post.id, "tag": tag, "created_at": created_at} for tag in tags
+        ])
+        for tag in sorted(tags):  # one lock order across concurrent posts
+            _count_tag(db, tag, created_at)
+
+    # Only mentions of users that exist
+    mentioned = extract_mentions(post.content)
+    if mentioned:
+        user_ids = db.execute(select(User.id).where(User.id.in_(mentioned))).scalars().all()
+        if user_ids:
+            db.execute(insert(PostMention.__table__), [
+                {"post_id": post.id, "user_id": user_id, "created_at": created_at} for user_id in user_ids
+            ])
+    return tags
+
+def backfill(db, batch_size=1000, log=print):
+    """Rebuild post_tags, post_mentions and tag_counts from every post's content; returns posts tagged
+
+    Tag trending scores start at zero: run trending.rebuild_scores afterwards.
+    """
+    for model in (PostTag, PostMention, TagCount):
+        db.execute(delete(model.__table__))
+    user_ids = set(db.execute(select(User.id)).scalars())
+
+    tag_rows, mention_rows, counts, tagged = [], [], {}, 0
+    def flush():
+        if tag_rows:
+            db.execute(insert(PostTag.__table__), tag_rows)
+        if mention_rows:
+            db.execute(insert(PostMention.__table__), mention_rows)
+        tag_rows.clear()
+        mention_rows.clear()
+
+    posts = select(Post.id, Post.content, Post.created_at).execution_options(yield_per=batch_size)
+    for post_id, content, created_at in db.execute(posts):
+        tags = extract_tags(content)
+        tagged += bool(tags)
+        for tag in tags:
+            tag_rows.append({"post_id": post_id, "tag": tag, "created_at": created_at})
+            count, last_used_at = counts.get(tag, (0, created_at))
+            counts[tag] = (count + 1, max(last_used_at, created_at))
+        for user_id in extract_mentions(content):
+            if user_id in user_ids:
+                mention_rows.append({"post_id": post_id, "user_id": user_id, "created_at": created_at})
+        if len(tag_rows) + len(mention_rows) >= batch_size:
+            flush()
+    flush()
+
+    rows = [
+        {"tag": tag, "post_count": count, "trending_score": 0.0, "last_used_at": last_used_at}
+        for tag, (count, last_used_at) in counts.items()
+    ]
+    for start in range(0, len(rows), batch_size):
+        db.execute(insert(TagCount.__table__), rows[start:start + batch_size])
+    db.commit()
+    log(f"Tagged {tagged} posts with {len(counts)} distinct tags")
+    return tagged
+
+def main():
+    parser = argparse.ArgumentParser(description="Hashtag and mention maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill", help="Rebuild post_tags, post_mentions and tag_counts from post content")
+    parse = commands.add_parser("parse", help="Show the tags and mentions found in some text")
+    parse.add_argument("content")
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        with get_db_context() as db:
+            backfill(db)
+            trending.rebuild_scores(db)
+    else:
+        print("tags:", extract_tags(args.content))
+        print("mentions:", extract_mentions(args.content))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+from . import jobs, counters, notifications, partitions, ratelimit, ratings, recommendations, snapshots, trending
+from .session_store import session_store, SESSION_SWEEP_INTERVAL_SEC
+
+# Job handlers and the periodic schedule. A handler takes the session and
+# the job's payload as keyword arguments, commits its own work, and must be
+# safe to run again: a job is retried after a failure, and rerun if its
+# worker dies before recording the result.
+
+# ============= Deferred work =============
+
+@jobs.task("ratings.apply_match")
+def apply_match_rating(db, match_id):
+    # Enqueued by submit_match_result when a result is first finalized
+    ratings.apply_finalized(db, match_id)
+
+# ============= Periodic work =============
+
+@jobs.task("notifications.deliver")
+def deliver_notifications(db):
+    notifications.deliver_pending(db)
+
+@jobs.task("sessions.sweep")
+def sweep_sessions(db):
+    session_store.sweep_expired()
+
+@jobs.task("snapshots.take")
+def take_leaderboard_snapshot(db):
+    snapshots.take_snapshot(db)
+
+@jobs.task("recommendations.rebuild")
+def rebuild_recommendations(db):
+    recommendations.rebuild_suggestions(db)
+
+@jobs.task("partitions.maintain")
+def maintain_partitions(db):
+    partitions.maintain()
+
+@jobs.task("trending.rebase")
+def rebase_trending(db):
+    trending.rebase(db)
+
+@jobs.task("counters.reconcile")
+def reconcile_counters(db):
+    counters.reconcile(db)
+
+@jobs.task("ratelimit.evict")
+def evict_rate_limit_buckets(db):
+    ratelimit.DatabaseStore.evict_expired(db)
+
+@jobs.task("jobs.prune")
+def prune_jobs(db):
+    jobs.prune(db)
+
+jobs.schedule("notifications.deliver", notifications.NOTIFICATION_DELIVERY_INTERVAL_SEC)
+jobs.schedule("sessions.sweep", SESSION_SWEEP_INTERVAL_SEC)
+jobs.schedule("snapshots.take", snapshots.LEADERBOARD_SNAPSHOT_INTERVAL_SEC)
+jobs.schedule("recommendations.rebuild", recommendations.RECOMMENDATIONS_INTERVAL_SEC)
+jobs.schedule("partitions.maintain", partitions.PARTITION_MAINTENANCE_INTERVAL_SEC)
+jobs.schedule("trending.rebase", trending.TRENDING_REBASE_INTERVAL_SEC)
+jobs.schedule("counters.reconcile", counters.COUNTER_RECONCILE_INTERVAL_SEC)
+jobs.schedule("jobs.prune", jobs.JOB_PRUNE_INTERVAL_SEC)
+if ratelimit.RATE_LIMIT_BACKEND == "database":
+    jobs.schedule("ratelimit.evict", ratelimit.RATE_LIMIT_EVICT_INTERVAL_SEC)
@@ -0,0 +1,159 @@
+import math
+import os
+from datetime import datetime
+from sqlalchemy import select, insert, update, case, bindparam
+from sqlalchemy.exc import IntegrityError
+
+from .database import get_db_context
+from .models import Post, Like, Comment, PostTag, TagCount, TrendingState
+
+# Trending feed order. A post's score is its engagement with each event
+# decayed by age: sum of weight * 2^-(age / half-life). Decaying every
+# score by the same factor keeps their order, so the stored value is
+# instead each event's weight scaled *up* by how long after a shared epoch
+# it happened: weight * e^((t - epoch) / tau). Ordering by that column is
+# ordering by decayed score at any moment, a like is one
+# UPDATE ... SET trending_score = trending_score + delta, and the
+# (trending_score, id) index serves the feed.
+#
+# The stored values grow as time moves away from the epoch; rebase()
+# periodically moves the epoch to now and rescales every score to match.
+# Scores that decay below TRENDING_MIN_SCORE are zeroed there, so a rebase
+# only touches recently active posts.
+#
+# Tags trend the same way: each use adds TAG_WEIGHT to tag_counts'
+# score under the same epoch.
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TAU_SEC = TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+
+LIKE_WEIGHT = 1.0
+COMMENT_WEIGHT = 3.0
+SHARE_WEIGHT = 2.0
+# Credit a new post starts with, so fresh posts surface before any engagement
+POST_WEIGHT = 1.0
+TAG_WEIGHT = 1.0
+
+TRENDING_REBASE_INTERVAL_SEC = float(os.getenv("TRENDING_REBASE_INTERVAL_SEC", "21600"))
+TRENDING_MIN_SCORE = 1e-6
+
+STATE_ID = 1
+
+# Tables with a trending_score column: (table, key column)
+SCORED = ((Post.__table__, "id"), (TagCount.__table__, "tag"))
+
+def _scale(epoch, at):
+    return math.exp((at - epoch).total_seconds() / TAU_SEC)
+
+def current_epoch(db, lock=False):
+    """The epoch scores are relative to; ``lock`` holds it (FOR SHARE) until the transaction ends"""
+    stmt = select(TrendingState.epoch).where(TrendingState.id == STATE_ID)
+    if lock:
+        stmt = stmt.with_for_update(read=True)
+    epoch = db.execute(stmt).scalar()
+    if epoch is None:
+        epoch = datetime.utcnow().replace(microsecond=0)
+        try:
+            with db.begin_nested():
+                db.execute(insert(TrendingState).values(id=STATE_ID, epoch=epoch))
+        except IntegrityError:
+            return current_epoch(db, lock)
+    return epoch
+
+def decayed(score, epoch, now=None):
+    """A stored score as of ``now``: its events' weights decayed by age"""
+    return score / _scale(epoch, now or datetime.utcnow())
+
+def _bump(db, table, key_column, key, weight, at):
+    at = at or datetime.utcnow()
+    # Postgres: the shared lock waits out a rebase in progress, and blocks
+    # one from starting until this transaction ends. SQLite: the epoch
+    # check in the UPDATE itself catches a rebase that committed between
+    # the two statements (SQLite runs one writer at a time).
+    score = table.c.trending_score
+    for _ in range(3):
+        epoch = current_epoch(db, lock=True)
+        delta = weight * _scale(epoch, at)
+        result = db.execute(
+            update(table)
+            .where(
+                table.c[key_column] == key,
+                select(TrendingState.epoch).where(TrendingState.id == STATE_ID).scalar_subquery() == epoch
+            )
+            .values(trending_score=case((score + delta > 0, score + delta), else_=0.0))
+        )
+        if result.rowcount:
+            return True
+    return False
+
+def bump(db, post_id, weight, at=None):
+    """Add an event of ``weight`` at time ``at`` (default now) to a post's score, in ``db``'s transaction
+
+    A negative weight with the original ``at`` takes an event back out.
+    """
+    return _bump(db, Post.__table__, "id", post_id, weight, at)
+
+def bump_tag(db, tag, weight=TAG_WEIGHT, at=None):
+    """Add a use of ``tag`` to its tag_counts score; the row must exist"""
+    return _bump(db, TagCount.__table__, "tag", tag, weight, at)
+
+def rebase(db, now=None):
+    """Move the epoch to ``now``, rescaling every score; returns the number of rows rescaled"""
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    epoch = db.execute(
+        select(TrendingState.epoch).where(TrendingState.id == STATE_ID).with_for_update()
+    ).scalar()
+    if epoch is None:
+        current_epoch(db)
+        db.commit()
+        return 0
+    # The state row is written first so that on SQLite this transaction
+    # holds the write lock before any post is read for rescaling
+    db.execute(update(TrendingState).where(TrendingState.id == STATE_ID).values(epoch=now))
+    factor = 1 / _scale(epoch, now)
+    rescaled = 0
+    for table, _ in SCORED:
+        score = table.c.trending_score
+        rescaled += db.execute(
+            update(table)
+            .where(score > 0)
+            .values(trending_score=case((score * factor < TRENDING_MIN_SCORE, 0.0), else_=score * factor))
+        ).rowcount
+    db.commit()
+    return rescaled
+
+def rebuild_scores(db, now=None, batch_size=1000):
+    """Recompute every score from posts, likes, comments and tags (seeding, repairs); returns rows scored"""
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    for table, _ in SCORED:
+        db.execute(update(table).values(trending_score=0.0))
+    db.execute(update(TrendingState).where(TrendingState.id == STATE_ID).values(epoch=now))
+    current_epoch(db)
+
+    post_scores, tag_scores = {}, {}
+    def add(scores, key, weight, at):
+        if at is not None:
+            scores[key] = scores.get(key, 0.0) + weight * _scale(now, at)
+
+    for post_id, created_at, shares in db.execute(select(Post.id, Post.created_at, Post.shares)):
+        add(post_scores, post_id, POST_WEIGHT + SHARE_WEIGHT * (shares or 0), created_at)
+    for post_id, created_at in db.execute(select(Like.post_id, Like.created_at)):
+        add(post_scores, post_id, LIKE_WEIGHT, created_at)
+    for post_id, created_at in db.execute(select(Comment.post_id, Comment.created_at)):
+        add(post_scores, post_id, COMMENT_WEIGHT, created_at)
+    for tag, created_at in db.execute(select(PostTag.tag, PostTag.created_at)):
+        add(tag_scores, tag, TAG_WEIGHT, created_at)
+
+    scored = 0
+    for (table, key_column), scores in zip(SCORED, (post_scores, tag_scores)):
+        rows = [{"key": key, "score": score} for key, score in scores.items() if score >= TRENDING_MIN_SCORE]
+        stmt = update(table).where(table.c[key_column] == bindparam("key")).values(trending_score=bindparam("score"))
+        for start in range(0, len(rows), batch_size):
+            db.execute(stmt, rows[start:start + batch_size])
+        scored += len(rows)
+    db.commit()
+    return scored
+
+if __name__ == "__main__":
+    with get_db_context() as db:
+        print(f"Scored {rebuild_scores(db)} posts and tags")